@@ -0,0 +1,1269 @@
+'''
+Python Script
+Benchmark
+VoiceInserterの処理時間を計測する。Resolveの代わりにFakeResolveを使うので、Linuxでも動く。
+
+使い方:
+    python Benchmark.py insert --lines 200 --latency 0.001
+    python Benchmark.py insert --lines 200 --background 3600 --trim-in-place
+    python Benchmark.py timecode
+    python Benchmark.py bulk --lines 500 --latency 0.001
+    python Benchmark.py insert --lines 200 --text-image
+    python Benchmark.py pipeline --lines 50 --synthesis 0.2 --latency 0.001
+    python Benchmark.py import --files 200 --latency 0.001
+    python Benchmark.py layout --lines 10000
+    python Benchmark.py resample --lines 20 --rate 48000
+    python Benchmark.py stem --lines 500
+    python Benchmark.py outdir --existing 2000
+    python Benchmark.py settings --changes 200 --characters 50
+    python Benchmark.py thumbnail --images 10
+    python Benchmark.py library --images 300
+    python Benchmark.py sequence --frames 200
+    python Benchmark.py picker --expressions 500
+    python Benchmark.py fonts --files 1000
+'''
+from __future__ import annotations
+import argparse
+import array
+import glob
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# VoiceInserterは設定ファイルの保存先をRESOLVE_SCRIPT_APIから決めるので、読み込み前に一時フォルダを指定する
+WORK_DIR: str = tempfile.mkdtemp(prefix="VoiceInserterBench")
+os.environ.setdefault("RESOLVE_SCRIPT_API", WORK_DIR)
+if len(sys.argv) > 1 and "--profile" in sys.argv:
+    os.environ["VOICEINSERTER_PROFILE"] = "1"
+
+import FakeResolve
+import VoiceInserter
+from tests import test_framerate
+
+class ConsoleMessageBox:
+    '''
+    ダイアログの代わりにメッセージを標準出力に表示し、件数を数える。
+    '''
+    def __init__(self) -> None:
+        self.errorCount: int = 0
+
+    def showerror(self, title: str, message: str, **_) -> str:
+        self.errorCount += 1
+        print(f"[{title}] {message}")
+        return "ok"
+
+    def showinfo(self, title: str, message: str, **_) -> str:
+        print(f"[{title}] {message}")
+        return "ok"
+
+    def askyesno(self, title: str, message: str, **_) -> bool:
+        print(f"[{title}] {message} -> yes")
+        return True
+
+# 画面がない環境でも動かせるように、ダイアログは標準出力に出す
+consoleMessageBox: ConsoleMessageBox = ConsoleMessageBox()
+VoiceInserter.messagebox = consoleMessageBox # type: ignore[assignment]
+
+def MakeSilentWav(filePath: str, seconds: float, sampleRate: int = 24000) -> None:
+    '''
+    無音のwavファイルを作成する。
+
+    Parameters:
+    filePath: str
+        保存先
+    seconds: float
+        長さ(秒)
+    sampleRate: int
+        サンプリングレート
+    '''
+    with wave.open(filePath, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sampleRate)
+        f.writeframes(b"\x00\x00" * int(seconds * sampleRate))
+
+def PrintDurations(title: str, durations: list[float]) -> None:
+    '''
+    所要時間の統計を表示する。
+
+    Parameters:
+    title: str
+        見出し
+    durations: list[float]
+        1回ごとの所要時間(秒)
+    '''
+    print(f"{title}: total {sum(durations):.3f}s, mean {statistics.mean(durations) * 1000:.2f}ms, "
+          f"median {statistics.median(durations) * 1000:.2f}ms, max {max(durations) * 1000:.2f}ms")
+
+def MakeSilentWavBytes(seconds: float, sampleRate: int = 24000) -> bytes:
+    '''
+    無音のwavデータを作成する。Voicevoxの合成結果の代わりに使う。
+    '''
+    buffer: BytesIO = BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sampleRate)
+        f.writeframes(b"\x00\x00" * int(seconds * sampleRate))
+    return buffer.getvalue()
+
+def MakeToneWavBytes(seconds: float, frequency: float, sampleRate: int = 24000) -> bytes:
+    '''
+    正弦波のwavデータを作成する。リサンプルの精度の確認に使う。
+    '''
+    samples: array.array = array.array("h", (int(10000 * math.sin(2 * math.pi * frequency * i / sampleRate)) for i in range(int(seconds * sampleRate))))
+    if sys.byteorder != "little":
+        samples.byteswap()
+    buffer: BytesIO = BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sampleRate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+def MakeCharacters(project, count: int, voiceOnly: bool, textOutput: str = VoiceInserter.TEXT_OUTPUT_FUSION) -> list[VoiceInserter.PackingData]:
+    '''
+    ベンチマーク用のキャラを作成する。画像は1枚だけ登録する。
+    '''
+    fonts: VoiceInserter.FontList = VoiceInserter.FontList({})
+    imagePath: str = os.path.join(WORK_DIR, "face_01.png")
+    with open(imagePath, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+    characters: list[VoiceInserter.PackingData] = []
+    for i in range(count):
+        data: VoiceInserter.PackingData = VoiceInserter.PackingData(f"Bench{i}", project, fonts)
+        data.imageData.AddImage("normal", imagePath)
+        data.imageData["selectImage"] = "normal"
+        data.imageData["voiceOnly"] = voiceOnly
+        data.textData["outputMode"] = textOutput
+        characters.append(data)
+    return characters
+
+def TextOutputMode(args: argparse.Namespace) -> str:
+    '''
+    コマンドライン引数から字幕の出力先を決める。
+    '''
+    if args.text_image:
+        if not VoiceInserter.SubtitleRenderer.IsAvailable():
+            print("Pillowがないため、字幕画像の代わりにFusionテキストで計測します。")
+        return VoiceInserter.TEXT_OUTPUT_IMAGE
+    if args.subtitle:
+        return VoiceInserter.TEXT_OUTPUT_SUBTITLE
+    return VoiceInserter.TEXT_OUTPUT_FUSION
+
+def BenchInsert(args: argparse.Namespace) -> None:
+    '''
+    FakeResolve上でN行分の挿入(音声・画像・字幕)を行い、1行あたりのAPI呼び出し回数と時間を計測する。
+    '''
+    random.seed(args.seed)
+    resolve: FakeResolve.Resolve = FakeResolve.Resolve(fps=args.fps, latency=args.latency, dropFrame=args.drop_frame, trimInPlace=args.trim_in_place)
+    project = VoiceInserter.resolveProfiler.Wrap(resolve.GetProjectManager().GetCurrentProject(), "Project")
+    characters: list[VoiceInserter.PackingData] = MakeCharacters(project, args.characters, args.voice_only, TextOutputMode(args))
+    if args.background > 0:
+        # 既存の動画などが挿入位置より後ろまである状態にして、画像クリップの切り詰めを発生させる
+        fakeProject: FakeResolve.Project = resolve.projectManager.project
+        background: FakeResolve.Timeline = fakeProject.GetMediaPool().CreateEmptyTimeline("Timeline 1")
+        fakeProject.SetCurrentTimeline(background)
+        frames: int = background.rate.SecondsToFrames(args.background)
+        background._Place(FakeResolve.MediaPoolItem(resolve.context, "Background", "", frames, args.fps), "video", 1, background.startFrame, frames, 0)
+    wavFiles: list[str] = []
+    for i in range(args.lines):
+        wavFile: str = os.path.join(WORK_DIR, f"line{i}.wav")
+        MakeSilentWav(wavFile, random.uniform(0.5, 4.0))
+        wavFiles.append(wavFile)
+
+    durations: list[float] = []
+    calls: list[int] = []
+    for i, wavFile in enumerate(wavFiles):
+        data = characters[i % len(characters)]
+        callsBefore: int = resolve.GetCallCount()
+        start: float = time.perf_counter()
+        data.InsertRaw(wavFile, f"ベンチマーク{i}行目")
+        durations.append(time.perf_counter() - start)
+        calls.append(resolve.GetCallCount() - callsBefore)
+    if args.subtitle:
+        # 字幕トラックへの取り込みはまとめて1回. 最後の行の時間に含める
+        fakeTimeline: FakeResolve.Timeline = resolve.projectManager.project.currentTimeline
+        playhead: str = fakeTimeline.GetCurrentTimecode()
+        callsBefore = resolve.GetCallCount()
+        start = time.perf_counter()
+        for data in characters:
+            data.FlushSubtitles()
+        durations[-1] += time.perf_counter() - start
+        calls[-1] += resolve.GetCallCount() - callsBefore
+        # 取り込み後も次の行は最後の音声の後ろに置かれる
+        if fakeTimeline.GetCurrentTimecode() != playhead:
+            print(f"playhead moved by subtitle import: {playhead} -> {fakeTimeline.GetCurrentTimecode()}")
+            sys.exit(1)
+
+    timeline: FakeResolve.Timeline = resolve.projectManager.project.currentTimeline
+    print(f"lines: {args.lines}, characters: {args.characters}, fps: {args.fps}{'DF' if args.drop_frame else ''}, latency: {args.latency * 1000:.1f}ms, voiceOnly: {args.voice_only}")
+    PrintDurations("insert", durations)
+    print(f"api calls/line: mean {statistics.mean(calls):.1f}, max {max(calls)}, total {sum(calls)}")
+    print(f"errors: {consoleMessageBox.errorCount}")
+    truncations: dict[str, int] = {}
+    for data in characters:
+        for method, count in data.imageTruncationCounts.items():
+            truncations[method] = truncations.get(method, 0) + count
+    print(f"image truncation: {', '.join(f'{method} {count}' for method, count in truncations.items())}")
+    if args.text_image:
+        print(f"subtitle images: rendered {VoiceInserter.subtitleRenderer.renderedCount}, cached {VoiceInserter.subtitleRenderer.cachedCount}")
+    for trackType in ("audio", "video", "subtitle"):
+        for track in timeline.tracks[trackType]:
+            print(f"  {trackType} track '{track.name}': {len(track.items)} clips")
+    if VoiceInserter.resolveProfiler.enabled:
+        print()
+        print(VoiceInserter.resolveProfiler.Report())
+
+def LegacyTimecodeToFrames(timecode: str, fps: int | float) -> int:
+    # 比較用: 以前の文字列ベースの実装
+    h, m, s, f = re.findall(r"\d+", timecode)
+    return int((int(h) * 3600 + int(m) * 60 + int(s)) * fps) + int(f)
+
+def LegacyAddFrameToTimecode(timecode: str, addFrames: int, fps: int | float) -> str:
+    # 比較用: 以前の文字列ベースの実装
+    totalFrames = LegacyTimecodeToFrames(timecode, fps) + addFrames
+    if totalFrames < 0:
+        totalFrames = 0
+    hours = int(totalFrames // (3600 * fps))
+    minutes = int((totalFrames % (3600 * fps)) // (60 * fps))
+    seconds = int((totalFrames % (60 * fps)) // fps)
+    frames = int(totalFrames % fps)
+    return f"{hours:02}:{minutes:02}:{seconds:02}:{frames:02}"
+
+def BenchTimecode(args: argparse.Namespace) -> None:
+    '''
+    タイムコード変換の速度を以前の文字列ベースの実装と比較し、変換の性質も確認する。
+    '''
+    random.seed(args.seed)
+    frameRate: VoiceInserter.FrameRate = VoiceInserter.FrameRate.FromSetting(args.fps, args.drop_frame)
+    frames: list[int] = [random.randrange(86400 * 30, 86400 * 31) for _ in range(args.count)]
+    timecodes: list[str] = [frameRate.FramesToTimecode(frame) for frame in frames]
+    legacyFps: float = float(args.fps)
+
+    start: float = time.perf_counter()
+    for timecode in timecodes:
+        LegacyTimecodeToFrames(timecode, legacyFps)
+    legacyParse: float = time.perf_counter() - start
+    start = time.perf_counter()
+    for timecode in timecodes:
+        frameRate.TimecodeToFrames(timecode)
+    newParse: float = time.perf_counter() - start
+    start = time.perf_counter()
+    for frame in frames:
+        LegacyAddFrameToTimecode("00:00:00:00", frame, legacyFps)
+    legacyFormat: float = time.perf_counter() - start
+    start = time.perf_counter()
+    for frame in frames:
+        frameRate.FramesToTimecode(frame)
+    newFormat: float = time.perf_counter() - start
+    # 1行の挿入で以前行っていた、文字列を経由した位置計算(開始・終了・画像終了の往復)
+    start = time.perf_counter()
+    for timecode in timecodes:
+        end: str = LegacyAddFrameToTimecode(timecode, 90, legacyFps)
+        LegacyAddFrameToTimecode("00:00:00:00", LegacyTimecodeToFrames(end, legacyFps), legacyFps)
+        LegacyTimecodeToFrames(end, legacyFps) - LegacyTimecodeToFrames(timecode, legacyFps)
+    legacyLine: float = time.perf_counter() - start
+    # 新しい実装では再生位置の読み取りと書き戻しの2回だけ文字列を扱う
+    start = time.perf_counter()
+    for timecode in timecodes:
+        startFrame: int = frameRate.TimecodeToFrames(timecode)
+        frameRate.FramesToTimecode(startFrame + 90)
+    newLine: float = time.perf_counter() - start
+
+    print(f"fps: {args.fps}{'DF' if args.drop_frame else ''}, count: {args.count}")
+    for title, legacy, new in (("parse", legacyParse, newParse), ("format", legacyFormat, newFormat), ("per line", legacyLine, newLine)):
+        print(f"{title:<9} legacy {legacy / args.count * 1e6:8.3f}us  new {new / args.count * 1e6:8.3f}us  x{legacy / max(new, 1e-9):.1f}")
+    # 性質の確認はtests/test_framerate.pyと同じものを、より多くのフレーム数で行う
+    rng: random.Random = random.Random(args.seed)
+    failures: list[str] = [failure for fps, dropFrame in test_framerate.RATES for failure in test_framerate.CheckTimecodeProperties(fps, dropFrame, args.samples, rng)]
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    print(f"property check: {'ok' if len(failures) == 0 else f'{len(failures)} failures'}")
+    if failures:
+        sys.exit(1)
+
+def BenchLayout(args: argparse.Namespace) -> None:
+    '''
+    DialogueLayoutで掛け合いの配置を計算する速度を計測する。配置の正しさはtests/test_layout.pyで確認する。
+    '''
+    random.seed(args.seed)
+    frameRate: VoiceInserter.FrameRate = VoiceInserter.FrameRate.FromSetting(args.fps)
+    startFrame: int = frameRate.TimecodeToFrames("01:00:00:00")
+    entries: list[VoiceInserter.DialogueLayout.Entry] = [
+        VoiceInserter.DialogueLayout.Entry(
+            f"chara{random.randrange(args.characters)}",
+            frameRate.SecondsToFrames(random.uniform(0.5, 4.0)),
+            random.choice([0, 0, frameRate.SecondsToFrames(0.3)]),
+            random.choice([0, 0, 0, frameRate.SecondsToFrames(0.5)]),
+            random.random() < args.voice_only_ratio,
+        )
+        for _ in range(args.lines)
+    ]
+    durations: list[float] = []
+    for _ in range(args.repeat):
+        start: float = time.perf_counter()
+        _, endFrame = VoiceInserter.DialogueLayout.Plan(entries, startFrame)
+        durations.append(time.perf_counter() - start)
+    print(f"lines: {args.lines}, characters: {args.characters}, fps: {args.fps}, repeat: {args.repeat}")
+    PrintDurations("plan", durations)
+    print(f"per line: {statistics.median(durations) / max(args.lines, 1) * 1e6:.3f}us, timeline: {frameRate.FramesToTimecode(startFrame)} - {frameRate.FramesToTimecode(endFrame)}")
+
+def BenchBulk(args: argparse.Namespace) -> None:
+    '''
+    1行ずつ挿入する場合と、TimelineBuilderでFCPXMLにまとめて取り込む場合を比較する。
+    '''
+    random.seed(args.seed)
+    wavFiles: list[str] = []
+    for i in range(args.lines):
+        wavFile: str = os.path.join(WORK_DIR, f"bulk{i}.wav")
+        MakeSilentWav(wavFile, random.uniform(0.5, 4.0))
+        wavFiles.append(wavFile)
+
+    for mode in ("append", "fcpxml"):
+        resolve: FakeResolve.Resolve = FakeResolve.Resolve(fps=args.fps, latency=args.latency, dropFrame=args.drop_frame)
+        project = resolve.GetProjectManager().GetCurrentProject()
+        characters: list[VoiceInserter.PackingData] = MakeCharacters(project, args.characters, args.voice_only, TextOutputMode(args))
+        start: float = time.perf_counter()
+        if mode == "append":
+            for i, wavFile in enumerate(wavFiles):
+                characters[i % len(characters)].InsertRaw(wavFile, f"ベンチマーク{i}行目")
+            for data in characters:
+                data.FlushSubtitles()
+        else:
+            builder: VoiceInserter.TimelineBuilder = VoiceInserter.TimelineBuilder.FromProject(project)
+            for i, wavFile in enumerate(wavFiles):
+                builder.Add(characters[i % len(characters)], wavFile, f"ベンチマーク{i}行目")
+            builder.Import(project, "Bulk", filePath=os.path.join(WORK_DIR, "bulk.fcpxml"))
+        elapsed: float = time.perf_counter() - start
+        timeline: FakeResolve.Timeline = resolve.projectManager.project.currentTimeline
+        tracks: str = ", ".join(f"{track.name} {len(track.items)}" for trackType in ("audio", "video", "subtitle") for track in timeline.tracks[trackType] if track.items)
+        print(f"{mode:<7} {elapsed:.3f}s, api calls {resolve.GetCallCount()}, end frame {timeline.GetEndFrame()}, tracks: {tracks}")
+    print(f"lines: {args.lines}, characters: {args.characters}, fps: {args.fps}{'DF' if args.drop_frame else ''}, latency: {args.latency * 1000:.1f}ms, voiceOnly: {args.voice_only}")
+    if args.text_image:
+        print(f"subtitle images: rendered {VoiceInserter.subtitleRenderer.renderedCount}, cached {VoiceInserter.subtitleRenderer.cachedCount}")
+    print(f"errors: {consoleMessageBox.errorCount}")
+
+def BenchPipeline(args: argparse.Namespace) -> None:
+    '''
+    音声合成(疑似的な待ち時間)と挿入を1行ずつ順番に行う場合と、InsertionQueueで合成を先行させる場合を比較する。
+    '''
+    random.seed(args.seed)
+    # --phrasesを指定した場合は、決まり文句を繰り返す台本として同じ長さの行を使い回す
+    phrases: list[float] = [random.uniform(0.5, 4.0) for _ in range(args.phrases)]
+    seconds: list[float] = [random.choice(phrases) if phrases else random.uniform(0.5, 4.0) for _ in range(args.lines)]
+
+    def Synthesizer(length: float):
+        def Synthesize() -> bytes:
+            time.sleep(args.synthesis)
+            return MakeSilentWavBytes(length)
+        return Synthesize
+
+    results: dict[str, float] = {}
+    for mode in ("serial", "pipeline"):
+        resolve: FakeResolve.Resolve = FakeResolve.Resolve(fps=args.fps, latency=args.latency)
+        project = resolve.GetProjectManager().GetCurrentProject()
+        characters: list[VoiceInserter.PackingData] = MakeCharacters(project, args.characters, False)
+        outDir: str = tempfile.mkdtemp(prefix=mode, dir=WORK_DIR)
+        start: float = time.perf_counter()
+        if mode == "serial":
+            for i, length in enumerate(seconds):
+                wavFile: str = os.path.join(outDir, f"line{i}.wav")
+                with open(wavFile, "wb") as f:
+                    f.write(Synthesizer(length)())
+                characters[i % len(characters)].InsertRaw(wavFile, f"ベンチマーク{i}行目")
+        else:
+            queue: VoiceInserter.InsertionQueue = VoiceInserter.InsertionQueue(args.workers)
+            for i, length in enumerate(seconds):
+                wavFile = queue.ReserveFilePath(os.path.join(outDir, "line.wav"))
+                voiceParams: dict[str, object] | None = {"length": length} if args.phrases else None
+                queue.Enqueue(characters[i % len(characters)], wavFile, f"ベンチマーク{i}行目", Synthesizer(length), voiceParams=voiceParams)
+            queue.Drain()
+            queue.Shutdown()
+            failed: int = sum(1 for job in queue.jobs if job.status != VoiceInserter.InsertionQueue.STATUS_DONE)
+            if failed:
+                print(f"pipeline: {failed} lines failed")
+            if args.phrases:
+                print(f"pipeline: {queue.GetReuseReport()}")
+        results[mode] = time.perf_counter() - start
+        timeline: FakeResolve.Timeline = resolve.projectManager.project.currentTimeline
+        clips: int = sum(len(track.items) for track in timeline.tracks["audio"])
+        wavCount: int = sum(1 for fileName in os.listdir(outDir) if fileName.endswith(".wav"))
+        print(f"{mode:<9} {results[mode]:.3f}s ({results[mode] / args.lines * 1000:.1f}ms/line), voice clips: {clips}, wav files: {wavCount}, api calls: {resolve.GetCallCount()}, end frame: {timeline.GetEndFrame()}")
+    print(f"lines: {args.lines}, synthesis: {args.synthesis * 1000:.0f}ms, latency: {args.latency * 1000:.1f}ms, workers: {args.workers}, speedup x{results['serial'] / max(results['pipeline'], 1e-9):.2f}")
+    print(f"errors: {consoleMessageBox.errorCount}")
+
+def BenchImport(args: argparse.Namespace) -> None:
+    '''
+    音声ファイルを1つずつメディアプールに取り込む場合と、ImportMediaBatchでまとめて取り込む場合を比較する。
+    '''
+    random.seed(args.seed)
+    wavFiles: list[str] = []
+    for i in range(args.files):
+        wavFile: str = os.path.join(WORK_DIR, f"import{i}.wav")
+        MakeSilentWav(wavFile, random.uniform(0.5, 4.0))
+        wavFiles.append(wavFile)
+
+    for mode in ("single", "batch"):
+        resolve: FakeResolve.Resolve = FakeResolve.Resolve(fps=args.fps, latency=args.latency)
+        project = resolve.GetProjectManager().GetCurrentProject()
+        data: VoiceInserter.PackingData = MakeCharacters(project, 1, False)[0]
+        callsBefore: int = resolve.GetCallCount()
+        start: float = time.perf_counter()
+        clips: dict[str, object] = {}
+        if mode == "single":
+            for wavFile in wavFiles:
+                clips[wavFile] = data.GetClipFromMediaPoolWithFilePath(wavFile, os.path.splitext(os.path.basename(wavFile))[0], f"/{VoiceInserter.CLIP_NAME_PREFIX}/Voices")
+        else:
+            clips = VoiceInserter.ResolveUtil.ImportMediaBatch(project.GetMediaPool(), wavFiles, f"/{VoiceInserter.CLIP_NAME_PREFIX}/Voices")
+        elapsed: float = time.perf_counter() - start
+        names: bool = all(clip is not None and clip.GetName() == os.path.splitext(os.path.basename(path))[0] for path, clip in clips.items())
+        print(f"{mode:<7} {elapsed:.3f}s, api calls {resolve.GetCallCount() - callsBefore}, clips {len(clips)}, names ok: {names}")
+    print(f"files: {args.files}, latency: {args.latency * 1000:.1f}ms")
+    print(f"errors: {consoleMessageBox.errorCount}")
+
+def BenchStem(args: argparse.Namespace) -> None:
+    '''
+    N行をキャラごとに1つのwavにつなげて書き出す時間とメモリ使用量を計測し、対応表どおりに各行が置かれているか確認する。
+    '''
+    random.seed(args.seed)
+    resolve: FakeResolve.Resolve = FakeResolve.Resolve(fps=args.fps, latency=0.0)
+    project = resolve.GetProjectManager().GetCurrentProject()
+    characters: list[VoiceInserter.PackingData] = MakeCharacters(project, args.characters, False)
+    builder: VoiceInserter.TimelineBuilder = VoiceInserter.TimelineBuilder.FromProject(project)
+    sourceBytes: int = 0
+    for i in range(args.lines):
+        # 行ごとに違う値で埋めて、書き出し後に位置を確認できるようにする
+        wavFile: str = os.path.join(WORK_DIR, f"stem{i}.wav")
+        with wave.open(wavFile, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(24000)
+            f.writeframes((i + 1).to_bytes(2, "little") * int(random.uniform(0.5, 4.0) * 24000))
+        sourceBytes += os.path.getsize(wavFile)
+        builder.Add(characters[i % len(characters)], wavFile, f"ベンチマーク{i}行目", pauseAfter=random.choice([0, args.pause]), overlap=random.choice([0, 0, args.overlap]))
+    outDir: str = tempfile.mkdtemp(prefix="stem", dir=WORK_DIR)
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    stems: dict[str, str] = builder.WriteStems(outDir, "bench")
+    elapsed: float = time.perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    with open(os.path.join(outDir, "bench_offsets.json"), encoding="utf-8") as f:
+        table: dict = json.load(f)
+    failures: int = 0
+    for entry in table["lines"]:
+        with wave.open(os.path.join(outDir, entry["stem"]), "rb") as stem:
+            stem.setpos(entry["startSample"])
+            frames: bytes = stem.readframes(entry["sampleCount"])
+            index: int = int(os.path.splitext(os.path.basename(entry["wavFile"]))[0][len("stem"):])
+            if frames != (index + 1).to_bytes(2, "little") * entry["sampleCount"]:
+                failures += 1
+    stemBytes: int = sum(os.path.getsize(stemFile) for stemFile in stems.values())
+    print(f"lines: {args.lines}, characters: {args.characters}, fps: {args.fps}, pause: {args.pause}f, overlap: {args.overlap}f")
+    print(f"write {elapsed:.3f}s, source {sourceBytes / 1e6:.1f}MB -> stems {stemBytes / 1e6:.1f}MB ({len(stems)} files), peak python memory {peak / 1e6:.2f}MB")
+    print(f"offset check: {'ok' if failures == 0 else f'{failures} failures'}")
+    if failures:
+        sys.exit(1)
+
+def LegacyReserveFilePath(filePath: str, reservedPaths: set[str]) -> str:
+    '''
+    以前の実装. 空いている番号が見つかるまでos.path.existsで1つずつ確認する
+    '''
+    base, ext = os.path.splitext(filePath)
+    fixedFilePath: str = filePath
+    counter: int = 0
+    while fixedFilePath in reservedPaths or os.path.exists(fixedFilePath):
+        counter += 1
+        fixedFilePath = f"{base}{counter}{ext}"
+    reservedPaths.add(fixedFilePath)
+    return fixedFilePath
+
+def ReserveInProcess(outDir: str, count: int) -> list[str]:
+    '''
+    別のプロセスからOutputDirectoryでファイル名を確保する
+    '''
+    directory: VoiceInserter.OutputDirectory = VoiceInserter.OutputDirectory.Get(outDir)
+    return [os.path.basename(directory.Reserve("はい.wav")) for _ in range(count)]
+
+def BenchOutDir(args: argparse.Namespace) -> None:
+    '''
+    同じ名前のファイルが多数あるフォルダで新しいファイル名を決める速度を、以前の実装と比較する。
+    スレッド・プロセスをまたいで同じ名前にならないことと、キューを止めた時に確保したファイルが残らないことも確認する。
+    '''
+    results: dict[str, float] = {}
+    for mode in ("legacy", "manager"):
+        outDir: str = tempfile.mkdtemp(prefix=mode, dir=WORK_DIR)
+        for i in range(args.existing):
+            with open(os.path.join(outDir, f"はい{i if i > 0 else ''}.wav"), "wb"):
+                pass
+        start: float = time.perf_counter()
+        if mode == "legacy":
+            reservedPaths: set[str] = set()
+            for _ in range(args.names):
+                LegacyReserveFilePath(os.path.join(outDir, "はい.wav"), reservedPaths)
+        else:
+            directory: VoiceInserter.OutputDirectory = VoiceInserter.OutputDirectory(outDir)
+            for _ in range(args.names):
+                directory.Reserve("はい.wav")
+        results[mode] = time.perf_counter() - start
+        print(f"{mode:<8} {results[mode] / args.names * 1e6:10.1f}us/name")
+    print(f"existing: {args.existing}, names: {args.names}, speedup x{results['legacy'] / max(results['manager'], 1e-9):.1f}")
+
+    # スレッドとプロセスから同時に確保して、重複がないか確認する
+    outDir = tempfile.mkdtemp(prefix="concurrent", dir=WORK_DIR)
+    names: list[str] = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for result in executor.map(lambda _: ReserveInProcess(outDir, args.names // args.workers), range(args.workers)):
+            names.extend(result)
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        for result in pool.starmap(ReserveInProcess, [(outDir, args.names // args.workers)] * args.workers):
+            names.extend(result)
+    duplicates: int = len(names) - len(set(names))
+    print(f"concurrent: {len(names)} names from {args.workers} threads + {args.workers} processes, duplicates: {duplicates}")
+    if duplicates:
+        sys.exit(1)
+
+    # 合成前に閉じた場合、キューに残った行の空のファイルが残らないことを確認する
+    outDir = tempfile.mkdtemp(prefix="shutdown", dir=WORK_DIR)
+    queue: VoiceInserter.InsertionQueue = VoiceInserter.InsertionQueue(1)
+    character: VoiceInserter.PackingData = MakeCharacters(None, 1, False)[0]
+    def SlowSynthesize() -> bytes:
+        time.sleep(0.1)
+        return MakeSilentWavBytes(0.5)
+    for _ in range(args.workers * 2):
+        queue.Enqueue(character, queue.ReserveFilePath(os.path.join(outDir, "はい.wav")), "はい", SlowSynthesize)
+    queue.Shutdown()
+    # 取り消した行はfutures.waitで完了扱いにならないので、合成中だった行だけを待つ
+    futures.wait([job.future for job in queue.jobs if job.future is not None and not job.future.cancelled()])
+    leftovers: list[str] = [fileName for fileName in os.listdir(outDir) if os.path.getsize(os.path.join(outDir, fileName)) == 0]
+    print(f"shutdown: {len(queue.jobs)} queued lines, empty files left {len(leftovers)}")
+    if leftovers:
+        sys.exit(1)
+
+def BenchSettings(args: argparse.Namespace) -> None:
+    '''
+    スライダーを動かした時のように設定を続けて変更した場合の、UIスレッドでの時間とファイルの書き込み回数を以前の実装と比較する。
+    '''
+    data: VoiceInserter.PackingData.ImageData = VoiceInserter.PackingData.ImageData("BenchSettings_image.json")
+    filePath: str = os.path.join(os.environ["RESOLVE_SCRIPT_API"], VoiceInserter.DATA_FILE, "BenchSettings_image.json")
+    os.makedirs(os.path.dirname(filePath), exist_ok=True)
+    # 以前の実装. 変更のたびにその場で書き込む
+    legacy: float = 0.0
+    for i in range(args.changes):
+        start: float = time.perf_counter()
+        data._params["x"] = i
+        with open(filePath, "w") as f:
+            json.dump(data._params, f, indent=4)
+        legacy += time.perf_counter() - start
+        time.sleep(args.interval)
+    writer: VoiceInserter.SettingsWriter = VoiceInserter.settingsWriter
+    scheduledBefore, writtenBefore = writer.scheduledCount, writer.writtenCount
+    new: float = 0.0
+    for i in range(args.changes):
+        start = time.perf_counter()
+        data["x"] = i
+        new += time.perf_counter() - start
+        time.sleep(args.interval)
+    writer.Flush()
+    saved: int = json.loads(VoiceInserter.settingsStore.Get("BenchSettings_image.json") or "{}")["x"]
+    print(f"changes: {args.changes}, interval: {args.interval * 1000:.0f}ms")
+    print(f"legacy   {legacy / args.changes * 1e6:8.1f}us/change on UI thread, writes {args.changes}")
+    print(f"behind   {new / args.changes * 1e6:8.1f}us/change on UI thread, writes {writer.writtenCount - writtenBefore} (scheduled {writer.scheduledCount - scheduledBefore})")
+    print(f"saved value: {saved} ({'ok' if saved == args.changes - 1 else 'NG'})")
+    if saved != args.changes - 1:
+        sys.exit(1)
+    BenchSettingsLoad(args.characters)
+
+def BenchSettingsLoad(characters: int) -> None:
+    '''
+    起動時にキャラの設定を読み込む時間を、キャラごとのファイルから読む以前の実装と、1つのファイルにまとめた設定から読む場合で比較する。
+    '''
+    legacyDir: str = tempfile.mkdtemp(prefix="settings", dir=WORK_DIR)
+    names: list[str] = []
+    for i in range(characters):
+        for suffix in ("image", "text", "voicevox"):
+            name: str = f"Character{i}_{suffix}.json"
+            with open(os.path.join(legacyDir, name), "w") as f:
+                json.dump({"x": i, "imageDict": {f"image{j}": f"C:/images/{i}/{j}.png" for j in range(20)}}, f, indent=4)
+            names.append(name)
+    # 以前の実装. 起動時にすべてのファイルを開く
+    start: float = time.perf_counter()
+    for name in names:
+        with open(os.path.join(legacyDir, name), "r") as f:
+            json.load(f)
+    legacy: float = time.perf_counter() - start
+    store: VoiceInserter.SettingsStore = VoiceInserter.SettingsStore(os.path.join(legacyDir, "settings.db"), legacyDir)
+    start = time.perf_counter()
+    for name in names:
+        json.loads(store.Get(name) or "{}")
+    migrate: float = time.perf_counter() - start
+    migrated: int = store.migratedCount
+    store.Close()
+    # 取り込み後に開き直した場合
+    store = VoiceInserter.SettingsStore(os.path.join(legacyDir, "settings.db"), legacyDir)
+    start = time.perf_counter()
+    for name in names:
+        json.loads(store.Get(name) or "{}")
+    loaded: float = time.perf_counter() - start
+    # 最初に表示する1キャラだけ読む場合
+    store.Close()
+    store = VoiceInserter.SettingsStore(os.path.join(legacyDir, "settings.db"), legacyDir)
+    start = time.perf_counter()
+    for name in names[:3]:
+        json.loads(store.Get(name) or "{}")
+    first: float = time.perf_counter() - start
+    mismatched: int = sum(1 for i, name in enumerate(names) if json.loads(store.Get(name) or "{}").get("x") != i // 3)
+    store.Close()
+    print(f"characters: {characters} ({len(names)} settings)")
+    print(f"legacy files {legacy * 1000:8.2f}ms, file opens {len(names)}")
+    print(f"migrate      {migrate * 1000:8.2f}ms (first start only, migrated {migrated})")
+    print(f"store        {loaded * 1000:8.2f}ms, file opens 1")
+    print(f"store 1 char {first * 1000:8.2f}ms")
+    print(f"mismatched: {mismatched}")
+    if mismatched:
+        sys.exit(1)
+
+def BenchResample(args: argparse.Namespace) -> None:
+    '''
+    合成した音声をそのまま書き出す場合と、プロジェクトのサンプルレートに変換してから書き出す場合の速度を比較し、
+    変換後の正弦波との誤差(SN比)も表示する。
+    '''
+    if not VoiceInserter.WavResampler.IsAvailable():
+        print("NumPyがないため、リサンプルは計測できません。")
+        return
+    import numpy as np
+    wav: bytes = MakeToneWavBytes(args.seconds, args.frequency)
+    outDir: str = tempfile.mkdtemp(prefix="resample", dir=WORK_DIR)
+    print(f"lines: {args.lines}, seconds/line: {args.seconds}, 24000Hz -> {args.rate}Hz, tone: {args.frequency}Hz")
+    for quality in ("raw", VoiceInserter.RESAMPLE_QUALITY_FAST, VoiceInserter.RESAMPLE_QUALITY_STANDARD, VoiceInserter.RESAMPLE_QUALITY_HIGH):
+        durations: list[float] = []
+        output: bytes = wav
+        for i in range(args.lines):
+            start: float = time.perf_counter()
+            output = wav if quality == "raw" else VoiceInserter.wavResampler.ResampleWav(wav, args.rate, quality)
+            with open(os.path.join(outDir, f"{quality}{i}.wav"), "wb") as f:
+                f.write(output)
+            durations.append(time.perf_counter() - start)
+        snr: str = "-"
+        if quality != "raw":
+            with wave.open(BytesIO(output), "rb") as wavedata:
+                samples = np.frombuffer(wavedata.readframes(wavedata.getnframes()), dtype="<i2").astype(np.float64)
+            reference = 10000 * np.sin(2 * np.pi * args.frequency * np.arange(len(samples)) / args.rate)
+            # 端はフィルタの立ち上がりの影響があるので除く
+            margin: int = args.rate // 100
+            error = samples[margin:-margin] - reference[margin:-margin]
+            snr = f"{10 * np.log10(np.mean(reference[margin:-margin] ** 2) / max(np.mean(error ** 2), 1e-12)):.1f}dB"
+        total: float = sum(durations)
+        print(f"{quality:<9} {total / args.lines * 1000:8.2f}ms/line, x{args.seconds * args.lines / max(total, 1e-9):8.1f} realtime, size {len(output)} bytes, snr {snr}")
+
+def BenchThumbnail(args: argparse.Namespace) -> None:
+    '''
+    表情を切り替えた時に、元の大きさの画像を毎回展開していた以前の実装と、縮小画像のキャッシュを使う場合の時間を比較する。
+    ディスプレイのない環境でも動くように、tk.PhotoImageの代わりにPillowで展開した時間を計測する。
+    '''
+    if not VoiceInserter.pillowAvailable:
+        print("Pillowがないため、縮小画像は計測できません。")
+        return
+    from PIL import Image
+    imageDir: str = tempfile.mkdtemp(prefix="thumbnail", dir=WORK_DIR)
+    imagePaths: list[str] = []
+    for i in range(args.images):
+        image = Image.linear_gradient("L").resize((args.width, args.height)).convert("RGBA")
+        image.putpixel((i, i), (255, 0, 0, 255))
+        imagePath: str = os.path.join(imageDir, f"face{i}.png")
+        image.save(imagePath)
+        imagePaths.append(imagePath)
+    width, height = 200, 400
+    switches: list[str] = [imagePaths[i % len(imagePaths)] for i in range(args.switches)]
+    # 以前の実装. 切り替えのたびに元の大きさで展開してから縮小する
+    start: float = time.perf_counter()
+    for imagePath in switches:
+        with Image.open(imagePath) as image:
+            image.load()
+            factor: int = max(1, math.ceil(max(image.width / width, image.height / height)))
+            image.reduce(factor)
+    legacy: float = time.perf_counter() - start
+    cache: VoiceInserter.ThumbnailCache = VoiceInserter.ThumbnailCache(os.path.join(imageDir, "cache"))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=cache.maxWorkers) as executor:
+        thumbnailPaths: list[str | None] = list(executor.map(lambda path: cache.Generate(path, width, height), imagePaths))
+    generate: float = time.perf_counter() - start
+    start = time.perf_counter()
+    for imagePath in switches:
+        key: str | None = cache.GetKey(imagePath, width, height)
+        assert key is not None
+        with Image.open(cache.GetThumbnailPath(key)) as image:
+            image.load()
+    cached: float = time.perf_counter() - start
+    sizes: set[tuple[int, int]] = set()
+    for thumbnailPath in thumbnailPaths:
+        if thumbnailPath is None:
+            continue
+        with Image.open(thumbnailPath) as image:
+            sizes.add(image.size)
+    # 元画像を更新したら作り直されること
+    os.utime(imagePaths[0], ns=(time.time_ns(), time.time_ns() + 10**9))
+    regenerated: bool = cache.Generate(imagePaths[0], width, height) != thumbnailPaths[0]
+    print(f"images: {args.images} ({args.width}x{args.height}), switches: {args.switches}")
+    print(f"legacy    {legacy / args.switches * 1000:8.2f}ms/switch on UI thread")
+    print(f"generate  {generate / args.images * 1000:8.2f}ms/image in background (once per image)")
+    print(f"cached    {cached / args.switches * 1000:8.2f}ms/switch on UI thread")
+    print(f"thumbnail sizes: {sorted(sizes)}, regenerated after update: {regenerated}")
+    if None in thumbnailPaths or not regenerated or any(w > width or h > height for w, h in sizes):
+        sys.exit(1)
+
+def BenchLibrary(args: argparse.Namespace) -> None:
+    '''
+    表情画像のフォルダをまとめて取り込む速度と、設定の保存回数を1つずつ追加する以前の実装と比較する。
+    連番画像の検出と表情名が重ならないことも確認する。
+    '''
+    rootDir: str = tempfile.mkdtemp(prefix="library", dir=WORK_DIR)
+    expected: int = 0
+    for folder in range(args.folders):
+        folderPath: str = os.path.join(rootDir, f"pose{folder}")
+        os.makedirs(os.path.join(folderPath, "mouth"), exist_ok=True)
+        for i in range(args.images // args.folders):
+            # 連番・重ね番号・番号なしを混ぜる
+            names: list[str] = [f"face_{i:03d}.png", f"eye{i % 3}_mouth{i}.png", f"mouth/open{i}.png"]
+            if i < 5:
+                names.append(f"special{chr(97 + i)}.png")
+            for name in names:
+                with open(os.path.join(folderPath, name), "wb") as f:
+                    f.write(b"")
+                expected += 1
+    # 以前の実装. フォルダを順番に列挙し、1つ追加するたびに保存する
+    legacy: VoiceInserter.PackingData.ImageData = VoiceInserter.PackingData.ImageData("BenchLibraryLegacy_image.json")
+    writer: VoiceInserter.SettingsWriter = VoiceInserter.settingsWriter
+    scheduledBefore: int = writer.scheduledCount
+    start: float = time.perf_counter()
+    for directory, _, files in os.walk(rootDir):
+        for name in files:
+            legacy.AddImage(os.path.relpath(os.path.join(directory, name), rootDir), os.path.join(directory, name))
+    legacyTime: float = time.perf_counter() - start
+    legacySaves: int = writer.scheduledCount - scheduledBefore
+    data: VoiceInserter.PackingData.ImageData = VoiceInserter.PackingData.ImageData("BenchLibrary_image.json")
+    scheduledBefore = writer.scheduledCount
+    start = time.perf_counter()
+    result: VoiceInserter.ExpressionLibrary.Result = VoiceInserter.ExpressionLibrary.DeriveNames(rootDir, VoiceInserter.ExpressionLibrary.Scan(rootDir, args.workers))
+    scanTime: float = time.perf_counter() - start
+    added: int = data.AddImages(result.images)
+    newTime: float = time.perf_counter() - start
+    newSaves: int = writer.scheduledCount - scheduledBefore
+    writer.Flush()
+    print(f"images: {expected} in {args.folders} folders")
+    print(f"legacy   {legacyTime * 1000:8.2f}ms, saves {legacySaves}")
+    print(f"library  {newTime * 1000:8.2f}ms (scan {scanTime * 1000:.2f}ms, {args.workers} workers), saves {newSaves}")
+    print(f"added: {added}, sequences: {result.sequenceCount}, examples: {list(result.images)[:4]}")
+    if added != expected or len(result.images) != expected or newSaves != 1:
+        sys.exit(1)
+
+def LegacyFrameOffset(file: str) -> tuple[int, int]:
+    '''
+    以前のInsertImageの連番のコマ数の求め方. コマ数とglobの回数を返す
+    '''
+    globCount: int = 0
+    trim = 0
+    m = re.match(r"(.*)(\d+)\.(\w+)", file)
+    if m:
+        trim = int(m.group(2))
+        for i in range(0, trim):
+            globCount += 1
+            if len(glob.glob(f"{m.group(1)}*{i}.{m.group(3)}")) == 0:
+                trim -= 1
+                break
+    return trim, globCount
+
+def BenchSequence(args: argparse.Namespace) -> None:
+    '''
+    連番画像を挿入する時に、何コマ目かを求める時間を以前の実装と比較する。
+    '''
+    imageDir: str = tempfile.mkdtemp(prefix="sequence", dir=WORK_DIR)
+    imagePaths: list[str] = []
+    expected: list[int] = []
+    for i in range(args.frames):
+        # 1から始まる連番と0から始まる連番. どちらもiコマ目
+        for name in (f"face_{i + 1}.png", f"blink{i:04d}.png"):
+            imagePath: str = os.path.join(imageDir, name)
+            with open(imagePath, "wb") as f:
+                f.write(b"")
+            imagePaths.append(imagePath)
+            expected.append(i)
+    for j in range(args.others):
+        with open(os.path.join(imageDir, f"other{chr(97 + j % 26)}{j}.png"), "wb") as f:
+            f.write(b"")
+    rng: random.Random = random.Random(args.seed)
+    inserts: list[int] = [rng.randrange(len(imagePaths)) for _ in range(args.inserts)]
+    start: float = time.perf_counter()
+    globCount: int = 0
+    legacyOffsets: list[int] = []
+    for index in inserts:
+        offset, count = LegacyFrameOffset(imagePaths[index])
+        legacyOffsets.append(offset)
+        globCount += count
+    legacy: float = time.perf_counter() - start
+    index: VoiceInserter.ImageSequenceIndex = VoiceInserter.ImageSequenceIndex()
+    start = time.perf_counter()
+    offsets: list[int] = [index.GetFrameOffset(imagePaths[i]) for i in inserts]
+    new: float = time.perf_counter() - start
+    # ファイルを追加するとフォルダの更新日時が変わり、索引が作り直される
+    with open(os.path.join(imageDir, "face_0.png"), "wb") as f:
+        f.write(b"")
+    os.utime(imageDir, ns=(time.time_ns(), time.time_ns() + 10**9))
+    rescanned: bool = index.GetFrameOffset(imagePaths[0]) == 1
+    mismatched: int = sum(1 for i, offset in zip(inserts, offsets) if offset != expected[i])
+    legacyMismatched: int = sum(1 for i, offset in zip(inserts, legacyOffsets) if offset != expected[i])
+    print(f"frames: {args.frames} x 2 sequences, others: {args.others}, inserts: {args.inserts}")
+    print(f"legacy   {legacy / args.inserts * 1e6:10.1f}us/insert, globs {globCount}, wrong offsets {legacyMismatched}")
+    print(f"index    {new / args.inserts * 1e6:10.1f}us/insert, directory scans {index.scanCount - 1}, wrong offsets {mismatched}")
+    print(f"rescanned after update: {rescanned}")
+    if mismatched or not rescanned:
+        sys.exit(1)
+
+def BenchPicker(args: argparse.Namespace) -> None:
+    '''
+    表情名を1文字ずつ入力して絞り込む時間を、毎回すべての名前を調べる場合と索引を使う場合で比較する。
+    一覧の表示は見えているセルだけを描画するので、描画するセル数も表示する。
+    追加と削除で索引を作り直さずに結果が変わらないことも確認する。
+    '''
+    rng: random.Random = random.Random(args.seed)
+    words: list[str] = ["smile", "angry", "sad", "surprised", "normal", "blink", "shy", "sleepy"]
+    # サブフォルダ付きの名前と、フォルダ直下の名前を混ぜる
+    names: list[str] = [f"pose{rng.randrange(5)}/{rng.choice(words)} {i}" if i % 4 else f"{rng.choice(words)} {i}" for i in range(args.expressions)]
+    queries: list[str] = ["s", "sm", "smi", "smil", "smile", "smile 1", "p", "po", "pose3", "pose3/", "pose3/a", "ng", "ngr"]
+    start: float = time.perf_counter()
+    for _ in range(args.repeat):
+        for query in queries:
+            legacyResult: list[str] = [name for name in names if query in name.lower()]
+    legacy: float = time.perf_counter() - start
+    index: VoiceInserter.ExpressionIndex = VoiceInserter.ExpressionIndex(names)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for query in queries:
+            result: list[str] = index.Search(query)
+    new: float = time.perf_counter() - start
+    mismatched: int = 0
+    for query in queries:
+        if sorted(index.Search(query)) != sorted(name for name in names if query in name.lower()):
+            mismatched += 1
+    # 前方一致が先に並ぶこと
+    found: list[str] = index.Search("a")
+    prefixCount: int = sum(1 for name in found if name.lower().startswith("a"))
+    ordered: bool = all(name.lower().startswith("a") for name in found[:prefixCount]) and 0 < prefixCount < len(found)
+    added: str = "pose9/zzz extra"
+    index.Add(added)
+    index.Remove(names[0])
+    updated: bool = added in index.Search("zzz") and names[0] not in index.Search(names[0]) and len(index) == len(names)
+    print(f"expressions: {args.expressions}, keystrokes: {len(queries) * args.repeat}")
+    print(f"scan all {legacy / (len(queries) * args.repeat) * 1e6:8.1f}us/keystroke")
+    print(f"index    {new / (len(queries) * args.repeat) * 1e6:8.1f}us/keystroke")
+    columns: int = 400 // VoiceInserter.ExpressionPicker.CELL_WIDTH
+    print(f"cells drawn: {min(len(names), columns * (VoiceInserter.ExpressionPicker.VISIBLE_ROWS + 1))} of {len(names)} (400px wide picker)")
+    print(f"mismatched queries: {mismatched}, prefix first: {ordered}, add/remove without rebuild: {updated}")
+    if mismatched or not ordered or not updated:
+        sys.exit(1)
+
+def MakeFontTable(names: list[tuple[int, int, int, int, str]]) -> bytes:
+    '''
+    nameテーブルを作成する。namesは(platformID, encodingID, languageID, nameID, 文字列)
+    '''
+    storage: bytearray = bytearray()
+    records: bytearray = bytearray()
+    for platformID, encodingID, languageID, nameID, string in names:
+        data: bytes = string.encode("mac_roman" if platformID == 1 else "utf-16-be")
+        records += struct.pack(">6H", platformID, encodingID, languageID, nameID, len(data), len(storage))
+        storage += data
+    return struct.pack(">3H", 0, len(names), 6 + len(records)) + bytes(records) + bytes(storage)
+
+def MakeFontFace(family: str, style: str, japanese: str, paddingBytes: int) -> dict[str, bytes]:
+    '''
+    フォント1つ分のテーブルを作成する。グリフの代わりに指定した大きさのダミーのテーブルを入れる
+    '''
+    names: list[tuple[int, int, int, int, str]] = [(1, 0, 0, 0, "Copyright"), (1, 0, 0, 1, family), (1, 0, 0, 2, style)]
+    for nameID, value in ((0, "Copyright"), (1, family), (2, style), (3, f"{family}-{style}-unique"), (4, f"{family} {style}"), (5, "Version 1.0"), (6, f"{family}-{style}"), (13, "License text " * 8), (16, family), (17, style)):
+        names.append((3, 1, 0x0409, nameID, value))
+    names += [(3, 1, 0x0411, 1, japanese), (3, 1, 0x0411, 16, japanese), (3, 1, 0x0411, 2, style), (3, 1, 0x0411, 17, style)]
+    # 実際のフォントのように、ほかの言語の名前も入れる
+    for languageID in (0x0407, 0x040C, 0x0410, 0x0412, 0x0404, 0x0804, 0x0C0A, 0x0419):
+        for nameID, value in ((1, family), (2, style), (4, f"{family} {style}")):
+            names.append((3, 1, languageID, nameID, value))
+    names.sort(key=lambda name: name[:4])
+    return {"OS/2": bytes(96), "cmap": bytes(64), "glyf": bytes(paddingBytes), "head": bytes(54), "name": MakeFontTable(names)}
+
+def MakeFontFile(faces: list[dict[str, bytes]]) -> bytes:
+    '''
+    フォントファイルを作成する。facesが2つ以上ならttcにする
+    '''
+    headerSize: int = 12 + 4 * len(faces) if len(faces) > 1 else 0
+    directorySize: int = sum(12 + 16 * len(face) for face in faces)
+    body: bytearray = bytearray()
+    directories: list[bytes] = []
+    offset: int = headerSize + directorySize
+    for face in faces:
+        directory: bytearray = bytearray(struct.pack(">IHHHH", 0x00010000, len(face), 0, 0, 0))
+        for tag in sorted(face):
+            data: bytes = face[tag]
+            directory += struct.pack(">4sIII", tag.encode("ascii"), 0, offset + len(body), len(data))
+            body += data + bytes(-len(data) % 4)
+        directories.append(bytes(directory))
+    header: bytes = b""
+    if len(faces) > 1:
+        faceOffsets: list[int] = []
+        position: int = headerSize
+        for directory in directories:
+            faceOffsets.append(position)
+            position += len(directory)
+        header = struct.pack(f">4sII{len(faces)}I", b"ttcf", 0x00010000, len(faces), *faceOffsets)
+    return header + b"".join(directories) + bytes(body)
+
+def MakeFontCorpus(fontDir: str, files: int, paddingBytes: int, seed: int) -> int:
+    '''
+    合成したフォントファイルを作成する。4つに1つはttcにする
+
+    Returns: int
+        作成したフォントファミリーの数
+    '''
+    rng: random.Random = random.Random(seed)
+    families: int = 0
+    for i in range(files):
+        # 同じフォルダに大量に置くとOSのフォントフォルダに近くなる. サブフォルダも少し作る
+        directory: str = os.path.join(fontDir, f"sub{i % 3}") if i % 10 == 0 else fontDir
+        os.makedirs(directory, exist_ok=True)
+        family: str = f"Synth{i:04d}"
+        if i % 4 == 0:
+            faces: list[dict[str, bytes]] = [MakeFontFace(f"{family}{chr(65 + j)}", "Regular", f"合成{i}{chr(65 + j)}", paddingBytes) for j in range(rng.randint(2, 4))]
+            families += len(faces)
+            fileName: str = f"synth{i:04d}.ttc"
+        else:
+            faces = [MakeFontFace(family, rng.choice(["Regular", "Bold", "Italic", "Light"]), f"合成{i}", paddingBytes)]
+            families += 1
+            fileName = f"synth{i:04d}.ttf"
+        with open(os.path.join(directory, fileName), "wb") as f:
+            f.write(MakeFontFile(faces))
+    return families
+
+def LegacyParseFontFile(fileName: str) -> list[list[Any]]:
+    '''
+    以前のフォントファイルの読み込み. 2バイトずつseekとreadをする。結果の確認と速度の比較に使う
+
+    Parameters:
+    fileName: str
+        .ttfまたは.ttcのパス
+
+    Returns: list[list[Any]]
+        フォントごとの[ttc内の番号, フォント名, 表示フォント名, スタイル名, 表示スタイル名]。スタイルが無ければスタイル名はNone
+    '''
+    JAPANESE_NAME: Final = 0
+    ENGLISH_NAME: Final = 1
+    FONT_ID: Final = (1, 16)
+    STYLE_ID: Final = (2, 17)
+    ttfEndian: Literal['little', 'big'] = "big"
+    records: list[list[Any]] = []
+    try:
+        with open(fileName, "rb") as f:
+            # nameテーブルの検索
+            nameOffset: int | None = None
+            version: int = int.from_bytes(f.read(4), ttfEndian)
+            if version == 0x00010000:
+                offsetTable: list[int] = [0x0]
+            elif version == 0x74746366: # ttcf
+                offsetTable = []
+                f.seek(4, 1)
+                numFonts: int = int.from_bytes(f.read(4), ttfEndian)
+                for i in range(numFonts):
+                    offsetTable.append(int.from_bytes(f.read(4), ttfEndian))
+            else:
+                print(f"Unknown font file version: {version} in {fileName}")
+                return records
+            for fontIndex, offset in enumerate(offsetTable):
+                f.seek(offset, 0)
+                version = int.from_bytes(f.read(4), ttfEndian) 
+                if version != 0x00010000:
+                    print(f"Unknown font sub file version: {version} in {fileName}")
+                    continue
+                tableCount: int = int.from_bytes(f.read(2), ttfEndian)
+                f.seek(6, 1)
+                for i in range(tableCount):
+                    try:
+                        tagName: str = f.read(4).decode("ascii")
+                    except UnicodeDecodeError as e:
+                        print(f"{fileName}: UnicodeDecodeError in table tag name pos: 0x{f.tell() - 4:x}")
+                        return records
+
+                    if tagName == 'name':
+                        f.seek(4, 1)
+                        nameOffset = int.from_bytes(f.read(4), ttfEndian)
+                        break
+                    f.seek(12, 1)
+                if nameOffset is None:
+                    continue
+                f.seek(nameOffset, 0)
+                # フォント名とスタイル名の検索
+                f.seek(2, 1)
+                nameRecordCount: int = int.from_bytes(f.read(2), ttfEndian)
+                storageOffset: int = int.from_bytes(f.read(2), ttfEndian)
+                nameRecordOffset: int = f.tell()
+                nameRecordLength: int = 12
+
+                fonts: dict[int, list[str]] = {}
+                styles: dict[int, list[str]] = {}
+                for i in range(nameRecordCount):
+                    f.seek(nameRecordOffset + nameRecordLength * i, 0)
+                    platformID: int = int.from_bytes(f.read(2), ttfEndian)
+                    encodingID: int = int.from_bytes(f.read(2), ttfEndian)
+                    languageID: int = int.from_bytes(f.read(2), ttfEndian)
+                    nameID: int = int.from_bytes(f.read(2), ttfEndian)
+                    length: int = int.from_bytes(f.read(2), ttfEndian)
+                    stringOffset: int = int.from_bytes(f.read(2), ttfEndian)
+                    if not nameID in FONT_ID and not nameID in STYLE_ID:
+                        continue
+                    f.seek(nameOffset + storageOffset + stringOffset, 0)
+                    data = f.read(length)
+                    if platformID == 0 or (platformID == 3 and encodingID == 1):
+                        string: str = data.decode("utf-16-be")
+                    elif platformID == 1 and encodingID == 0:
+                        string = data.decode("mac_roman")
+                    elif platformID == 1 and encodingID == 1 or platformID == 3 and encodingID == 2:
+                        string = data.decode("shift_jis")
+                    else:
+                        continue
+                    if platformID == 0:
+                        japaneseLanguageIDList: list[int] = [0]
+                        englishLanguageIDList: list[int] = [0]
+                    elif platformID == 1:
+                        japaneseLanguageIDList = [11]
+                        englishLanguageIDList = [0]
+                    elif platformID == 3:
+                        japaneseLanguageIDList = [0x0411, 0x0011, 0x0811]
+                        englishLanguageIDList = [0x1000, 0x0409]
+                    else:
+                        continue
+                    if nameID in FONT_ID:
+                        if nameID not in fonts:
+                            fonts[nameID] = ["", ""]
+                        # 日本語
+                        if languageID in japaneseLanguageIDList:
+                            fonts[nameID][JAPANESE_NAME] = string
+                        # 英語.
+                        if languageID in englishLanguageIDList:
+                            fonts[nameID][ENGLISH_NAME] = string
+                    elif nameID in STYLE_ID:
+                        if nameID not in styles:
+                            styles[nameID] = ["", ""]
+                        # 日本語
+                        if languageID in japaneseLanguageIDList:
+                            styles[nameID][JAPANESE_NAME] = string
+                        # 英語.
+                        if languageID in englishLanguageIDList:
+                            styles[nameID][ENGLISH_NAME] = string
+                if len(fonts) > 0:
+                    if FONT_ID[1] in fonts:
+                        font: str = fonts[FONT_ID[1]][ENGLISH_NAME] if fonts[FONT_ID[1]][ENGLISH_NAME] != "" else fonts[FONT_ID[1]][JAPANESE_NAME]
+                        dispFont: str = fonts[FONT_ID[1]][JAPANESE_NAME] if fonts[FONT_ID[1]][JAPANESE_NAME] != "" else fonts[FONT_ID[1]][ENGLISH_NAME]
+                    else:
+                        font = fonts[FONT_ID[0]][ENGLISH_NAME] if fonts[FONT_ID[0]][ENGLISH_NAME] != "" else fonts[FONT_ID[0]][JAPANESE_NAME]
+                        dispFont = fonts[FONT_ID[0]][JAPANESE_NAME] if fonts[FONT_ID[0]][JAPANESE_NAME] != "" else fonts[FONT_ID[0]][ENGLISH_NAME]
+                    if len(styles) > 0:
+                        if STYLE_ID[1] in styles:
+                            style: str = styles[STYLE_ID[1]][ENGLISH_NAME] if styles[STYLE_ID[1]][ENGLISH_NAME] != "" else styles[STYLE_ID[1]][JAPANESE_NAME]
+                            dispStyle: str = styles[STYLE_ID[1]][JAPANESE_NAME] if styles[STYLE_ID[1]][JAPANESE_NAME] != "" else styles[STYLE_ID[1]][ENGLISH_NAME]
+                        else:
+                            style = styles[STYLE_ID[0]][ENGLISH_NAME] if styles[STYLE_ID[0]][ENGLISH_NAME] != "" else styles[STYLE_ID[0]][JAPANESE_NAME]
+                            dispStyle = styles[STYLE_ID[0]][JAPANESE_NAME] if styles[STYLE_ID[0]][JAPANESE_NAME] != "" else styles[STYLE_ID[0]][ENGLISH_NAME]
+                        records.append([fontIndex, font, dispFont, style, dispStyle])
+                    else:
+                        records.append([fontIndex, font, dispFont, None, None])
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"フォントを読み込めませんでした: {fileName}: {e}")
+    return records
+
+def BenchFonts(args: argparse.Namespace) -> None:
+    '''
+    合成したフォントで、フォントファイルの読み込み時間を以前の実装と比較し、
+    フォント一覧の作成時間を索引がない場合・ある場合・一部のファイルが変わった場合で比較する。
+    また、別スレッドでの読み込みが呼び出し側をどれだけ待たせるかを計る。
+    '''
+    fontDir: str = tempfile.mkdtemp(prefix="fonts", dir=WORK_DIR)
+    families: int = MakeFontCorpus(fontDir, args.files, args.padding * 1024, args.seed)
+    filePaths: list[str] = [filePath for filePath, _, _ in VoiceInserter.FontList.ListFontFiles([fontDir])]
+    start: float = time.perf_counter()
+    legacyRecords: list[list[list]] = [LegacyParseFontFile(filePath) for filePath in filePaths]
+    legacy: float = time.perf_counter() - start
+    start = time.perf_counter()
+    newRecords: list[list[list]] = [VoiceInserter.FontList.ParseFontFile(filePath) for filePath in filePaths]
+    serial: float = time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        parallelRecords: list[list[list]] = list(executor.map(VoiceInserter.FontList.ParseFontFile, filePaths))
+    parallel: float = time.perf_counter() - start
+    mismatched: int = sum(1 for a, b, c in zip(legacyRecords, newRecords, parallelRecords) if not a == b == c)
+    print(f"font files: {len(filePaths)} ({args.padding}KB each), families: {families}")
+    print(f"legacy parse {legacy * 1000:8.2f}ms")
+    print(f"mmap parse   {serial * 1000:8.2f}ms")
+    print(f"mmap x{args.workers:<7} {parallel * 1000:8.2f}ms ({args.workers} threads)")
+    print(f"mismatched files: {mismatched}")
+    if mismatched:
+        sys.exit(1)
+    indexFile: str = os.path.join(WORK_DIR, "fontIndexBench.json")
+    results: list[tuple[str, float, int, dict[str, VoiceInserter.FontList.FontStyles]]] = []
+    def Fetch(label: str) -> None:
+        start: float = time.perf_counter()
+        fonts: dict[str, VoiceInserter.FontList.FontStyles] = VoiceInserter.FontList.FetchFonts([fontDir], indexFile)
+        results.append((label, time.perf_counter() - start, VoiceInserter.FontList.parsedFileCount, fonts))
+    Fetch("no index")
+    Fetch("index")
+    fontFiles: list[tuple[str, int, int]] = VoiceInserter.FontList.ListFontFiles([fontDir])
+    for filePath, _, _ in fontFiles[:args.changed]:
+        os.utime(filePath, ns=(time.time_ns(), time.time_ns() + 10**9))
+    Fetch(f"{args.changed} changed")
+    for label, seconds, parsed, fonts in results:
+        print(f"{label:<12} {seconds * 1000:8.2f}ms, parsed files {parsed}, fonts {len(fonts)}")
+    first: dict[str, VoiceInserter.FontList.FontStyles] = results[0][3]
+    same: bool = all(fonts.keys() == first.keys() and all(fonts[name].files == first[name].files for name in fonts) for _, _, _, fonts in results)
+    print(f"same fonts: {same}")
+    if not same or len(first) != families or results[1][2] != 0 or results[2][2] != args.changed:
+        sys.exit(1)
+    # 起動時と同じく索引がない状態から別スレッドで読み込み、呼び出し側が待たされる時間と揃うまでの時間を比べる
+    os.remove(indexFile)
+    start = time.perf_counter()
+    installedFonts: VoiceInserter.FontList = VoiceInserter.FontList()
+    installedFonts.FetchInBackground([fontDir], indexFile)
+    returned: float = time.perf_counter() - start
+    readyBefore: bool = installedFonts.IsReady()
+    dispFonts: list[str] = installedFonts.dispFonts
+    ready: float = time.perf_counter() - start
+    print(f"background   {returned * 1000:8.2f}ms to return, {ready * 1000:8.2f}ms until ready (ready on return: {readyBefore})")
+    if sorted(dispFonts) != sorted(first.keys()):
+        sys.exit(1)
+
+def Main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="VoiceInserterのベンチマーク")
+    subParsers = parser.add_subparsers(dest="command", required=True)
+    insertParser: argparse.ArgumentParser = subParsers.add_parser("insert", help="FakeResolve上での挿入速度")
+    insertParser.add_argument("--lines", type=int, default=100, help="挿入する行数")
+    insertParser.add_argument("--characters", type=int, default=2, help="交互に挿入するキャラ数")
+    insertParser.add_argument("--fps", default="30", help="タイムラインのフレームレート(29.97なども可)")
+    insertParser.add_argument("--drop-frame", action="store_true", help="ドロップフレームタイムコードを使う")
+    insertParser.add_argument("--latency", type=float, default=0.0, help="API呼び出し1回あたりの疑似遅延(秒)")
+    insertParser.add_argument("--voice-only", action="store_true", help="話している間だけ画像を表示する")
+    insertParser.add_argument("--subtitle", action="store_true", help="字幕をFusionテキストではなく字幕トラックに出力する")
+    insertParser.add_argument("--text-image", action="store_true", help="字幕を画像に描画して静止画として置く(Pillowが必要)")
+    insertParser.add_argument("--background", type=float, default=0.0, help="挿入前にVideo 1へ置いておく背景クリップの長さ(秒)")
+    insertParser.add_argument("--trim-in-place", action="store_true", help="タイムラインアイテムのSetEndを使える状態にする")
+    insertParser.add_argument("--profile", action="store_true", help="API呼び出しごとの計測結果も表示する")
+    insertParser.add_argument("--seed", type=int, default=0, help="音声の長さを決める乱数のシード")
+    insertParser.set_defaults(func=BenchInsert)
+    timecodeParser: argparse.ArgumentParser = subParsers.add_parser("timecode", help="タイムコード変換の速度と正しさ")
+    timecodeParser.add_argument("--fps", default="29.97", help="計測するフレームレート")
+    timecodeParser.add_argument("--drop-frame", action="store_true", help="ドロップフレームタイムコードを使う")
+    timecodeParser.add_argument("--count", type=int, default=100000, help="計測する変換回数")
+    timecodeParser.add_argument("--samples", type=int, default=20000, help="性質の確認でフレームレートごとに試す個数")
+    timecodeParser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    timecodeParser.set_defaults(func=BenchTimecode)
+    bulkParser: argparse.ArgumentParser = subParsers.add_parser("bulk", help="FCPXMLでまとめて取り込んだ場合の速度")
+    bulkParser.add_argument("--lines", type=int, default=200, help="挿入する行数")
+    bulkParser.add_argument("--characters", type=int, default=2, help="交互に挿入するキャラ数")
+    bulkParser.add_argument("--fps", default="30", help="タイムラインのフレームレート")
+    bulkParser.add_argument("--drop-frame", action="store_true", help="ドロップフレームタイムコードを使う")
+    bulkParser.add_argument("--latency", type=float, default=0.001, help="API呼び出し1回あたりの疑似遅延(秒)")
+    bulkParser.add_argument("--voice-only", action="store_true", help="話している間だけ画像を表示する")
+    bulkParser.add_argument("--subtitle", action="store_true", help="字幕をFusionテキストではなく字幕トラックに出力する")
+    bulkParser.add_argument("--text-image", action="store_true", help="字幕を画像に描画して静止画として置く(Pillowが必要)")
+    bulkParser.add_argument("--seed", type=int, default=0, help="音声の長さを決める乱数のシード")
+    bulkParser.set_defaults(func=BenchBulk)
+    pipelineParser: argparse.ArgumentParser = subParsers.add_parser("pipeline", help="合成と挿入を並行させた場合の速度")
+    pipelineParser.add_argument("--lines", type=int, default=50, help="挿入する行数")
+    pipelineParser.add_argument("--characters", type=int, default=2, help="交互に挿入するキャラ数")
+    pipelineParser.add_argument("--synthesis", type=float, default=0.2, help="1行の音声合成に掛かる疑似時間(秒)")
+    pipelineParser.add_argument("--workers", type=int, default=2, help="合成を行うワーカースレッド数")
+    pipelineParser.add_argument("--phrases", type=int, default=0, help="0より大きければ、この数の決まり文句を繰り返して同じ音声の使い回しを計測する")
+    pipelineParser.add_argument("--fps", default="30", help="タイムラインのフレームレート")
+    pipelineParser.add_argument("--latency", type=float, default=0.001, help="API呼び出し1回あたりの疑似遅延(秒)")
+    pipelineParser.add_argument("--seed", type=int, default=0, help="音声の長さを決める乱数のシード")
+    pipelineParser.set_defaults(func=BenchPipeline)
+    layoutParser: argparse.ArgumentParser = subParsers.add_parser("layout", help="掛け合いの配置計算の速度と正しさ")
+    layoutParser.add_argument("--lines", type=int, default=10000, help="配置する行数")
+    layoutParser.add_argument("--characters", type=int, default=3, help="ランダムに話すキャラ数")
+    layoutParser.add_argument("--fps", default="30", help="タイムラインのフレームレート")
+    layoutParser.add_argument("--voice-only-ratio", type=float, default=0.3, help="話している間だけ画像を表示する行の割合")
+    layoutParser.add_argument("--repeat", type=int, default=20, help="計測の繰り返し回数")
+    layoutParser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    layoutParser.set_defaults(func=BenchLayout)
+    stemParser: argparse.ArgumentParser = subParsers.add_parser("stem", help="キャラごとの音声の書き出し速度")
+    stemParser.add_argument("--lines", type=int, default=500, help="書き出す行数")
+    stemParser.add_argument("--characters", type=int, default=2, help="交互に話すキャラ数")
+    stemParser.add_argument("--fps", default="30", help="タイムラインのフレームレート")
+    stemParser.add_argument("--pause", type=int, default=10, help="行の後に空ける間(フレーム)")
+    stemParser.add_argument("--overlap", type=int, default=15, help="前の行に重ねる長さ(フレーム)")
+    stemParser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    stemParser.set_defaults(func=BenchStem)
+    outDirParser: argparse.ArgumentParser = subParsers.add_parser("outdir", help="出力先のファイル名を決める速度")
+    outDirParser.add_argument("--existing", type=int, default=2000, help="あらかじめ置いておく同じ名前のファイル数")
+    outDirParser.add_argument("--names", type=int, default=200, help="新しく決めるファイル名の数")
+    outDirParser.add_argument("--workers", type=int, default=4, help="同時に確保するスレッド数とプロセス数")
+    outDirParser.set_defaults(func=BenchOutDir)
+    settingsParser: argparse.ArgumentParser = subParsers.add_parser("settings", help="設定の保存の速度と回数")
+    settingsParser.add_argument("--changes", type=int, default=200, help="続けて変更する回数")
+    settingsParser.add_argument("--interval", type=float, default=0.01, help="変更の間隔(秒)")
+    settingsParser.add_argument("--characters", type=int, default=50, help="起動時に読み込むキャラの数")
+    settingsParser.set_defaults(func=BenchSettings)
+    resampleParser: argparse.ArgumentParser = subParsers.add_parser("resample", help="音声のサンプルレート変換の速度と精度")
+    resampleParser.add_argument("--lines", type=int, default=20, help="変換する行数")
+    resampleParser.add_argument("--seconds", type=float, default=3.0, help="1行の長さ(秒)")
+    resampleParser.add_argument("--rate", type=int, default=48000, help="変換後のサンプルレート")
+    resampleParser.add_argument("--frequency", type=float, default=1000.0, help="精度の確認に使う正弦波の周波数")
+    resampleParser.set_defaults(func=BenchResample)
+    importParser: argparse.ArgumentParser = subParsers.add_parser("import", help="音声ファイルをまとめて取り込んだ場合の速度")
+    importParser.add_argument("--files", type=int, default=200, help="取り込むファイル数")
+    importParser.add_argument("--fps", default="30", help="タイムラインのフレームレート")
+    importParser.add_argument("--latency", type=float, default=0.001, help="API呼び出し1回あたりの疑似遅延(秒)")
+    importParser.add_argument("--seed", type=int, default=0, help="音声の長さを決める乱数のシード")
+    importParser.set_defaults(func=BenchImport)
+    thumbnailParser: argparse.ArgumentParser = subParsers.add_parser("thumbnail", help="表情画像を切り替えた時の表示の速度")
+    thumbnailParser.add_argument("--images", type=int, default=10, help="表情画像の数")
+    thumbnailParser.add_argument("--width", type=int, default=2000, help="表情画像の横幅")
+    thumbnailParser.add_argument("--height", type=int, default=4000, help="表情画像の高さ")
+    thumbnailParser.add_argument("--switches", type=int, default=50, help="表情を切り替える回数")
+    thumbnailParser.set_defaults(func=BenchThumbnail)
+    libraryParser: argparse.ArgumentParser = subParsers.add_parser("library", help="表情画像のフォルダをまとめて取り込む速度")
+    libraryParser.add_argument("--images", type=int, default=300, help="画像の組の数(1組で番号違いの画像3枚)")
+    libraryParser.add_argument("--folders", type=int, default=4, help="サブフォルダの数")
+    libraryParser.add_argument("--workers", type=int, default=8, help="同時に列挙するフォルダ数")
+    libraryParser.set_defaults(func=BenchLibrary)
+    sequenceParser: argparse.ArgumentParser = subParsers.add_parser("sequence", help="連番画像の何コマ目かを求める速度")
+    sequenceParser.add_argument("--frames", type=int, default=200, help="連番のコマ数")
+    sequenceParser.add_argument("--others", type=int, default=500, help="同じフォルダのほかの画像の数")
+    sequenceParser.add_argument("--inserts", type=int, default=100, help="挿入する回数")
+    sequenceParser.add_argument("--seed", type=int, default=0, help="挿入する画像を選ぶ乱数のシード")
+    sequenceParser.set_defaults(func=BenchSequence)
+    pickerParser: argparse.ArgumentParser = subParsers.add_parser("picker", help="表情名で絞り込む速度")
+    pickerParser.add_argument("--expressions", type=int, default=500, help="表情の数")
+    pickerParser.add_argument("--repeat", type=int, default=20, help="入力を繰り返す回数")
+    pickerParser.add_argument("--seed", type=int, default=0, help="表情名を決める乱数のシード")
+    pickerParser.set_defaults(func=BenchPicker)
+    fontsParser: argparse.ArgumentParser = subParsers.add_parser("fonts", help="フォント一覧の作成速度")
+    fontsParser.add_argument("--files", type=int, default=1000, help="合成するフォントファイルの数")
+    fontsParser.add_argument("--padding", type=int, default=64, help="フォントファイルに入れるダミーのグリフの大きさ(KB)")
+    fontsParser.add_argument("--changed", type=int, default=10, help="更新日時を変えるファイルの数")
+    fontsParser.add_argument("--workers", type=int, default=VoiceInserter.FontList.PARSE_WORKERS, help="並列に読み込むスレッド数")
+    fontsParser.add_argument("--seed", type=int, default=0, help="スタイルを決める乱数のシード")
+    fontsParser.set_defaults(func=BenchFonts)
+    args: argparse.Namespace = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    Main()
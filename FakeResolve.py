@@ -0,0 +1,706 @@
+'''
+Python Script
+FakeResolve
+VoiceInserterが使うDaVinci ResolveスクリプトAPIの一部をメモリ上で再現する。
+Resolveのない環境(Linuxなど)で挿入処理を動かし、ベンチマークや動作確認をするために使う。
+'''
+from __future__ import annotations
+import os
+import re
+import time
+import wave
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from fractions import Fraction
+from typing import Any, Callable
+
+class Context:
+    '''
+    1つのFakeResolveインスタンスで共有する状態。
+
+    Parameters:
+    latency: float
+        API呼び出し1回あたりに疑似的に掛ける時間(秒)
+    trimInPlace: bool
+        タイムラインアイテムがSetEndを持つか
+    '''
+    def __init__(self, latency: float = 0.0, trimInPlace: bool = False) -> None:
+        self.latency: float = latency
+        self.trimInPlace: bool = trimInPlace
+        self.calls: int = 0
+
+class FakeObject:
+    '''
+    大文字で始まるメソッドをAPI呼び出しとして数え、設定された遅延を掛ける。
+    '''
+    def __init__(self, context: Context) -> None:
+        object.__setattr__(self, "_context", context)
+
+    def __getattribute__(self, name: str) -> Any:
+        value: Any = object.__getattribute__(self, name)
+        if name[:1].isupper() and callable(value):
+            context: Context = object.__getattribute__(self, "_context")
+            def inner(*args, **kwargs) -> Any:
+                context.calls += 1
+                if context.latency > 0:
+                    time.sleep(context.latency)
+                return value(*args, **kwargs)
+            return inner
+        return value
+
+    def _Touch(self) -> None:
+        '''
+        プロパティの読み書きをAPI呼び出しとして数える。
+        '''
+        context: Context = object.__getattribute__(self, "_context")
+        context.calls += 1
+        if context.latency > 0:
+            time.sleep(context.latency)
+
+class Rate:
+    '''
+    フレームレート。29.97/59.94はドロップフレームにもできる。
+
+    Parameters:
+    fps: int | float | str
+        timelineFrameRateの設定値
+    dropFrame: bool
+        ドロップフレームタイムコードを使うか
+    '''
+    def __init__(self, fps: int | float | str, dropFrame: bool = False) -> None:
+        self.setting: int | float | str = fps
+        value: float = float(fps)
+        self.nominal: int = round(value)
+        self.exact: Fraction = Fraction(self.nominal) if value == self.nominal else Fraction(self.nominal * 1000, 1001)
+        self.drop: int = self.nominal // 15 if dropFrame and self.exact.denominator == 1001 else 0
+
+    def SecondsToFrames(self, seconds: float) -> int:
+        return max(-int(-(Fraction(seconds) * self.exact) // 1), 1)
+
+def ParseSrt(filePath: str) -> list[tuple[Fraction, Fraction, str]]:
+    '''
+    SRTファイルを(開始秒, 終了秒, テキスト)のリストにする
+    '''
+    def Seconds(time: str) -> Fraction:
+        h, m, s, ms = re.findall(r"\d+", time)
+        return Fraction(int(h) * 3600 + int(m) * 60 + int(s)) + Fraction(int(ms), 1000)
+    with open(filePath, encoding="utf-8-sig") as f:
+        blocks: list[str] = f.read().replace("\r\n", "\n").strip().split("\n\n")
+    cues: list[tuple[Fraction, Fraction, str]] = []
+    for block in blocks:
+        lines: list[str] = block.split("\n")
+        if len(lines) < 2 or "-->" not in lines[1]:
+            continue
+        start, end = lines[1].split("-->")
+        cues.append((Seconds(start), Seconds(end), "\n".join(lines[2:])))
+    return cues
+
+def TimecodeToFrames(timecode: str, rate: Rate) -> int:
+    h, m, s, f = re.findall(r"\d+", timecode)
+    frames: int = (int(h) * 3600 + int(m) * 60 + int(s)) * rate.nominal + int(f)
+    minutes: int = int(h) * 60 + int(m)
+    return frames - rate.drop * (minutes - minutes // 10)
+
+def FramesToTimecode(frames: int, rate: Rate) -> str:
+    separator: str = ":"
+    if rate.drop > 0:
+        # 10分ごとの塊と、その中の1分ごとの塊に分けて、飛ばしたフレーム番号を足し戻す
+        separator = ";"
+        tenMinutes, remainder = divmod(frames, rate.nominal * 600 - rate.drop * 9)
+        skipped: int = rate.drop * 9 * tenMinutes
+        if remainder >= rate.nominal * 60:
+            skipped += rate.drop * (1 + (remainder - rate.nominal * 60) // (rate.nominal * 60 - rate.drop))
+        frames += skipped
+    seconds, f = divmod(frames, rate.nominal)
+    minutes, s = divmod(seconds, 60)
+    h, m = divmod(minutes, 60)
+    return f"{h:02}:{m:02}:{s:02}{separator}{f:02}"
+
+class FusionOutput:
+    def __init__(self, tool: FusionTool) -> None:
+        self.tool: FusionTool = tool
+
+class FusionTool(FakeObject):
+    '''
+    Fusionのツール。入力は属性として読み書きする。
+    '''
+    def __init__(self, context: Context, toolID: str, name: str) -> None:
+        super().__init__(context)
+        object.__setattr__(self, "toolID", toolID)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "inputs", {})
+        object.__setattr__(self, "Output", FusionOutput(self))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._Touch()
+        self.inputs[name] = value
+
+    def __getattr__(self, name: str) -> Any:
+        if name[:1].isupper():
+            self._Touch()
+            return self.inputs.get(name)
+        raise AttributeError(name)
+
+    def GetInput(self, name: str) -> Any:
+        return self.inputs.get(name)
+
+    def SetInput(self, name: str, value: Any) -> bool:
+        self.inputs[name] = value
+        return True
+
+    def GetAttrs(self) -> dict[str, Any]:
+        return {"TOOLS_RegID": self.toolID, "TOOLS_Name": self.name}
+
+class FusionComp(FakeObject):
+    def __init__(self, context: Context) -> None:
+        super().__init__(context)
+        self.tools: list[FusionTool] = []
+        self.locked: bool = False
+        self.AddTool("MediaOut", 1000, 0)
+
+    def Lock(self) -> None:
+        self.locked = True
+
+    def Unlock(self) -> None:
+        self.locked = False
+
+    def AddTool(self, toolID: str, x: int = 0, y: int = 0) -> FusionTool:
+        count: int = sum(1 for tool in self.tools if tool.toolID == toolID)
+        tool: FusionTool = FusionTool(object.__getattribute__(self, "_context"), toolID, f"{toolID}{count + 1}")
+        self.tools.append(tool)
+        return tool
+
+    def FindToolByID(self, toolID: str) -> FusionTool | None:
+        for tool in self.tools:
+            if tool.toolID == toolID:
+                return tool
+        return None
+
+    def GetToolList(self, selected: bool = False) -> dict[int, FusionTool]:
+        return {i + 1: tool for i, tool in enumerate(self.tools)}
+
+class MediaPoolItem(FakeObject):
+    def __init__(self, context: Context, name: str, filePath: str, frames: int, fps: int | float | str, isFusion: bool = False) -> None:
+        super().__init__(context)
+        self.name: str = name
+        self.filePath: str = filePath
+        self.frames: int = frames
+        self.fps: int | float | str = fps
+        self.isFusion: bool = isFusion
+        # 静止画はResolveと同じく任意の長さで置ける
+        self.isStill: bool = False
+        self.properties: dict[str, Any] = {"File Path": filePath, "FPS": fps, "Frames": frames}
+        # 字幕ファイルの場合の(開始秒, 終了秒, テキスト)
+        self.subtitles: list[tuple[Fraction, Fraction, str]] | None = None
+
+    def GetName(self) -> str:
+        return self.name
+
+    def SetName(self, name: str) -> bool:
+        self.name = name
+        return True
+
+    def GetClipProperty(self, key: str | None = None) -> Any:
+        if key is None:
+            return dict(self.properties)
+        return self.properties.get(key, "")
+
+    def SetClipProperty(self, key: str, value: Any) -> bool:
+        self.properties[key] = value
+        return True
+
+class Folder(FakeObject):
+    def __init__(self, context: Context, name: str, parent: Folder | None = None) -> None:
+        super().__init__(context)
+        self.name: str = name
+        self.parent: Folder | None = parent
+        self.subFolders: list[Folder] = []
+        self.clips: list[MediaPoolItem] = []
+
+    def GetName(self) -> str:
+        return self.name
+
+    def GetSubFolders(self) -> dict[int, Folder]:
+        return {i + 1: folder for i, folder in enumerate(self.subFolders)}
+
+    def GetSubFolderList(self) -> list[Folder]:
+        return list(self.subFolders)
+
+    def GetClips(self) -> dict[int, MediaPoolItem]:
+        return {i + 1: clip for i, clip in enumerate(self.clips)}
+
+    def GetClipList(self) -> list[MediaPoolItem]:
+        return list(self.clips)
+
+class TimelineItem(FakeObject):
+    def __init__(self, context: Context, timeline: Timeline, mediaPoolItem: MediaPoolItem, trackType: str, trackIndex: int, start: int, duration: int, leftOffset: int) -> None:
+        super().__init__(context)
+        self.timeline: Timeline = timeline
+        self.mediaPoolItem: MediaPoolItem = mediaPoolItem
+        self.name: str = mediaPoolItem.name
+        self.trackType: str = trackType
+        self.trackIndex: int = trackIndex
+        self.start: int = start
+        self.duration: int = duration
+        self.leftOffset: int = leftOffset
+        self.properties: dict[str, Any] = {"Pan": 0.0, "Tilt": 0.0, "ZoomX": 1.0, "ZoomY": 1.0, "FlipX": False, "FlipY": False}
+        self.fusionComps: list[FusionComp] = [FusionComp(context)] if mediaPoolItem.isFusion else []
+
+    def GetName(self) -> str:
+        return self.name
+
+    def SetName(self, name: str) -> bool:
+        self.name = name
+        return True
+
+    def GetStart(self, subframe: bool = False) -> int:
+        return self.start
+
+    def GetEnd(self, subframe: bool = False) -> int:
+        return self.start + self.duration
+
+    def GetDuration(self, subframe: bool = False) -> int:
+        return self.duration
+
+    def GetLeftOffset(self, subframe: bool = False) -> int:
+        return self.leftOffset
+
+    def GetRightOffset(self, subframe: bool = False) -> int:
+        return max(self.mediaPoolItem.frames - self.leftOffset - self.duration, 0)
+
+    def GetTrackTypeAndIndex(self) -> list[Any]:
+        return [self.trackType, self.trackIndex]
+
+    def GetMediaPoolItem(self) -> MediaPoolItem:
+        return self.mediaPoolItem
+
+    def GetProperty(self, key: str | None = None) -> Any:
+        if key is None:
+            return dict(self.properties)
+        return self.properties.get(key)
+
+    def SetProperty(self, key: str, value: Any) -> bool:
+        self.properties[key] = value
+        return True
+
+    def GetFusionCompCount(self) -> int:
+        return len(self.fusionComps)
+
+    def AddFusionComp(self) -> FusionComp:
+        comp: FusionComp = FusionComp(object.__getattribute__(self, "_context"))
+        self.fusionComps.append(comp)
+        return comp
+
+    def GetFusionCompByIndex(self, index: int) -> FusionComp | None:
+        if 1 <= index <= len(self.fusionComps):
+            return self.fusionComps[index - 1]
+        return None
+
+class TrimmableTimelineItem(TimelineItem):
+    '''
+    終了フレームをその場で変更できるタイムラインアイテム。
+    SetEndを持つバージョンのResolveを再現する。
+    '''
+    def SetEnd(self, endFrame: int) -> bool:
+        duration: int = endFrame - self.start
+        if duration <= 0 or self.timeline._Track(self.trackType, self.trackIndex).locked:
+            return False
+        for item in self.timeline._Track(self.trackType, self.trackIndex).items:
+            if item is not self and item.start < endFrame and self.start < item.start + item.duration:
+                return False
+        self.duration = duration
+        return True
+
+class Track:
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.locked: bool = False
+        self.items: list[TimelineItem] = []
+
+class Timeline(FakeObject):
+    '''
+    タイムライン。既定ではResolveと同じく01:00:00:00から始まる。
+    '''
+    def __init__(self, context: Context, project: Project, name: str, rate: Rate, startTimecode: str = "01:00:00:00") -> None:
+        super().__init__(context)
+        self.project: Project = project
+        self.name: str = name
+        self.rate: Rate = rate
+        self.startFrame: int = TimecodeToFrames(startTimecode, rate)
+        self.currentFrame: int = self.startFrame
+        self.tracks: dict[str, list[Track]] = {"video": [Track("Video 1")], "audio": [Track("Audio 1")], "subtitle": []}
+        self.settings: dict[str, Any] = {"timelineFrameRate": rate.setting, "timelineDropFrameTimecode": "1" if rate.drop > 0 else "0", "timelineResolutionWidth": "1920", "timelineResolutionHeight": "1080"}
+
+    def _Track(self, trackType: str, index: int) -> Track | None:
+        tracks: list[Track] = self.tracks.get(trackType, [])
+        if 1 <= index <= len(tracks):
+            return tracks[index - 1]
+        return None
+
+    def _Place(self, mediaPoolItem: MediaPoolItem, trackType: str, trackIndex: int, start: int, duration: int, leftOffset: int) -> TimelineItem | None:
+        track: Track | None = self._Track(trackType, trackIndex)
+        if track is None or track.locked or duration <= 0:
+            return None
+        for item in track.items:
+            # 重なりがある場合は失敗させて、呼び出し側の位置計算の誤りを検出する
+            if item.start < start + duration and start < item.start + item.duration:
+                return None
+        context: Context = object.__getattribute__(self, "_context")
+        itemClass: type[TimelineItem] = TrimmableTimelineItem if context.trimInPlace else TimelineItem
+        newItem: TimelineItem = itemClass(context, self, mediaPoolItem, trackType, trackIndex, start, duration, leftOffset)
+        track.items.append(newItem)
+        track.items.sort(key=lambda item: item.start)
+        return newItem
+
+    def GetName(self) -> str:
+        return self.name
+
+    def GetSetting(self, key: str | None = None) -> Any:
+        if key is None:
+            return dict(self.settings)
+        return self.settings.get(key, "")
+
+    def SetSetting(self, key: str, value: Any) -> bool:
+        self.settings[key] = value
+        return True
+
+    def GetStartFrame(self) -> int:
+        return self.startFrame
+
+    def GetEndFrame(self) -> int:
+        return self._EndFrame()
+
+    def _EndFrame(self) -> int:
+        endFrame: int = self.startFrame
+        for tracks in self.tracks.values():
+            for track in tracks:
+                for item in track.items:
+                    endFrame = max(endFrame, item.start + item.duration)
+        return endFrame
+
+    def GetCurrentTimecode(self) -> str:
+        return FramesToTimecode(self.currentFrame, self.rate)
+
+    def SetCurrentTimecode(self, timecode: str) -> bool:
+        self.currentFrame = TimecodeToFrames(timecode, self.rate)
+        return True
+
+    def GetTrackCount(self, trackType: str) -> int:
+        return len(self.tracks.get(trackType, []))
+
+    def AddTrack(self, trackType: str, subTrackType: str | None = None) -> bool:
+        if trackType not in self.tracks:
+            return False
+        self.tracks[trackType].append(Track(f"{trackType.capitalize()} {len(self.tracks[trackType]) + 1}"))
+        return True
+
+    def GetTrackName(self, trackType: str, index: int) -> str:
+        track: Track | None = self._Track(trackType, index)
+        return track.name if track is not None else ""
+
+    def SetTrackName(self, trackType: str, index: int, name: str) -> bool:
+        track: Track | None = self._Track(trackType, index)
+        if track is None:
+            return False
+        track.name = name
+        return True
+
+    def GetIsTrackLocked(self, trackType: str, index: int) -> bool:
+        track: Track | None = self._Track(trackType, index)
+        return track.locked if track is not None else False
+
+    def SetTrackLock(self, trackType: str, index: int, locked: bool) -> bool:
+        track: Track | None = self._Track(trackType, index)
+        if track is None:
+            return False
+        track.locked = locked
+        return True
+
+    def GetItemsInTrack(self, trackType: str, index: int) -> dict[int, TimelineItem]:
+        track: Track | None = self._Track(trackType, index)
+        if track is None:
+            return {}
+        return {i + 1: item for i, item in enumerate(track.items)}
+
+    def GetItemListInTrack(self, trackType: str, index: int) -> list[TimelineItem]:
+        return list(self.GetItemsInTrack(trackType, index).values())
+
+    def DeleteClips(self, items: list[TimelineItem], ripple: bool = False) -> bool:
+        deleted: bool = True
+        for item in items:
+            track: Track | None = self._Track(item.trackType, item.trackIndex)
+            if track is None or track.locked or item not in track.items:
+                deleted = False
+                continue
+            track.items.remove(item)
+        return deleted
+
+    def InsertFusionCompositionIntoTimeline(self) -> TimelineItem | None:
+        '''
+        ロックされていない最もインデックスの小さいビデオトラックの再生位置に、5秒のFusionコンポジションを置く。
+        '''
+        for i, track in enumerate(self.tracks["video"]):
+            if track.locked:
+                continue
+            composition: MediaPoolItem = MediaPoolItem(object.__getattribute__(self, "_context"), "Fusion Composition", "", self.rate.nominal * 5, self.rate.setting, True)
+            return self._Place(composition, "video", i + 1, self.currentFrame, self.rate.nominal * 5, 0)
+        return None
+
+    def CreateFusionClip(self, items: TimelineItem | list[TimelineItem]) -> TimelineItem | None:
+        '''
+        指定したクリップをFusionクリップにまとめ、メディアプールの現在のフォルダにも追加する。
+        '''
+        if not isinstance(items, list):
+            items = [items]
+        if len(items) == 0:
+            return None
+        first: TimelineItem = items[0]
+        start: int = min(item.start for item in items)
+        end: int = max(item.start + item.duration for item in items)
+        if not self.DeleteClips(items):
+            return None
+        mediaPool: MediaPool = self.project.mediaPool
+        fusionClip: MediaPoolItem = MediaPoolItem(object.__getattribute__(self, "_context"), "Fusion Clip", "", end - start, self.rate.setting, True)
+        mediaPool.currentFolder.clips.append(fusionClip)
+        return self._Place(fusionClip, first.trackType, first.trackIndex, start, end - start, 0)
+
+class MediaPool(FakeObject):
+    def __init__(self, context: Context, project: Project) -> None:
+        super().__init__(context)
+        self.project: Project = project
+        self.rootFolder: Folder = Folder(context, "Master")
+        self.currentFolder: Folder = self.rootFolder
+
+    def GetRootFolder(self) -> Folder:
+        return self.rootFolder
+
+    def GetCurrentFolder(self) -> Folder:
+        return self.currentFolder
+
+    def SetCurrentFolder(self, folder: Folder) -> bool:
+        if not isinstance(folder, Folder):
+            return False
+        self.currentFolder = folder
+        return True
+
+    def AddSubFolder(self, parent: Folder, name: str) -> Folder:
+        folder: Folder = Folder(object.__getattribute__(self, "_context"), name, parent)
+        parent.subFolders.append(folder)
+        return folder
+
+    def CreateEmptyTimeline(self, name: str) -> Timeline:
+        timeline: Timeline = Timeline(object.__getattribute__(self, "_context"), self.project, name, self.project.rate)
+        self.project.timelines.append(timeline)
+        return timeline
+
+    def ImportMedia(self, filePaths: list[str]) -> list[MediaPoolItem]:
+        '''
+        ファイルを現在のフォルダに取り込む。
+        wavは長さを読み取り、その他は長さの制限がない静止画として扱う。
+        '''
+        imported: list[MediaPoolItem] = []
+        for filePath in filePaths:
+            if not os.path.exists(filePath):
+                continue
+            frames: int = 1
+            properties: dict[str, Any] = {}
+            subtitles: list[tuple[Fraction, Fraction, str]] | None = None
+            if filePath.lower().endswith(".srt"):
+                subtitles = ParseSrt(filePath)
+                if len(subtitles) == 0:
+                    continue
+                properties["Type"] = "Subtitle"
+                frames = self.project.rate.SecondsToFrames(float(subtitles[-1][1]))
+            elif filePath.lower().endswith(".wav"):
+                with wave.open(filePath, "rb") as wavFile:
+                    seconds: float = wavFile.getnframes() / wavFile.getframerate()
+                    properties["Sample Rate"] = wavFile.getframerate()
+                frames = self.project.rate.SecondsToFrames(seconds)
+            item: MediaPoolItem = MediaPoolItem(object.__getattribute__(self, "_context"), os.path.basename(filePath), filePath, frames, self.project.rate.setting)
+            item.properties.update(properties)
+            item.subtitles = subtitles
+            item.isStill = subtitles is None and not filePath.lower().endswith(".wav")
+            self.currentFolder.clips.append(item)
+            imported.append(item)
+        return imported
+
+    def ImportTimelineFromFile(self, filePath: str, importOptions: dict[str, Any] | None = None) -> Timeline | None:
+        '''
+        FCPXMLを新しいタイムラインとして取り込む。
+        スパインはトラック1、正のレーンnはビデオトラックn+1、負のレーン-nはオーディオトラックn+1に置く。
+        importSourceClipsが指定されていれば、素材を現在のフォルダに取り込む。
+        '''
+        importOptions = importOptions or {}
+        try:
+            root: ET.Element = ET.parse(filePath).getroot()
+        except (OSError, ET.ParseError):
+            return None
+        sequence: ET.Element | None = root.find("./library/event/project/sequence")
+        if root.tag != "fcpxml" or sequence is None:
+            return None
+        context: Context = object.__getattribute__(self, "_context")
+        rate: Rate = self.project.rate
+        def Frames(value: str) -> int:
+            return round(Fraction(value.rstrip("s")) * rate.exact)
+        # 素材
+        assets: dict[str, MediaPoolItem] = {}
+        for asset in root.iterfind("./resources/asset"):
+            mediaRep: ET.Element | None = asset.find("media-rep")
+            if mediaRep is None:
+                continue
+            path: str = urllib.request.url2pathname(urllib.parse.urlparse(mediaRep.get("src", "")).path)
+            if importOptions.get("importSourceClips", True):
+                imported: list[MediaPoolItem] = self.ImportMedia([path])
+                if len(imported) == 0:
+                    return None
+                assets[asset.get("id", "")] = imported[0]
+            else:
+                assets[asset.get("id", "")] = MediaPoolItem(context, os.path.basename(path), path, max(Frames(asset.get("duration", "0s")), 1), rate.setting)
+        timeline: Timeline = Timeline(context, self.project, importOptions.get("timelineName", os.path.splitext(os.path.basename(filePath))[0]), rate)
+        timeline.startFrame = Frames(sequence.get("tcStart", "0s"))
+        timeline.currentFrame = timeline.startFrame
+        for gap in sequence.iterfind("./spine/gap"):
+            for element in gap:
+                if element.tag not in ("asset-clip", "video", "title"):
+                    continue
+                lane: int = int(element.get("lane", "0"))
+                trackType: str = "audio" if lane < 0 else "video"
+                trackIndex: int = abs(lane) + 1
+                while len(timeline.tracks[trackType]) < trackIndex:
+                    timeline.tracks[trackType].append(Track(f"{'Audio' if trackType == 'audio' else 'Video'} {len(timeline.tracks[trackType]) + 1}"))
+                duration: int = Frames(element.get("duration", "0s"))
+                if element.tag == "title":
+                    source: MediaPoolItem = MediaPoolItem(context, "Basic Title", "", duration, rate.setting)
+                else:
+                    source = assets[element.get("ref", "")]
+                item: TimelineItem | None = timeline._Place(source, trackType, trackIndex, Frames(element.get("offset", "0s")), duration, Frames(element.get("start", "0s")))
+                if item is None:
+                    return None
+                item.name = element.get("name", source.name)
+        self.project.timelines.append(timeline)
+        return timeline
+
+    def AppendToTimeline(self, clipInfos: list[Any]) -> list[TimelineItem | None]:
+        '''
+        クリップを現在のタイムラインに置く。
+        recordFrameを省略した場合はタイムラインの末尾に置く。
+        Resolveと同じく、最後に置いたクリップの終端に再生位置を移動する。
+        '''
+        timeline: Timeline | None = self.project.currentTimeline
+        if timeline is None:
+            return []
+        placed: list[TimelineItem | None] = []
+        for clipInfo in clipInfos:
+            if isinstance(clipInfo, MediaPoolItem):
+                clipInfo = {"mediaPoolItem": clipInfo}
+            item: MediaPoolItem = clipInfo["mediaPoolItem"]
+            startFrame: int = int(clipInfo.get("startFrame", 0))
+            endFrame: int = int(clipInfo.get("endFrame", item.frames))
+            mediaType: Any = clipInfo.get("mediaType", 1)
+            trackType: str = "audio" if mediaType in (2, "audio") else "video"
+            trackIndex: int = int(clipInfo.get("trackIndex", 1))
+            recordFrame: int = int(clipInfo.get("recordFrame", timeline._EndFrame()))
+            if item.subtitles is not None:
+                # 字幕ファイルは字幕トラックに1行ずつのアイテムとして置く
+                placed.extend(self._PlaceSubtitles(timeline, item, trackIndex, recordFrame))
+                continue
+            if not item.isFusion and not item.isStill:
+                endFrame = min(endFrame, item.frames)
+            newItem: TimelineItem | None = timeline._Place(item, trackType, trackIndex, recordFrame, endFrame - startFrame, startFrame)
+            if newItem is not None:
+                timeline.currentFrame = newItem.start + newItem.duration
+            placed.append(newItem)
+        if not any(placed):
+            return []
+        return placed
+
+    def _PlaceSubtitles(self, timeline: Timeline, item: MediaPoolItem, trackIndex: int, recordFrame: int) -> list[TimelineItem | None]:
+        placed: list[TimelineItem | None] = []
+        for start, end, text in item.subtitles or []:
+            startFrame: int = recordFrame + round(start * timeline.rate.exact)
+            endFrame: int = recordFrame + round(end * timeline.rate.exact)
+            newItem: TimelineItem | None = timeline._Place(item, "subtitle", trackIndex, startFrame, endFrame - startFrame, 0)
+            if newItem is not None:
+                newItem.name = text
+                timeline.currentFrame = endFrame
+            placed.append(newItem)
+        return placed
+
+class Project(FakeObject):
+    def __init__(self, context: Context, name: str, rate: Rate) -> None:
+        super().__init__(context)
+        self.name: str = name
+        self.rate: Rate = rate
+        self.timelines: list[Timeline] = []
+        self.currentTimeline: Timeline | None = None
+        self.mediaPool: MediaPool = MediaPool(context, self)
+        self.settings: dict[str, Any] = {"timelineFrameRate": rate.setting, "timelineDropFrameTimecode": "1" if rate.drop > 0 else "0", "timelineResolutionWidth": "1920", "timelineResolutionHeight": "1080", "audioSampleRate": 48000}
+
+    def GetName(self) -> str:
+        return self.name
+
+    def GetMediaPool(self) -> MediaPool:
+        return self.mediaPool
+
+    def GetSetting(self, key: str | None = None) -> Any:
+        if key is None:
+            return dict(self.settings)
+        return self.settings.get(key, "")
+
+    def SetSetting(self, key: str, value: Any) -> bool:
+        self.settings[key] = value
+        return True
+
+    def GetTimelineCount(self) -> int:
+        return len(self.timelines)
+
+    def GetTimelineByIndex(self, index: int) -> Timeline | None:
+        if 1 <= index <= len(self.timelines):
+            return self.timelines[index - 1]
+        return None
+
+    def GetCurrentTimeline(self) -> Timeline | None:
+        return self.currentTimeline
+
+    def SetCurrentTimeline(self, timeline: Timeline) -> bool:
+        if timeline not in self.timelines:
+            return False
+        self.currentTimeline = timeline
+        return True
+
+class ProjectManager(FakeObject):
+    def __init__(self, context: Context, rate: Rate) -> None:
+        super().__init__(context)
+        self.project: Project = Project(context, "Untitled Project", rate)
+
+    def GetCurrentProject(self) -> Project:
+        return self.project
+
+class Resolve(FakeObject):
+    '''
+    app.GetResolve()の代わりになるオブジェクト。
+
+    Parameters:
+    fps: int | float | str
+        プロジェクトのフレームレート
+    latency: float
+        API呼び出し1回あたりに疑似的に掛ける時間(秒)
+    dropFrame: bool
+        ドロップフレームタイムコードを使うか
+    trimInPlace: bool
+        タイムラインアイテムがSetEndを持つか
+    '''
+    def __init__(self, fps: int | float | str = 30, latency: float = 0.0, dropFrame: bool = False, trimInPlace: bool = False) -> None:
+        self.context: Context = Context(latency, trimInPlace)
+        super().__init__(self.context)
+        self.projectManager: ProjectManager = ProjectManager(self.context, Rate(fps, dropFrame))
+
+    def GetProjectManager(self) -> ProjectManager:
+        return self.projectManager
+
+    def GetCallCount(self) -> int:
+        '''
+        これまでのAPI呼び出し回数を返す。この呼び出し自体は数えない。
+        '''
+        return self.context.calls - 1
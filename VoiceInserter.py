@@ -3,22 +3,38 @@ Python Script
 VoiceInserter
 DaVinci Resolve向けのスクリプトで、Voicevoxなどの音声・画像・字幕を挿入するGUIを作成する。
 '''
+from __future__ import annotations
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser
 import tkinter.ttk as ttk
 import json
+import atexit
+import bisect
+import hashlib
+import sqlite3
+import mmap
+import struct
 import re
 import os
 import sys
-import glob
 import wave
 from io import BytesIO
 from typing import Literal, Callable, Any, Final, cast
 from uuid import UUID
 import urllib.request
+import pathlib
+import xml.etree.ElementTree as ET
 import urllib.error
 import subprocess
 import pprint
+import time
+import math
+import copy
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import OrderedDict
+from fractions import Fraction
 
 TRACK_TYPE_VIDEO_STRING: Final = "video"
 TRACK_TYPE_AUDIO_STRING: Final = "audio"
@@ -28,10 +44,29 @@ TRACK_TYPE_VIDEO: Final = 1
 TRACK_TYPE_AUDIO: Final = 2
 TRACK_TYPE_SUBTITLE: Final = 3
 CLIP_NAME_PREFIX: Final = "VoiceInserter"
+# 字幕の出力先
+TEXT_OUTPUT_FUSION: Final = "fusion"
+TEXT_OUTPUT_SUBTITLE: Final = "subtitle"
+TEXT_OUTPUT_IMAGE: Final = "image"
+# 合成した音声をプロジェクトのサンプルレートに変換する品質
+RESAMPLE_QUALITY_OFF: Final = "off"
+RESAMPLE_QUALITY_FAST: Final = "fast"
+RESAMPLE_QUALITY_STANDARD: Final = "standard"
+RESAMPLE_QUALITY_HIGH: Final = "high"
 DATA_FILE: Final = "VoiceInserterData"
-FONT_PATH: Final = "C:\\Windows\\Fonts"
 scriptVersion: str = "1.0.0"
-IGNORE_VERSION_FILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/ignoreVersion.txt"
+# 設定はすべてこのファイルにまとめる。以前の設定ファイルは初めて読む時に取り込む
+SETTINGS_DB_FILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/settings.db"
+IGNORE_VERSION_SETTING: Final = "ignoreVersion.txt"
+TEMPLATE_SETTING: Final = "templates.dat"
+# 環境変数VOICEINSERTER_PROFILEが設定されている場合、ResolveのAPI呼び出しを計測する
+PROFILE_RESOLVE_API: Final = os.environ.get("VOICEINSERTER_PROFILE", "") not in ("", "0")
+PROFILE_REPORT_FILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/profile.txt"
+FONT_INDEX_FILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/fontIndex.json"
+BULK_TIMELINE_FILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/bulk.fcpxml"
+SUBTITLE_DIR: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/subtitles"
+SUBTITLE_IMAGE_DIR: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/subtitleImages"
+THUMBNAIL_DIR: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/thumbnails"
 
 try:
     sys.path.append(f"{os.environ['RESOLVE_SCRIPT_API']}/Modules/voicevox_core/Lib/site-packages")
@@ -45,6 +80,41 @@ try:
 except:
     voicevoxAvailable = False
 
+# 音声をプロジェクトのサンプルレートに変換する場合のみ使う
+try:
+    sys.path.append(f"{os.environ['RESOLVE_SCRIPT_API']}/Modules/numpy/Lib/site-packages")
+    import numpy as np
+    numpyAvailable: bool = True
+except ImportError:
+    numpyAvailable = False
+
+# 字幕を画像として描画する場合と、表情画像の縮小に使う
+try:
+    sys.path.append(f"{os.environ['RESOLVE_SCRIPT_API']}/Modules/pillow/Lib/site-packages")
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+    pillowAvailable: bool = True
+except ImportError:
+    pillowAvailable = False
+
+def GetFontDirs() -> list[str]:
+    '''
+    フォントを探すフォルダを取得する。
+    環境変数VOICEINSERTER_FONT_DIRSにos.pathsep区切りで指定されていれば、そのフォルダだけを探す
+
+    Returns: list[str]
+        フォントを探すフォルダ
+    '''
+    if os.environ.get("VOICEINSERTER_FONT_DIRS"):
+        return [fontDir for fontDir in os.environ["VOICEINSERTER_FONT_DIRS"].split(os.pathsep) if fontDir]
+    elif os.name == "nt":
+        fontDirs: list[str] = [os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts")]
+        # LOCALAPPDATAがない場合に相対パスとしてカレントフォルダを探さないよう、ユーザーごとのフォルダは設定されている時だけ加える
+        if os.environ.get("LOCALAPPDATA"):
+            fontDirs.append(os.path.join(os.environ["LOCALAPPDATA"], "Microsoft", "Windows", "Fonts"))
+        return fontDirs
+    else:
+        return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.local/share/fonts"), os.path.expanduser("~/.fonts")]
+
 def GetWavDuration(wavedata: wave.Wave_read) -> float:
     '''
     waveデータの再生に掛かる秒数を取得する。
@@ -63,6 +133,25 @@ def GetWavDuration(wavedata: wave.Wave_read) -> float:
     framecount: int = wavedata.getnframes()
     return framecount / framerate
 
+def GetWavFrames(wavFile: str, frameRate: FrameRate) -> int:
+    '''
+    waveファイルのヘッダだけを読み、タイムライン上での長さをフレーム数で取得する。
+
+    Parameters:
+    wavFile: str
+        waveファイルのパス
+    frameRate: FrameRate
+        タイムラインのフレームレート
+
+    Returns: int
+        フレーム数。読み取れなければ0
+    '''
+    try:
+        with wave.open(wavFile, "rb") as wavedata:
+            return frameRate.SecondsToFrames(Fraction(wavedata.getnframes(), wavedata.getframerate()))
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        return 0
+
 def GetColorCode(r: float, g:float, b:float) -> str:
     '''
     カラーコードを取得する。
@@ -86,190 +175,814 @@ class FontList:
             self.font: str = font
             self.styleSet: set[tuple[str, str]]= set()
             self.styleList: list[tuple[str, str]] = []
+            # 表示スタイル名ごとのフォントファイルのパスと、ttc内の番号
+            self.files: dict[str, tuple[str, int]] = {}
     
+    # 索引の形式を変えた場合は上げて、古い索引を使わないようにする
+    INDEX_VERSION: Final = 1
+    FONT_EXTENSIONS: Final = (".ttf", ".ttc")
+    # nameテーブルのnameID. 優先する方が後ろ
+    FONT_ID: Final = (1, 16)
+    STYLE_ID: Final = (2, 17)
+    JAPANESE_NAME: Final = 0
+    ENGLISH_NAME: Final = 1
+    # platformIDごとの日本語と英語のlanguageID
+    LANGUAGE_IDS: Final = {
+        0: ((0,), (0,)),
+        1: ((11,), (0,)),
+        3: ((0x0411, 0x0011, 0x0811), (0x1000, 0x0409)),
+    }
+    # (platformID, encodingID)ごとの文字コード. platformID 0はencodingIDによらずUTF-16
+    ENCODINGS: Final = {
+        **{(0, encodingID): "utf-16-be" for encodingID in range(7)},
+        (3, 1): "utf-16-be",
+        (1, 0): "mac_roman",
+        (1, 1): "shift_jis",
+        (3, 2): "shift_jis",
+    }
+    TABLE_RECORD: Final = struct.Struct(">4sIII")
+    NAME_RECORD: Final = struct.Struct(">6H")
+    # 読み込むファイルが多い場合に同時に読み込む数
+    PARSE_WORKERS: Final = min(8, os.cpu_count() or 1)
+    # 別スレッドの読み込みが終わったか確認する間隔
+    POLL_INTERVAL_MS: Final = 50
+    # 直前のFetchFontsで読み込んだフォントファイルの数と、索引の内容を使った数
+    parsedFileCount: int = 0
+    cachedFileCount: int = 0
+
     @staticmethod
-    def FetchFonts() -> dict[str, FontStyles]:
+    def FetchFonts(fontDirs: list[str] | None = None, indexFile: str | None = FONT_INDEX_FILE) -> dict[str, FontStyles]:
         '''
         インストール済みフォントのリストを返す.
         .ttfまたは.ttcのみ扱う
+        読み込んだ内容はファイルのパス・サイズ・更新日時とともに索引に保存し、次回は新しいファイルと変わったファイルだけを読み込む
+
+        Parameters:
+        fontDirs: list[str] | None
+            フォントを探すフォルダ。NoneならGetFontDirs()
+        indexFile: str | None
+            索引の保存先。Noneなら索引を使わない
 
-        Returns: dict[str, tuple[str, set[tuple[str, str]]]]
-            フォントとスタイルのセット
+        Returns: dict[str, FontList.FontStyles]
+            表示フォント名とスタイルのセット
         '''
-        JAPANESE_NAME: Final = 0
-        ENGLISH_NAME: Final = 1
-        FONT_ID: Final = (1, 16)
-        STYLE_ID: Final = (2, 17)
-        ttfEndian: Literal['little', 'big'] = "big"
-        retFonts: dict[str, FontList.FontStyles] = {}
-        for fileName in glob.glob(f"{FONT_PATH}\\*"):
-            if not (fileName.upper().endswith('.TTF') or fileName.upper().endswith('.TTC')):
-                continue
+        fontFiles: list[tuple[str, int, int]] = FontList.ListFontFiles(fontDirs if fontDirs is not None else GetFontDirs())
+        index: dict[str, dict[str, Any]] = FontList._LoadIndex(indexFile) if indexFile is not None else {}
+        newIndex: dict[str, dict[str, Any]] = {}
+        toParse: list[str] = []
+        for fileName, size, mtime in fontFiles:
+            entry: dict[str, Any] | None = index.get(fileName)
+            if entry is not None and entry.get("size") == size and entry.get("mtime") == mtime:
+                newIndex[fileName] = entry
+            else:
+                newIndex[fileName] = {"size": size, "mtime": mtime, "fonts": []}
+                toParse.append(fileName)
+        if len(toParse) > 1 and FontList.PARSE_WORKERS > 1:
+            # ファイルの読み込みを待つ間にほかのファイルを処理する
+            with ThreadPoolExecutor(max_workers=FontList.PARSE_WORKERS, thread_name_prefix="VoiceInserterFont") as executor:
+                parsed: list[list[list[Any]]] = list(executor.map(FontList.ParseFontFile, toParse))
+        else:
+            parsed = [FontList.ParseFontFile(fileName) for fileName in toParse]
+        for fileName, records in zip(toParse, parsed):
+            newIndex[fileName]["fonts"] = records
+        FontList.parsedFileCount = len(toParse)
+        FontList.cachedFileCount = len(fontFiles) - len(toParse)
+        if indexFile is not None and (len(toParse) > 0 or index.keys() != newIndex.keys()):
+            FontList._SaveIndex(indexFile, newIndex)
+        return FontList._BuildFontDict([(fileName, newIndex[fileName]["fonts"]) for fileName, _, _ in fontFiles])
+
+    @staticmethod
+    def ListFontFiles(fontDirs: list[str]) -> list[tuple[str, int, int]]:
+        '''
+        フォルダ以下のフォントファイルを列挙する
+
+        Returns: list[tuple[str, int, int]]
+            ファイルのパス、サイズ、更新日時(ナノ秒)
+        '''
+        fontFiles: list[tuple[str, int, int]] = []
+        seen: set[str] = set()
+        for fontDir in fontDirs:
+            for directory, dirNames, fileNames in os.walk(fontDir):
+                dirNames.sort()
+                for fileName in sorted(fileNames):
+                    if not fileName.lower().endswith(FontList.FONT_EXTENSIONS):
+                        continue
+                    filePath: str = os.path.join(directory, fileName)
+                    if os.path.normcase(filePath) in seen:
+                        continue
+                    seen.add(os.path.normcase(filePath))
+                    try:
+                        stat: os.stat_result = os.stat(filePath)
+                    except OSError:
+                        continue
+                    fontFiles.append((filePath, stat.st_size, stat.st_mtime_ns))
+        return fontFiles
+
+    @staticmethod
+    def ParseFontFile(fileName: str) -> list[list[Any]]:
+        '''
+        フォントファイルのnameテーブルからフォント名とスタイル名を読み込む
+        ファイルはメモリマップし、テーブルの一覧とnameレコードはstructでまとめて読む
+
+        Parameters:
+        fileName: str
+            .ttfまたは.ttcのパス
+
+        Returns: list[list[Any]]
+            フォントごとの[ttc内の番号, フォント名, 表示フォント名, スタイル名, 表示スタイル名]。スタイルが無ければスタイル名はNone
+        '''
+        try:
             with open(fileName, "rb") as f:
-                # nameテーブルの検索
-                nameOffset: int | None = None
-                version: int = int.from_bytes(f.read(4), ttfEndian)
-                if version == 0x00010000:
-                    offsetTable: list[int] = [0x0]
-                elif version == 0x74746366: # ttcf
-                    offsetTable = []
-                    f.seek(4, 1)
-                    numFonts: int = int.from_bytes(f.read(4), ttfEndian)
-                    for i in range(numFonts):
-                        offsetTable.append(int.from_bytes(f.read(4), ttfEndian))
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return FontList._ParseFontData(data, fileName)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"フォントを読み込めませんでした: {fileName}: {e}")
+        return []
+
+    @staticmethod
+    def _ParseFontData(data: mmap.mmap | bytes, fileName: str) -> list[list[Any]]:
+        records: list[list[Any]] = []
+        version: int = struct.unpack_from(">I", data, 0)[0]
+        if version == 0x00010000:
+            offsetTable: tuple[int, ...] = (0,)
+        elif version == 0x74746366: # ttcf
+            numFonts: int = struct.unpack_from(">I", data, 8)[0]
+            offsetTable = struct.unpack_from(f">{numFonts}I", data, 12)
+        else:
+            print(f"Unknown font file version: {version} in {fileName}")
+            return records
+        for fontIndex, offset in enumerate(offsetTable):
+            version, tableCount = struct.unpack_from(">IH", data, offset)
+            if version != 0x00010000:
+                print(f"Unknown font sub file version: {version} in {fileName}")
+                continue
+            # nameテーブルの検索
+            nameOffset: int | None = None
+            tableStart: int = offset + 12
+            for tag, _, tableOffset, _ in FontList.TABLE_RECORD.iter_unpack(data[tableStart:tableStart + FontList.TABLE_RECORD.size * tableCount]):
+                if tag == b"name":
+                    nameOffset = tableOffset
+                    break
+            if nameOffset is None:
+                continue
+            # フォント名とスタイル名の検索
+            _, nameRecordCount, storageOffset = struct.unpack_from(">3H", data, nameOffset)
+            recordStart: int = nameOffset + 6
+            stringStart: int = nameOffset + storageOffset
+            fonts: dict[int, list[str]] = {}
+            styles: dict[int, list[str]] = {}
+            for platformID, encodingID, languageID, nameID, length, stringOffset in FontList.NAME_RECORD.iter_unpack(data[recordStart:recordStart + FontList.NAME_RECORD.size * nameRecordCount]):
+                if nameID in FontList.FONT_ID:
+                    names: dict[int, list[str]] = fonts
+                elif nameID in FontList.STYLE_ID:
+                    names = styles
                 else:
-                    print(f"Unknown font file version: {version} in {fileName}")
                     continue
-                for offset in offsetTable:
-                    f.seek(offset, 0)
-                    version = int.from_bytes(f.read(4), ttfEndian) 
-                    if version != 0x00010000:
-                        print(f"Unknown font sub file version: {version} in {fileName}")
-                        continue
-                    tableCount: int = int.from_bytes(f.read(2), ttfEndian)
-                    f.seek(6, 1)
-                    for i in range(tableCount):
-                        try:
-                            tagName: str = f.read(4).decode("ascii")
-                        except UnicodeDecodeError as e:
-                            print(f"{fileName}: UnicodeDecodeError in table tag name pos: 0x{f.tell() - 4:x}")
-                            raise e
-
-                        if tagName == 'name':
-                            f.seek(4, 1)
-                            nameOffset = int.from_bytes(f.read(4), ttfEndian)
-                            break
-                        f.seek(12, 1)
-                    if nameOffset is None:
-                        continue
-                    f.seek(nameOffset, 0)
-                    # フォント名とスタイル名の検索
-                    f.seek(2, 1)
-                    nameRecordCount: int = int.from_bytes(f.read(2), ttfEndian)
-                    storageOffset: int = int.from_bytes(f.read(2), ttfEndian)
-                    nameRecordOffset: int = f.tell()
-                    nameRecordLength: int = 12
-
-                    fonts: dict[int, list[str]] = {}
-                    styles: dict[int, list[str]] = {}
-                    for i in range(nameRecordCount):
-                        f.seek(nameRecordOffset + nameRecordLength * i, 0)
-                        platformID: int = int.from_bytes(f.read(2), ttfEndian)
-                        encodingID: int = int.from_bytes(f.read(2), ttfEndian)
-                        languageID: int = int.from_bytes(f.read(2), ttfEndian)
-                        nameID: int = int.from_bytes(f.read(2), ttfEndian)
-                        length: int = int.from_bytes(f.read(2), ttfEndian)
-                        stringOffset: int = int.from_bytes(f.read(2), ttfEndian)
-                        if not nameID in FONT_ID and not nameID in STYLE_ID:
-                            continue
-                        f.seek(nameOffset + storageOffset + stringOffset, 0)
-                        data = f.read(length)
-                        if platformID == 0 or (platformID == 3 and encodingID == 1):
-                            string: str = data.decode("utf-16-be")
-                        elif platformID == 1 and encodingID == 0:
-                            string = data.decode("mac_roman")
-                        elif platformID == 1 and encodingID == 1 or platformID == 3 and encodingID == 2:
-                            string = data.decode("shift_jis")
-                        else:
-                            continue
-                        if platformID == 0:
-                            japaneseLanguageIDList: list[int] = [0]
-                            englishLanguageIDList: list[int] = [0]
-                        elif platformID == 1:
-                            japaneseLanguageIDList = [11]
-                            englishLanguageIDList = [0]
-                        elif platformID == 3:
-                            japaneseLanguageIDList = [0x0411, 0x0011, 0x0811]
-                            englishLanguageIDList = [0x1000, 0x0409]
-                        else:
-                            continue
-                        if nameID in FONT_ID:
-                            if nameID not in fonts:
-                                fonts[nameID] = ["", ""]
-                            # 日本語
-                            if languageID in japaneseLanguageIDList:
-                                fonts[nameID][JAPANESE_NAME] = string
-                            # 英語.
-                            if languageID in englishLanguageIDList:
-                                fonts[nameID][ENGLISH_NAME] = string
-                        elif nameID in STYLE_ID:
-                            if nameID not in styles:
-                                styles[nameID] = ["", ""]
-                            # 日本語
-                            if languageID in japaneseLanguageIDList:
-                                styles[nameID][JAPANESE_NAME] = string
-                            # 英語.
-                            if languageID in englishLanguageIDList:
-                                styles[nameID][ENGLISH_NAME] = string
-                    if len(fonts) > 0:
-                        if FONT_ID[1] in fonts:
-                            font: str = fonts[FONT_ID[1]][ENGLISH_NAME] if fonts[FONT_ID[1]][ENGLISH_NAME] != "" else fonts[FONT_ID[1]][JAPANESE_NAME]
-                            dispFont: str = fonts[FONT_ID[1]][JAPANESE_NAME] if fonts[FONT_ID[1]][JAPANESE_NAME] != "" else fonts[FONT_ID[1]][ENGLISH_NAME]
-                        else:
-                            font = fonts[FONT_ID[0]][ENGLISH_NAME] if fonts[FONT_ID[0]][ENGLISH_NAME] != "" else fonts[FONT_ID[0]][JAPANESE_NAME]
-                            dispFont = fonts[FONT_ID[0]][JAPANESE_NAME] if fonts[FONT_ID[0]][JAPANESE_NAME] != "" else fonts[FONT_ID[0]][ENGLISH_NAME]
-                        if not dispFont in retFonts:
-                            retFonts[dispFont] = FontList.FontStyles(font)
-                        if len(styles) > 0:
-                            if STYLE_ID[1] in styles:
-                                style: str = styles[STYLE_ID[1]][ENGLISH_NAME] if styles[STYLE_ID[1]][ENGLISH_NAME] != "" else styles[STYLE_ID[1]][JAPANESE_NAME]
-                                dispStyle: str = styles[STYLE_ID[1]][JAPANESE_NAME] if styles[STYLE_ID[1]][JAPANESE_NAME] != "" else styles[STYLE_ID[1]][ENGLISH_NAME]
-                            else:
-                                style = styles[STYLE_ID[0]][ENGLISH_NAME] if styles[STYLE_ID[0]][ENGLISH_NAME] != "" else styles[STYLE_ID[0]][JAPANESE_NAME]
-                                dispStyle = styles[STYLE_ID[0]][JAPANESE_NAME] if styles[STYLE_ID[0]][JAPANESE_NAME] != "" else styles[STYLE_ID[0]][ENGLISH_NAME]
-                            retFonts[dispFont].styleSet.add((dispStyle, style))
+                encoding: str | None = FontList.ENCODINGS.get((platformID, encodingID))
+                languageIDLists: tuple[tuple[int, ...], tuple[int, ...]] | None = FontList.LANGUAGE_IDS.get(platformID)
+                if encoding is None or languageIDLists is None:
+                    continue
+                if nameID not in names:
+                    names[nameID] = ["", ""]
+                isJapanese: bool = languageID in languageIDLists[FontList.JAPANESE_NAME]
+                isEnglish: bool = languageID in languageIDLists[FontList.ENGLISH_NAME]
+                # 使わない言語の名前は文字列にしない
+                if not isJapanese and not isEnglish:
+                    continue
+                string: str = data[stringStart + stringOffset:stringStart + stringOffset + length].decode(encoding, errors="replace")
+                # 日本語
+                if isJapanese:
+                    names[nameID][FontList.JAPANESE_NAME] = string
+                # 英語.
+                if isEnglish:
+                    names[nameID][FontList.ENGLISH_NAME] = string
+            if len(fonts) > 0:
+                font, dispFont = FontList._ChooseName(fonts, FontList.FONT_ID)
+                if len(styles) > 0:
+                    style, dispStyle = FontList._ChooseName(styles, FontList.STYLE_ID)
+                    records.append([fontIndex, font, dispFont, style, dispStyle])
+                else:
+                    records.append([fontIndex, font, dispFont, None, None])
+        return records
+
+    @staticmethod
+    def _ChooseName(names: dict[int, list[str]], nameIDs: tuple[int, int]) -> tuple[str, str]:
+        # 優先する名前(16, 17)があればそちらを使う. 英語名と表示用の日本語名を、無ければもう一方で補う
+        values: list[str] = names[nameIDs[1]] if nameIDs[1] in names else names[nameIDs[0]]
+        english: str = values[FontList.ENGLISH_NAME] if values[FontList.ENGLISH_NAME] != "" else values[FontList.JAPANESE_NAME]
+        japanese: str = values[FontList.JAPANESE_NAME] if values[FontList.JAPANESE_NAME] != "" else values[FontList.ENGLISH_NAME]
+        return english, japanese
+
+    @staticmethod
+    def _BuildFontDict(fileRecords: list[tuple[str, list[list[Any]]]]) -> dict[str, FontStyles]:
+        retFonts: dict[str, FontList.FontStyles] = {}
+        for fileName, records in fileRecords:
+            for fontIndex, font, dispFont, style, dispStyle in records:
+                if not dispFont in retFonts:
+                    retFonts[dispFont] = FontList.FontStyles(font)
+                if style is not None:
+                    retFonts[dispFont].styleSet.add((dispStyle, style))
+                    retFonts[dispFont].files.setdefault(dispStyle, (fileName, fontIndex))
+                else:
+                    retFonts[dispFont].files.setdefault("", (fileName, fontIndex))
         for dispFont in retFonts.keys():
             retFonts[dispFont].styleList = list(retFonts[dispFont].styleSet)
         return retFonts
 
-    def __init__(self, fontDict: dict[str, FontStyles]) -> None:
-        self.dispFonts = fontDict.keys()
-        self.fonts: dict[str, str] = {}
-        for font in self.dispFonts:
-            self.fonts[font] = fontDict[font].font
-        self.dispStyles: dict[str, list[str]] = {}
-        self.style: dict[str, dict[str, str]] = {}
-        for font in self.fonts:
-            self.dispStyles[font] = []
-            self.style[font] = {}
-            for style in fontDict[font].styleList:
-                self.dispStyles[font].append(style[0])
-                self.style[font][style[0]] = style[1]
+    @staticmethod
+    def _LoadIndex(indexFile: str) -> dict[str, dict[str, Any]]:
+        try:
+            with open(indexFile, "r", encoding="utf-8") as f:
+                data: dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != FontList.INDEX_VERSION:
+            return {}
+        return data.get("files", {})
+
+    @staticmethod
+    def _SaveIndex(indexFile: str, index: dict[str, dict[str, Any]]) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(indexFile)), exist_ok=True)
+            tempPath: str = f"{indexFile}.{os.getpid()}.tmp"
+            with open(tempPath, "w", encoding="utf-8") as f:
+                json.dump({"version": FontList.INDEX_VERSION, "files": index}, f, ensure_ascii=False)
+            os.replace(tempPath, indexFile)
+        except OSError as e:
+            print(f"フォントの索引を保存できませんでした: {indexFile}: {e}")
+
+    def __init__(self, fontDict: dict[str, FontStyles] | None = None) -> None:
+        '''
+        Parameters:
+        fontDict: dict[str, FontList.FontStyles] | None
+            フォントとスタイルのセット。Noneの場合はFetchInBackgroundで読み込むまで待つ
+        '''
+        # フォント一覧が揃ったらセットする. 揃う前にフォント名を使う場合は待つ
+        self._ready: threading.Event = threading.Event()
+        self._SetFonts(fontDict if fontDict is not None else {})
+        if fontDict is not None:
+            self._ready.set()
+
+    def _SetFonts(self, fontDict: dict[str, FontStyles]) -> None:
+        fonts: dict[str, str] = {}
+        for font in fontDict:
+            fonts[font] = fontDict[font].font
+        dispStyles: dict[str, list[str]] = {}
+        style: dict[str, dict[str, str]] = {}
+        for font in fonts:
+            dispStyles[font] = []
+            style[font] = {}
+            for fontStyle in fontDict[font].styleList:
+                dispStyles[font].append(fontStyle[0])
+                style[font][fontStyle[0]] = fontStyle[1]
+        self._dispFonts: list[str] = list(fontDict.keys())
+        self._fonts: dict[str, str] = fonts
+        self._dispStyles: dict[str, list[str]] = dispStyles
+        self._style: dict[str, dict[str, str]] = style
+        self._files: dict[str, dict[str, tuple[str, int]]] = {font: fontDict[font].files for font in fontDict}
+
+    @property
+    def dispFonts(self) -> list[str]:
+        self._ready.wait()
+        return self._dispFonts
+
+    @property
+    def fonts(self) -> dict[str, str]:
+        self._ready.wait()
+        return self._fonts
+
+    @property
+    def dispStyles(self) -> dict[str, list[str]]:
+        self._ready.wait()
+        return self._dispStyles
+
+    @property
+    def style(self) -> dict[str, dict[str, str]]:
+        self._ready.wait()
+        return self._style
+
+    @property
+    def files(self) -> dict[str, dict[str, tuple[str, int]]]:
+        self._ready.wait()
+        return self._files
+
+    def FetchInBackground(self, fontDirs: list[str] | None = None, indexFile: str | None = FONT_INDEX_FILE) -> None:
+        '''
+        別スレッドでフォント一覧を読み込む。ウィンドウの表示を待たせないために使う
+        '''
+        def Run() -> None:
+            try:
+                self._SetFonts(FontList.FetchFonts(fontDirs, indexFile))
+            except Exception as e:
+                # 読み込めなくても、フォントを待っている挿入が止まったままにならないようにする
+                print(f"フォント一覧を読み込めませんでした: {e}")
+            finally:
+                self._ready.set()
+        threading.Thread(target=Run, name="VoiceInserterFonts", daemon=True).start()
+
+    def IsReady(self) -> bool:
+        return self._ready.is_set()
+
+    def Wait(self) -> None:
+        '''
+        フォント一覧が揃うまで待つ。メインスレッドでは待っている間UIが止まるので、WhenReadyを使うこと
+        '''
+        self._ready.wait()
+
+    def WhenReady(self, widget: tk.Misc, OnReady: Callable[[], None]) -> None:
+        '''
+        フォント一覧が揃ったらUIスレッドでOnReadyを呼ぶ。揃っていればその場で呼ぶ
+
+        Parameters:
+        widget: tk.Misc
+            揃うのを待つのに使うウィジェット
+        OnReady: Function() => None
+            揃った後の処理
+        '''
+        if self._ready.is_set():
+            OnReady()
+            return
+        def Check() -> None:
+            if not widget.winfo_exists():
+                return
+            if self._ready.is_set():
+                OnReady()
+            else:
+                widget.after(FontList.POLL_INTERVAL_MS, Check)
+        widget.after(FontList.POLL_INTERVAL_MS, Check)
+
+    def GetFontFile(self, font: str, style: str) -> tuple[str, int] | None:
+        '''
+        フォントファイルのパスとttc内の番号を取得する。スタイルが見つからない場合は同じフォントの別のスタイルを返す
+
+        Parameters:
+        font: str
+            表示フォント名
+        style: str
+            表示スタイル名
+
+        Returns: tuple[str, int] | None
+            フォントファイルのパスとttc内の番号。フォントが見つからなければNone
+        '''
+        files: dict[str, tuple[str, int]] = self.files.get(font, {})
+        if style in files:
+            return files[style]
+        return next(iter(files.values()), None)
+
+class ResolveProfiler:
+    '''
+    ResolveのスクリプトAPI呼び出しの回数と所要時間を計測する。
+    Wrapで包んだオブジェクトから返ってくるオブジェクトも自動的に包まれる。
+    '''
+    # 戻り値のオブジェクトの型名. ここにないものは呼び出し元の型名を引き継ぐ
+    RETURN_TYPE_NAMES: Final = {
+        "GetProjectManager": "ProjectManager",
+        "GetCurrentProject": "Project",
+        "GetMediaPool": "MediaPool",
+        "GetCurrentTimeline": "Timeline",
+        "CreateEmptyTimeline": "Timeline",
+        "GetRootFolder": "Folder",
+        "GetCurrentFolder": "Folder",
+        "GetSubFolders": "Folder",
+        "AddSubFolder": "Folder",
+        "GetClips": "MediaPoolItem",
+        "ImportMedia": "MediaPoolItem",
+        "AppendToTimeline": "TimelineItem",
+        "GetItemsInTrack": "TimelineItem",
+        "InsertFusionCompositionIntoTimeline": "TimelineItem",
+        "CreateFusionClip": "TimelineItem",
+        "AddFusionComp": "FusionComp",
+        "GetFusionCompByIndex": "FusionComp",
+        "AddTool": "FusionTool",
+        "FindToolByID": "FusionTool",
+    }
+    # 包まずにそのまま返す型
+    PRIMITIVE_TYPES: Final = (str, bytes, int, float, bool, type(None))
+
+    class Stat:
+        def __init__(self) -> None:
+            self.count: int = 0
+            self.total: float = 0.0
+            self.max: float = 0.0
+            self.apiCalls: int = 0
+
+        def Add(self, elapsed: float) -> None:
+            self.count += 1
+            self.total += elapsed
+            if elapsed > self.max:
+                self.max = elapsed
+
+    class Operation:
+        '''
+        with文で囲んだ区間を高レベル操作として計測する。
+        '''
+        def __init__(self, profiler: ResolveProfiler, name: str) -> None:
+            self.profiler: ResolveProfiler = profiler
+            self.name: str = name
+            self.start: float = 0.0
+            self.startApiCalls: int = 0
+
+        def __enter__(self) -> ResolveProfiler.Operation:
+            if self.profiler.enabled:
+                self.profiler.operationStack.append(self.name)
+                self.startApiCalls = self.profiler.apiCalls
+                self.start = time.perf_counter()
+            return self
+
+        def __exit__(self, *_) -> None:
+            if not self.profiler.enabled:
+                return
+            elapsed: float = time.perf_counter() - self.start
+            self.profiler.operationStack.pop()
+            stat: ResolveProfiler.Stat = self.profiler.operationStats.setdefault(self.name, ResolveProfiler.Stat())
+            stat.Add(elapsed)
+            stat.apiCalls += self.profiler.apiCalls - self.startApiCalls
+
+    class _Method:
+        def __init__(self, profiler: ResolveProfiler, target: Any, typeName: str, name: str) -> None:
+            self._profiler: ResolveProfiler = profiler
+            self._target: Any = target
+            self._typeName: str = typeName
+            self._name: str = name
+
+        def __call__(self, *args, **kwargs) -> Any:
+            args = tuple(ResolveProfiler.Unwrap(arg) for arg in args)
+            kwargs = {key: ResolveProfiler.Unwrap(value) for key, value in kwargs.items()}
+            start: float = time.perf_counter()
+            try:
+                ret: Any = self._target(*args, **kwargs)
+            finally:
+                self._profiler.Record(f"{self._typeName}.{self._name}", time.perf_counter() - start)
+            return self._profiler.Wrap(ret, ResolveProfiler.RETURN_TYPE_NAMES.get(self._name, self._typeName))
+
+    class _Object:
+        def __init__(self, profiler: ResolveProfiler, target: Any, typeName: str) -> None:
+            object.__setattr__(self, "_profiler", profiler)
+            object.__setattr__(self, "_target", target)
+            object.__setattr__(self, "_typeName", typeName)
+
+        def __getattr__(self, name: str) -> Any:
+            start: float = time.perf_counter()
+            value: Any = getattr(self._target, name)
+            if callable(value):
+                return ResolveProfiler._Method(self._profiler, value, self._typeName, name)
+            # Fusionツールの入出力などのプロパティ参照
+            self._profiler.Record(f"{self._typeName}.{name}(get)", time.perf_counter() - start)
+            return self._profiler.Wrap(value, self._typeName)
+
+        def __setattr__(self, name: str, value: Any) -> None:
+            start: float = time.perf_counter()
+            setattr(self._target, name, ResolveProfiler.Unwrap(value))
+            self._profiler.Record(f"{self._typeName}.{name}(set)", time.perf_counter() - start)
+
+        def __bool__(self) -> bool:
+            return bool(self._target)
+
+        def __eq__(self, other: object) -> bool:
+            return self._target == ResolveProfiler.Unwrap(other)
+
+        def __hash__(self) -> int:
+            return hash(self._target)
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled: bool = enabled
+        self.apiCalls: int = 0
+        self.methodStats: dict[str, ResolveProfiler.Stat] = {}
+        self.operationStats: dict[str, ResolveProfiler.Stat] = {}
+        self.operationMethodStats: dict[tuple[str, str], ResolveProfiler.Stat] = {}
+        self.operationStack: list[str] = []
+        # 処理の方法を選ぶ箇所ごとの、選んだ方法と回数
+        self.decisionCounts: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def Unwrap(value: Any) -> Any:
+        '''
+        Wrapで包んだオブジェクトを元のオブジェクトに戻す。
+        list/tuple/dictの中身も戻す。
+
+        Parameters:
+        value: Any
+            戻すオブジェクト
+
+        Returns: Any
+            元のオブジェクト
+        '''
+        if isinstance(value, ResolveProfiler._Object):
+            return object.__getattribute__(value, "_target")
+        if isinstance(value, ResolveProfiler._Method):
+            return value._target
+        if isinstance(value, list):
+            return [ResolveProfiler.Unwrap(item) for item in value]
+        if isinstance(value, tuple):
+            return tuple(ResolveProfiler.Unwrap(item) for item in value)
+        if isinstance(value, dict):
+            return {key: ResolveProfiler.Unwrap(item) for key, item in value.items()}
+        return value
+
+    def Wrap(self, target: Any, typeName: str) -> Any:
+        '''
+        Resolveのオブジェクトを計測用のオブジェクトで包む。
+        計測が無効の場合はそのまま返す。
+
+        Parameters:
+        target: Any
+            包むオブジェクト
+        typeName: str
+            レポートに表示する型名
+
+        Returns: Any
+            包んだオブジェクト
+        '''
+        if not self.enabled or isinstance(target, ResolveProfiler.PRIMITIVE_TYPES) or isinstance(target, (ResolveProfiler._Object, ResolveProfiler._Method)):
+            return target
+        if isinstance(target, list):
+            return [self.Wrap(item, typeName) for item in target]
+        if isinstance(target, tuple):
+            return tuple(self.Wrap(item, typeName) for item in target)
+        if isinstance(target, dict):
+            return {key: self.Wrap(item, typeName) for key, item in target.items()}
+        return ResolveProfiler._Object(self, target, typeName)
+
+    def Record(self, methodName: str, elapsed: float) -> None:
+        '''
+        API呼び出し1回分の計測結果を記録する。
+
+        Parameters:
+        methodName: str
+            型名.メソッド名
+        elapsed: float
+            所要時間(秒)
+        '''
+        self.apiCalls += 1
+        self.methodStats.setdefault(methodName, ResolveProfiler.Stat()).Add(elapsed)
+        if self.operationStack:
+            key: tuple[str, str] = (self.operationStack[-1], methodName)
+            self.operationMethodStats.setdefault(key, ResolveProfiler.Stat()).Add(elapsed)
+
+    def CountDecision(self, name: str, decision: str) -> None:
+        '''
+        どの方法で処理したかを数える。レポートの[decision]に表示される。
+
+        Parameters:
+        name: str
+            方法を選んだ処理名(TruncateImageなど)
+        decision: str
+            選んだ方法
+        '''
+        if not self.enabled:
+            return
+        counts: dict[str, int] = self.decisionCounts.setdefault(name, {})
+        counts[decision] = counts.get(decision, 0) + 1
+
+    def Measure(self, name: str) -> ResolveProfiler.Operation:
+        '''
+        高レベル操作(InsertVoiceなど)を計測するコンテキストマネージャを返す。
+        操作の入れ子はスレッドで共有するので、メインスレッドからだけ使うこと。
+
+        Parameters:
+        name: str
+            操作名
+
+        Returns: ResolveProfiler.Operation
+            with文で使うオブジェクト
+        '''
+        return ResolveProfiler.Operation(self, name)
+
+    def Reset(self) -> None:
+        '''
+        計測結果を消去する。
+        '''
+        self.apiCalls = 0
+        self.methodStats = {}
+        self.operationStats = {}
+        self.operationMethodStats = {}
+        self.decisionCounts = {}
+
+    def Report(self) -> str:
+        '''
+        計測結果を表形式の文字列にする。
+
+        Returns: str
+            レポート
+        '''
+        def Line(name: str, stat: ResolveProfiler.Stat) -> str:
+            return f"{name:<52} {stat.count:>7} {stat.total * 1000:>11.1f} {stat.total * 1000 / stat.count:>9.2f} {stat.max * 1000:>9.2f}"
+        header: str = f"{'':<52} {'calls':>7} {'total(ms)':>11} {'avg(ms)':>9} {'max(ms)':>9}"
+        lines: list[str] = [f"Resolve API calls: {self.apiCalls}", "", "[operation]", header]
+        for name, stat in sorted(self.operationStats.items(), key=lambda item: -item[1].total):
+            lines.append(f"{Line(name, stat)}  api:{stat.apiCalls}")
+            for (operation, method), methodStat in sorted(self.operationMethodStats.items(), key=lambda item: -item[1].total):
+                if operation == name:
+                    lines.append(Line(f"  {method}", methodStat))
+        lines += ["", "[method]", header]
+        for name, stat in sorted(self.methodStats.items(), key=lambda item: -item[1].total):
+            lines.append(Line(name, stat))
+        if self.decisionCounts:
+            lines += ["", "[decision]"]
+            for name, counts in sorted(self.decisionCounts.items()):
+                lines.append(f"{name:<52} {', '.join(f'{decision} {count}' for decision, count in sorted(counts.items(), key=lambda item: -item[1]))}")
+        return "\n".join(lines)
+
+    def DumpReport(self, filePath: str) -> None:
+        '''
+        計測結果をファイルに書き出す。
+
+        Parameters:
+        filePath: str
+            書き出し先
+        '''
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(filePath)), exist_ok=True)
+        with open(filePath, "w", encoding="utf-8") as f:
+            f.write(self.Report())
+
+    def ShowReport(self, root: tk.Misc) -> Callable[[], None]:
+        '''
+        計測結果を表示するウィンドウを開く関数を返す。
+
+        Parameters:
+        root: tk.Misc
+            親ウィジェット
+
+        Returns: function
+            メニューから実行される関数
+        '''
+        def inner() -> None:
+            reportRoot: TkinterUtil.SubWindow = TkinterUtil.SubWindow(root)
+            reportRoot.title("API計測結果")
+            reportText: tk.Text = tk.Text(reportRoot, width=100, height=40, font=("Courier", 9))
+            reportText.insert("1.0", self.Report())
+            reportText.config(state=tk.DISABLED)
+            reportText.pack(fill=tk.BOTH, expand=True)
+        return inner
+
+resolveProfiler: ResolveProfiler = ResolveProfiler(PROFILE_RESOLVE_API)
+
+class FrameRate:
+    '''
+    タイムラインのフレームレート。
+    29.97などのNTSCレートは30000/1001のような有理数で保持し、フレーム数は常に整数で扱う。
+    タイムコード文字列はResolveとのやり取りの時だけ作る。
+
+    Parameters:
+    rate: Fraction
+        1秒あたりのフレーム数
+    dropFrame: bool
+        ドロップフレームタイムコードかどうか(29.97/59.94のみ有効)
+    '''
+    def __init__(self, rate: Fraction, dropFrame: bool = False) -> None:
+        self.rate: Fraction = rate
+        # タイムコードの1秒あたりのフレーム数(29.97なら30)
+        self.nominal: int = round(rate)
+        # 1分ごとに飛ばすフレーム番号の数(29.97DFなら2、59.94DFなら4)
+        self.dropFrames: int = self.nominal // 15 if dropFrame and rate.denominator == 1001 and self.nominal % 30 == 0 else 0
+
+    @property
+    def dropFrame(self) -> bool:
+        return self.dropFrames > 0
+
+    @staticmethod
+    def FromSetting(fps: FrameRate | int | float | str, dropFrame: bool | int | str = False) -> FrameRate:
+        '''
+        Resolveの設定値('24', 29.97, '59.94'など)からフレームレートを作る。
+
+        Parameters:
+        fps: int | float | str
+            timelineFrameRateなどの設定値
+        dropFrame: bool | int | str
+            timelineDropFrameTimecodeなどの設定値
+
+        Returns: FrameRate
+            フレームレート
+        '''
+        if isinstance(fps, FrameRate):
+            return fps
+        value: float = float(str(fps).split()[0]) if str(fps).strip() else 0.0
+        if value <= 0:
+            value = 24.0
+        nominal: int = round(value)
+        if abs(value - nominal) < 0.005:
+            rate: Fraction = Fraction(nominal)
+        elif abs(value - nominal * 1000 / 1001) < 0.005:
+            rate = Fraction(nominal * 1000, 1001)
+        else:
+            rate = Fraction(value).limit_denominator(1001)
+        return FrameRate(rate, str(dropFrame).strip().lower() in ("1", "true"))
+
+    def TimecodeToFrames(self, timecode: str) -> int:
+        '''
+        タイムコードをフレーム数に変換する。
+        区切りに;が使われている場合はドロップフレームとして扱う。
+
+        Parameters:
+        timecode: str
+            タイムコード(HH:MM:SS:FF または HH:MM:SS;FF)
+
+        Returns: int
+            フレーム数
+        '''
+        h, m, s, f = timecode.replace(";", ":").replace(".", ":").split(":")
+        hours: int = int(h)
+        minutes: int = int(m)
+        frames: int = (hours * 3600 + minutes * 60 + int(s)) * self.nominal + int(f)
+        dropFrames: int = self.dropFrames
+        if dropFrames == 0 and ";" in timecode and self.rate.denominator == 1001:
+            dropFrames = self.nominal // 15
+        if dropFrames > 0:
+            totalMinutes: int = hours * 60 + minutes
+            frames -= dropFrames * (totalMinutes - totalMinutes // 10)
+        return frames
+
+    def FramesToTimecode(self, frames: int) -> str:
+        '''
+        フレーム数をタイムコードに変換する。
+
+        Parameters:
+        frames: int
+            フレーム数。負の値は0として扱う
+
+        Returns: str
+            タイムコード(ドロップフレームならHH:MM:SS;FF)
+        '''
+        frames = max(int(frames), 0)
+        separator: str = ":"
+        if self.dropFrames > 0:
+            separator = ";"
+            framesPerMinute: int = self.nominal * 60 - self.dropFrames
+            framesPer10Minutes: int = self.nominal * 600 - self.dropFrames * 9
+            tenMinutes, remainder = divmod(frames, framesPer10Minutes)
+            frames += self.dropFrames * 9 * tenMinutes
+            if remainder > self.dropFrames:
+                frames += self.dropFrames * ((remainder - self.dropFrames) // framesPerMinute)
+        totalSeconds, f = divmod(frames, self.nominal)
+        totalMinutes, s = divmod(totalSeconds, 60)
+        h, m = divmod(totalMinutes, 60)
+        return f"{h:02}:{m:02}:{s:02}{separator}{f:02}"
+
+    def SecondsToFrames(self, seconds: float) -> int:
+        '''
+        秒数をフレーム数に変換する。端数は切り上げる。
+
+        Parameters:
+        seconds: float
+            秒数
+
+        Returns: int
+            フレーム数
+        '''
+        return math.ceil(Fraction(seconds) * self.rate - Fraction(1, 1000))
+
+    def ConvertFrames(self, frames: int, target: FrameRate) -> int:
+        '''
+        このフレームレートでのフレーム数を、別のフレームレートでのフレーム数に変換する。
+
+        Parameters:
+        frames: int
+            フレーム数
+        target: FrameRate
+            変換先のフレームレート
+
+        Returns: int
+            変換後のフレーム数
+        '''
+        if self.rate == target.rate:
+            return frames
+        return round(Fraction(frames) * target.rate / self.rate)
 
 class ResolveUtil:
     @staticmethod
-    def TimecodeToFrames(timecode: str, fps: int | float) -> int:
+    def TimecodeToFrames(timecode: str, fps: FrameRate | int | float | str) -> int:
         '''
         タイムコードをフレーム数に変換する
         Parameters:
         timecode: string
             タイムコード (HH:MM:SS:FF)
-        fps: int
+        fps: FrameRate | int | float
             フレームレート
         Returns: int
             フレーム数
         '''
-        h, m, s, f = re.findall(r"\d+", timecode)
-        return int((int(h) * 3600 + int(m) * 60 + int(s)) * fps) + int(f)
+        return FrameRate.FromSetting(fps).TimecodeToFrames(timecode)
 
     @staticmethod
-    def GetTimecodeFromFrame(frame: int, fps: int | float) -> str:
+    def GetTimecodeFromFrame(frame: int, fps: FrameRate | int | float | str) -> str:
         '''
         フレームをタイムコードに変換する。
 
         Parameters:
         frame: int
             フレーム数
-        fps: int
+        fps: FrameRate | int | float
             フレームレート
 
         Returns: string
             タイムコード(HH:MM:SS:FF)
         '''
-        return ResolveUtil.AddFrameToTimecode("00:00:00:00", frame, fps)
+        return FrameRate.FromSetting(fps).FramesToTimecode(frame)
     
     @staticmethod
-    def AddFrameToTimecode(timecode: str, addFrames: int, fps: int | float) -> str:
+    def AddFrameToTimecode(timecode: str, addFrames: int, fps: FrameRate | int | float | str) -> str:
         '''
         タイムコードにフレーム数を加算する
 
@@ -278,19 +991,64 @@ class ResolveUtil:
             タイムコード (HH:MM:SS:FF)
         addFrames: int
             加算するフレーム数
-        fps: int
+        fps: FrameRate | int | float
             フレームレート
         Returns: string
             加算後のタイムコード (HH:MM:SS:FF)
         '''
-        totalFrames = ResolveUtil.TimecodeToFrames(timecode, fps) + addFrames
-        if totalFrames < 0:
-            totalFrames = 0
-        hours = int(totalFrames // (3600 * fps))
-        minutes = int((totalFrames % (3600 * fps)) // (60 * fps))
-        seconds = int((totalFrames % (60 * fps)) // fps)
-        frames = int(totalFrames % fps)
-        return f"{hours:02}:{minutes:02}:{seconds:02}:{frames:02}"
+        frameRate: FrameRate = FrameRate.FromSetting(fps)
+        return frameRate.FramesToTimecode(frameRate.TimecodeToFrames(timecode) + addFrames)
+
+    @staticmethod
+    def GetFrameRate(timeline) -> FrameRate:
+        '''
+        タイムラインのフレームレートを取得する
+
+        Parameters:
+        timeline: timeline
+            対象のタイムライン
+
+        Returns: FrameRate
+            フレームレート
+        '''
+        return FrameRate.FromSetting(timeline.GetSetting("timelineFrameRate"), timeline.GetSetting("timelineDropFrameTimecode"))
+
+    @staticmethod
+    def GetCurrentFrame(timeline, frameRate: FrameRate) -> int | None:
+        '''
+        タイムラインの再生位置をフレーム数で取得する
+
+        Parameters:
+        timeline: timeline
+            対象のタイムライン
+        frameRate: FrameRate
+            タイムラインのフレームレート
+
+        Returns: int | None
+            再生位置。タイムラインが表示されていなければNone
+        '''
+        currentTime: str | None = timeline.GetCurrentTimecode()
+        if not currentTime:
+            return None
+        return frameRate.TimecodeToFrames(currentTime)
+
+    @staticmethod
+    def SetCurrentFrame(timeline, frame: int, frameRate: FrameRate) -> bool:
+        '''
+        タイムラインの再生位置をフレーム数で設定する
+
+        Parameters:
+        timeline: timeline
+            対象のタイムライン
+        frame: int
+            再生位置
+        frameRate: FrameRate
+            タイムラインのフレームレート
+
+        Returns: bool
+            成否
+        '''
+        return timeline.SetCurrentTimecode(frameRate.FramesToTimecode(frame))
 
     @staticmethod
     def MoveCurrentFolder(mediaPool, folderPath: str, createIfNotExist: bool=True) -> None:
@@ -334,6 +1092,60 @@ class ResolveUtil:
                 currentFolder = newFolder
             mediaPool.SetCurrentFolder(currentFolder)
 
+    @staticmethod
+    def ImportMediaBatch(mediaPool, filePaths: list[str], folderPath: str) -> dict[str, Any]:
+        '''
+        複数のファイルをメディアプールのフォルダに1回のImportMediaでまとめて取り込む。
+        クリップ名は拡張子を除いたファイル名にする。同名のクリップが既にあれば取り込まずにそれを使う。
+
+        Parameters:
+        mediaPool: MediaPool
+            取り込み先のメディアプール
+        filePaths: list[str]
+            取り込むファイルのパス
+        folderPath: str
+            取り込み先のフォルダのパス。/で区切る
+
+        Returns: dict[str, MediaPoolItem]
+            ファイルパスからクリップへの対応。取り込めなかったファイルは含まない
+        '''
+        def Normalize(filePath: str) -> str:
+            return os.path.normcase(os.path.abspath(filePath))
+
+        def ClipName(filePath: str) -> str:
+            return os.path.splitext(os.path.basename(filePath))[0]
+
+        result: dict[str, Any] = {}
+        if not mediaPool or len(filePaths) == 0:
+            return result
+        prevCurrentFolder = mediaPool.GetCurrentFolder()
+        ResolveUtil.MoveCurrentFolder(mediaPool, folderPath)
+        # フォルダ内のクリップは1回だけ列挙する
+        existClips: dict[str, Any] = {}
+        for clip in (mediaPool.GetCurrentFolder().GetClips() or {}).values():
+            existClips.setdefault(clip.GetName(), clip)
+        newFiles: list[str] = []
+        for filePath in dict.fromkeys(filePaths):
+            clip = existClips.get(ClipName(filePath))
+            if clip is not None:
+                result[filePath] = clip
+            else:
+                newFiles.append(filePath)
+        if len(newFiles) > 0:
+            newClips = mediaPool.ImportMedia(newFiles) or []
+            # 取り込み結果の順番は保証されないので、ファイルパスで対応付ける
+            pathToFile: dict[str, str] = {Normalize(filePath): filePath for filePath in newFiles}
+            for clip in newClips:
+                filePath: str | None = pathToFile.pop(Normalize(clip.GetClipProperty("File Path") or ""), None)
+                if filePath is None:
+                    continue
+                clip.SetName(ClipName(filePath))
+                result[filePath] = clip
+            if len(pathToFile) > 0:
+                messagebox.showerror("Error", f"{len(pathToFile)}個のファイルの取り込みに失敗しました。\n{chr(10).join(pathToFile.values())}")
+        mediaPool.SetCurrentFolder(prevCurrentFolder)
+        return result
+
     @staticmethod
     def GetOrCreateCurrentTimeline(project):
         '''
@@ -405,18 +1217,56 @@ class ResolveUtil:
         if trackIndex == -1:
             messagebox.showerror("Error", f"{trackType}トラック '{trackName}' が見つかりませんでした。")
             return None
-        currentTime = currentTimeline.GetCurrentTimecode()
-        fps = currentTimeline.GetSetting("timelineFrameRate")
-        if currentTime is None:
+        currentFrame = ResolveUtil.GetCurrentFrame(currentTimeline, ResolveUtil.GetFrameRate(currentTimeline))
+        if currentFrame is None:
             messagebox.showerror("Error", "タイムラインが表示された画面ではありません。")
             return None
-        currentFrame = ResolveUtil.TimecodeToFrames(currentTime, fps)
-        clips = currentTimeline.GetItemsInTrack(trackType, trackIndex)
+        return ResolveUtil.GetTimelineClipAtFrame(currentTimeline, trackType, trackIndex, currentFrame)
+
+    @staticmethod
+    def GetTimelineClipAtFrame(timeline, trackType: Literal["video", "audio", "subtitle"], trackIndex: int, frame: int):
+        '''
+        指定したトラックの、指定フレームにあるクリップを取得する
+
+        Parameters:
+        timeline: timeline
+            探すタイムライン
+        trackType: "video" or "audio"
+            トラックの種類
+        trackIndex: int
+            トラックのインデックス
+        frame: int
+            探すフレーム
+
+        Returns: timelineClip
+            取得したクリップ。なければNone
+        '''
+        clips = timeline.GetItemsInTrack(trackType, trackIndex)
         for clip in clips.values():
-            if clip.GetStart(False) <= currentFrame <= clip.GetEnd(False):
+            if clip.GetStart(False) <= frame <= clip.GetEnd(False):
                 return clip
         return None
 
+    @staticmethod
+    def TrimTimelineItemEnd(item, endFrame: int) -> bool:
+        '''
+        タイムライン上のクリップの終了フレームを、削除・再配置せずにその場で変更する。
+        SetEndを持たないバージョンのResolveや、変更が反映されなかった場合はFalseを返す。
+
+        Parameters:
+        item: timelineClip
+            変更するクリップ
+        endFrame: int
+            新しい終了フレーム
+
+        Returns: bool
+            変更できたか
+        '''
+        setEnd = getattr(item, "SetEnd", None)
+        if not callable(setEnd) or not setEnd(endFrame):
+            return False
+        return item.GetEnd(False) == endFrame
+
 class TkinterUtil:
     class SubWindow(tk.Toplevel):
         def __init__(self, master: tk.Misc | None, OnDestroy: Callable[[], Any] | None = None):
@@ -430,12 +1280,19 @@ class TkinterUtil:
                 self.OnDestroy()
 
 class VoicevoxEngine:
+    # 試聴用の合成が終わったか確認する間隔
+    POLL_INTERVAL_MS: Final = 50
+
     class ModelInfo:
         def __init__(self, file: str, id: int) -> None:
             self.filename: str = file
             self.styleID: int = id
 
     def __init__(self) -> None:
+        # Synthesizerとモデルのロード状態はワーカースレッドと共有するため排他する
+        self._lock: threading.RLock = threading.RLock()
+        # 試聴用の合成はUIスレッドで待たずにこのスレッドで行う
+        self._previewExecutor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="VoiceInserterPreview")
         self.__text: str = ""
         self.__currentStyleID: int = -1
         self.__wav: bytes | None = None
@@ -494,11 +1351,16 @@ class VoicevoxEngine:
         '''
         return list(self.__voiceModelList[character].keys())
 
-    def MakeVoice(self, charaname: str, stylename: str, text: str, upspeak: bool, speed: float=1.0, pitch: float=0.0, intonation: float=1.0, volume: float=1.0, pauseLengthScale: float=1.0, prePhonemeLength: float=0.1, postPhonemeLength: float=0.1) -> bool:
+    def MakeVoiceInBackground(self, widget: tk.Misc, OnMade: Callable[[bool], None], charaname: str, stylename: str, text: str, upspeak: bool, speed: float=1.0, pitch: float=0.0, intonation: float=1.0, volume: float=1.0, pauseLengthScale: float=1.0, prePhonemeLength: float=0.1, postPhonemeLength: float=0.1) -> None:
         '''
-        ボイスのwavデータを作成する.
+        ボイスのwavデータを試聴用のスレッドで作成し、できたらUIスレッドでOnMadeを呼ぶ。
+        挿入キューの合成が終わるのを待つ間もTkが止まらないように、フレーズ編集画面と再生用のデータはOnMadeの前に更新する。
 
         paramters:
+        widget: tk.Misc
+            作成を待つのに使うウィジェット
+        OnMade: Function(bool) => None
+            作成後の処理。引数は成否
         charaname: str
             声のキャラ名
         stylename: str
@@ -521,32 +1383,81 @@ class VoicevoxEngine:
             前の無音長さ
         postPhonemeLength: float
             後の無音長さ
+        '''
+        styleID: int = self.__voiceModelList[charaname][stylename].styleID
+        # 文章とスタイルが同じなら編集中のアクセント句を使い、違っていれば作り直す
+        editingAccentPhrases: list[voicevox.AccentPhrase] | None = self.GetEditingAccentPhrases(charaname, stylename, text)
+        def Make() -> tuple[list[voicevox.AccentPhrase], bytes]:
+            with self._lock:
+                self._LoadVoiceModel(charaname, stylename)
+                accentPhrases: list[voicevox.AccentPhrase] = editingAccentPhrases if editingAccentPhrases is not None else self.__synthesizer.create_accent_phrases(text, styleID)
+                return accentPhrases, self._Synthesis(accentPhrases, styleID, upspeak, speed, pitch, intonation, volume, pauseLengthScale, prePhonemeLength, postPhonemeLength)
+        future: Future[tuple[list[voicevox.AccentPhrase], bytes]] = self._previewExecutor.submit(Make)
+        def Check() -> None:
+            if not widget.winfo_exists():
+                return
+            if not future.done():
+                widget.after(VoicevoxEngine.POLL_INTERVAL_MS, Check)
+                return
+            error: BaseException | None = future.exception()
+            if error is not None:
+                print(f"音声の作成に失敗しました: {error}")
+                OnMade(False)
+                return
+            accentPhrases, self.__wav = future.result()
+            if editingAccentPhrases is None:
+                self.__text = text
+                self.__currentStyleID = styleID
+                self._accentPhrases = accentPhrases
+                self._UpdatePhraseEditorDisp()
+            OnMade(bool(self.__wav))
+        widget.after(VoicevoxEngine.POLL_INTERVAL_MS, Check)
 
-        returns: bool
-            成否
+    def GetEditingAccentPhrases(self, charaname: str, stylename: str, text: str) -> list[voicevox.AccentPhrase] | None:
+        '''
+        フレーズ編集中のアクセント句が指定の文章・スタイルのものであれば、そのコピーを取得する。
+
+        Returns: list[voicevox.AccentPhrase] | None
+            編集中のアクセント句のコピー。文章かスタイルが違う場合はNone
         '''
-        # Modelのロード
-        self._LoadVoiceModel(charaname, stylename)
         styleID: int = self.__voiceModelList[charaname][stylename].styleID
-        if self.__text != text or self.__currentStyleID != styleID:
-            # 文章が違っていればアクセント句を取得
-            self.__text = text
-            self.__currentStyleID = styleID
-            self._accentPhrases = self.__synthesizer.create_accent_phrases(text, self.__currentStyleID)
-            self._UpdatePhraseEditorDisp()
-        if self._accentPhrases is None:
-            return False
-        # pauseLengthScaleの適用.
-        defaultPauseLengthes: list[float] = []
-        for i in range(len(self._accentPhrases)):
-            accentPhrase = self._accentPhrases[i]
-            defaultPauseLengthes.append(0)
+        if self.__text != text or self.__currentStyleID != styleID or self._accentPhrases is None:
+            return None
+        return copy.deepcopy(self._accentPhrases)
+
+    def Synthesize(self, charaname: str, stylename: str, text: str, accentPhrases: list[voicevox.AccentPhrase] | None, upspeak: bool, speed: float=1.0, pitch: float=0.0, intonation: float=1.0, volume: float=1.0, pauseLengthScale: float=1.0, prePhonemeLength: float=0.1, postPhonemeLength: float=0.1) -> bytes:
+        '''
+        ボイスのwavデータを作成して返す。
+        MakeVoiceInBackgroundと違いフレーズ編集画面や再生用のデータを変更しないため、ワーカースレッドから呼べる。
+
+        Parameters:
+        accentPhrases: list[voicevox.AccentPhrase] | None
+            使用するアクセント句。Noneならtextから作成する
+        その他はMakeVoiceInBackgroundと同じ
+
+        Returns: bytes
+            wavデータ
+        '''
+        with self._lock:
+            self._LoadVoiceModel(charaname, stylename)
+            styleID: int = self.__voiceModelList[charaname][stylename].styleID
+            if accentPhrases is None:
+                accentPhrases = self.__synthesizer.create_accent_phrases(text, styleID)
+            return self._Synthesis(accentPhrases, styleID, upspeak, speed, pitch, intonation, volume, pauseLengthScale, prePhonemeLength, postPhonemeLength)
+
+    def _Synthesis(self, accentPhrases: list[voicevox.AccentPhrase], styleID: int, upspeak: bool, speed: float, pitch: float, intonation: float, volume: float, pauseLengthScale: float, prePhonemeLength: float, postPhonemeLength: float) -> bytes:
+        '''
+        アクセント句とパラメータからwavデータを作成する。
+        呼び出し側で_lockを取得しておくこと。
+        '''
+        # pauseLengthScaleの適用. 編集中のアクセント句を書き換えないようコピーに適用する
+        accentPhrases = copy.deepcopy(accentPhrases)
+        for accentPhrase in accentPhrases:
             if accentPhrase.pause_mora is not None:
                 if accentPhrase.pause_mora.vowel == "pau":
-                    defaultPauseLengthes[i] = accentPhrase.pause_mora.vowel_length
                     accentPhrase.pause_mora.vowel_length *= pauseLengthScale
         # AudioQueryのパラメータ設定
-        audioQuery: voicevox.AudioQuery = voicevox.AudioQuery.from_accent_phrases(self._accentPhrases)
+        audioQuery: voicevox.AudioQuery = voicevox.AudioQuery.from_accent_phrases(accentPhrases)
         audioQuery.speed_scale = speed
         audioQuery.pitch_scale = pitch
         audioQuery.intonation_scale = intonation
@@ -555,19 +1466,9 @@ class VoicevoxEngine:
         audioQuery.post_phoneme_length = postPhonemeLength
 
         # wavの作成
-        self.__wav = self.__synthesizer.synthesis(audioQuery, self.__voiceModelList[charaname][stylename].styleID, enable_interrogative_upspeak=upspeak)
-        # pauseLengthScaleの適用を戻す
-        for i in range(len(self._accentPhrases)):
-            accentPhrase = self._accentPhrases[i]
-            defaultPauseLengthes.append(0)
-            if accentPhrase.pause_mora is not None:
-                if accentPhrase.pause_mora.vowel == "pau":
-                    accentPhrase.pause_mora.vowel_length = defaultPauseLengthes[i]
-        if not self.__wav:
-            return False
-        return True
+        return self.__synthesizer.synthesis(audioQuery, styleID, enable_interrogative_upspeak=upspeak)
         
-    def SaveWav(self, filepath: str) -> None:
+    def SaveWav(self, filepath: str, sampleRate: int = 0, resampleQuality: str = RESAMPLE_QUALITY_STANDARD) -> None:
         '''
         WAVデータを保存する。
         事前にMakeWavを呼ぶ必要あり
@@ -575,12 +1476,16 @@ class VoicevoxEngine:
         Parameters:
         filepath: str
             保存先
+        sampleRate: int
+            保存するサンプルレート。0なら合成したまま保存する
+        resampleQuality: str
+            サンプルレートを変換する品質
         '''
         if not self.__wav:
             return
         # wavファイルに保存.
         with open(filepath, "wb") as f:
-            f.write(self.__wav)
+            f.write(wavResampler.ResampleWav(self.__wav, sampleRate, resampleQuality))
         return
 
     def PlayWav(self) -> None:
@@ -1000,12 +1905,14 @@ class VoicevoxEngine:
 
     def _UpdateMoraData(self) -> None:
         if self._accentPhrases is not None:
-            self._accentPhrases = self.__synthesizer.replace_mora_data(self._accentPhrases, self.__currentStyleID)
+            with self._lock:
+                self._accentPhrases = self.__synthesizer.replace_mora_data(self._accentPhrases, self.__currentStyleID)
 
     def _UpdateUserDict(self) -> None:
         if self._userDict is not None:
             self._userDict.save(self._user_dict_path)
-            self.__open_jtalk.use_user_dict(self._userDict)
+            with self._lock:
+                self.__open_jtalk.use_user_dict(self._userDict)
 
     def _UpdateDictionaryEditorList(self, root: tk.Misc | None) -> None:
         if self._listboxFrame is not None:
@@ -1123,85 +2030,2263 @@ class VoicevoxEngine:
         accentCanvas.configure(xscrollcommand=accentScrollbar.set)
         accentCanvas.create_window((0, 0), window=accentInnerFrame, anchor="nw", width=canvasWidth, height=canvasHeight)
 
-    def _UpdateDictionaryEditorEdit(self, root: tk.Misc | None, userDictWord: voicevox.UserDictWord | None) -> None:
-        if self._DictionaryEditFrame is not None:
-            if root is None:
-                root = self._DictionaryEditFrame.master
-            self._DictionaryEditFrame.destroy()
-        self._DictionaryEditFrame = tk.Frame(root)
-        self._DictionaryEditFrame.pack()
-        wordFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
-        surfaceLabel: ttk.Label = ttk.Label(wordFrame, text="単語")
-        surfaceLabel.grid(column=0, row=0)
-        surfaceEntry: ttk.Entry = ttk.Entry(wordFrame, width=40)
-        if userDictWord is not None:
-            surfaceEntry.insert(0, userDictWord.surface)
-        surfaceEntry.grid(column=1, row=0)
-        pronunciationLabel: ttk.Label = ttk.Label(wordFrame, text="読み(カタカナ)")
-        pronunciationLabel.grid(column=0, row=1)
-        def Validate(text) -> bool:
-            varidatePattern = r"[ァ-ヴー]+"
-            result = re.match(varidatePattern, text)
-            if result is None or result.start() != 0 or result.end() != len(text):
-                return False
-            return True
-        
-        pronunciationEntry: ttk.Entry = ttk.Entry(wordFrame, width=40, validate="key")
-        tclValidate = pronunciationEntry.register(Validate)
-        pronunciationEntry.config(validatecommand=(tclValidate, "%S"))
-        if userDictWord is not None:
-            pronunciationEntry.insert(0, userDictWord.pronunciation)
-        pronunciationEntry.grid(column=1, row=1)
-        wordFrame.pack()
-        accentFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
-        accentValue: tk.StringVar = tk.StringVar(accentFrame)
-        if userDictWord is not None:
-            accentValue.set(str(userDictWord.accent_type))
-        accentPlayButton: ttk.Button = ttk.Button(accentFrame, text="再生")
-        accentPlayButton.pack(side=tk.LEFT)
-        accentInnerFrame: tk.Frame = tk.Frame(accentFrame)
-        accentInnerFrame.pack(side=tk.LEFT)
-        self._UpdateDictionaryEditorAccentPhrase(accentInnerFrame, accentValue)
-        def OnPlayPushed() -> None:
-            charaName: str = list(self.__voiceModelList.keys())[0]
-            styleName: str = list(self.__voiceModelList[charaName].keys())[0]
-            self.MakeVoice(charaName, styleName, pronunciationEntry.get(), False)
-            if self._accentPhrases is None:
+    def _UpdateDictionaryEditorEdit(self, root: tk.Misc | None, userDictWord: voicevox.UserDictWord | None) -> None:
+        if self._DictionaryEditFrame is not None:
+            if root is None:
+                root = self._DictionaryEditFrame.master
+            self._DictionaryEditFrame.destroy()
+        self._DictionaryEditFrame = tk.Frame(root)
+        self._DictionaryEditFrame.pack()
+        wordFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
+        surfaceLabel: ttk.Label = ttk.Label(wordFrame, text="単語")
+        surfaceLabel.grid(column=0, row=0)
+        surfaceEntry: ttk.Entry = ttk.Entry(wordFrame, width=40)
+        if userDictWord is not None:
+            surfaceEntry.insert(0, userDictWord.surface)
+        surfaceEntry.grid(column=1, row=0)
+        pronunciationLabel: ttk.Label = ttk.Label(wordFrame, text="読み(カタカナ)")
+        pronunciationLabel.grid(column=0, row=1)
+        def Validate(text) -> bool:
+            varidatePattern = r"[ァ-ヴー]+"
+            result = re.match(varidatePattern, text)
+            if result is None or result.start() != 0 or result.end() != len(text):
+                return False
+            return True
+        
+        pronunciationEntry: ttk.Entry = ttk.Entry(wordFrame, width=40, validate="key")
+        tclValidate = pronunciationEntry.register(Validate)
+        pronunciationEntry.config(validatecommand=(tclValidate, "%S"))
+        if userDictWord is not None:
+            pronunciationEntry.insert(0, userDictWord.pronunciation)
+        pronunciationEntry.grid(column=1, row=1)
+        wordFrame.pack()
+        accentFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
+        accentValue: tk.StringVar = tk.StringVar(accentFrame)
+        if userDictWord is not None:
+            accentValue.set(str(userDictWord.accent_type))
+        accentPlayButton: ttk.Button = ttk.Button(accentFrame, text="再生")
+        accentPlayButton.pack(side=tk.LEFT)
+        accentInnerFrame: tk.Frame = tk.Frame(accentFrame)
+        accentInnerFrame.pack(side=tk.LEFT)
+        self._UpdateDictionaryEditorAccentPhrase(accentInnerFrame, accentValue)
+        def OnPlayPushed() -> None:
+            charaName: str = list(self.__voiceModelList.keys())[0]
+            styleName: str = list(self.__voiceModelList[charaName].keys())[0]
+            pronunciation: str = pronunciationEntry.get()
+            def OnMerged(succeeded: bool) -> None:
+                if not succeeded or self._accentPhrases is None:
+                    return
+                self.PlayWav()
+                accentValue.set(str(self._accentPhrases[0].accent))
+                self._UpdateDictionaryEditorAccentPhrase(accentInnerFrame, accentValue)
+            def OnMade(succeeded: bool) -> None:
+                if not succeeded or self._accentPhrases is None:
+                    return
+                # 1単語として読ませるため、アクセント句を1つにまとめてから作り直す
+                while len(self._accentPhrases) > 1:
+                    self.MergeAccentPhrase(0)()
+                self.MakeVoiceInBackground(accentPlayButton, OnMerged, charaName, styleName, pronunciation, False)
+            self.MakeVoiceInBackground(accentPlayButton, OnMade, charaName, styleName, pronunciation, False)
+        accentPlayButton["command"] = OnPlayPushed
+        accentFrame.pack()
+
+        priorityFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
+        priorityLabel: ttk.Label = ttk.Label(priorityFrame, text="単語優先度")
+        priorityLabel.pack(anchor=tk.W)
+        priorityScale: tk.Scale = tk.Scale(priorityFrame, from_=0, to=10, orient=tk.HORIZONTAL)
+        if userDictWord is not None:
+            priorityScale.set(userDictWord.priority)
+        else:
+            priorityScale.set(5)
+        priorityScale.pack()
+        priorityFrame.pack()
+
+        def OnDecide() -> None:
+            newUserDictWord = voicevox.UserDictWord(surfaceEntry.get(), pronunciationEntry.get(), int(accentValue.get()), "COMMON_NOUN", int(priorityScale.get()))
+            if userDictWord is None:
+                self.AddUserDict(newUserDictWord)
+            else:
+                self.UpdateUserDictWord(self.SearchUserDictWordUUID(userDictWord), newUserDictWord)
+            messagebox.showinfo("", "ユーザー辞書を更新しました。")
+        decideButton: ttk.Button = ttk.Button(self._DictionaryEditFrame, text="保存", command=OnDecide)
+        decideButton.pack(anchor=tk.E)
+
+class WavResampler:
+    '''
+    VOICEVOXが出力する24kHzの音声を、書き出す前にプロジェクトのサンプルレートへ変換する。
+    変換しておけば、Resolveが再生や書き出しのたびにクリップごとにリサンプルしなくてよくなる。
+    カイザー窓を掛けたsinc関数のポリフェーズフィルタをNumPyで計算する。
+    '''
+    # 品質ごとの(片側の零点の数, カイザー窓のβ, ナイキスト周波数に対する通過帯域の割合)
+    QUALITY_PRESETS: Final = {
+        RESAMPLE_QUALITY_FAST: (4, 5.0, 0.85),
+        RESAMPLE_QUALITY_STANDARD: (16, 8.0, 0.92),
+        RESAMPLE_QUALITY_HIGH: (32, 10.0, 0.95),
+    }
+    QUALITY_NAMES: Final = {
+        RESAMPLE_QUALITY_OFF: "変換しない",
+        RESAMPLE_QUALITY_FAST: "速度優先",
+        RESAMPLE_QUALITY_STANDARD: "標準",
+        RESAMPLE_QUALITY_HIGH: "品質優先",
+    }
+    def __init__(self) -> None:
+        # (up, down, quality)ごとのフィルタ
+        self._filters: dict[tuple[int, int, str], tuple[np.ndarray, int]] = {}
+
+    @staticmethod
+    def IsAvailable() -> bool:
+        return numpyAvailable
+
+    def _GetFilter(self, up: int, down: int, quality: str) -> tuple[np.ndarray, int]:
+        '''
+        位相ごとのフィルタ係数を取得する
+
+        Returns: tuple[np.ndarray, int]
+            (up, タップ数)の係数と、片側のタップ数
+        '''
+        key: tuple[int, int, str] = (up, down, quality)
+        if key in self._filters:
+            return self._filters[key]
+        zeroCrossings, beta, rolloff = WavResampler.QUALITY_PRESETS[quality]
+        # ダウンサンプルの場合は出力のナイキスト周波数で切る
+        cutoff: float = min(1.0, up / down) * rolloff
+        halfWidth: float = zeroCrossings / cutoff
+        sideTaps: int = math.ceil(halfWidth)
+        # 出力サンプルの位置から見た入力サンプルの相対位置(入力サンプル単位)
+        offsets: np.ndarray = np.arange(-sideTaps + 1, sideTaps + 1)[None, :] - (np.arange(up) / up)[:, None]
+        window: np.ndarray = np.i0(beta * np.sqrt(np.clip(1.0 - (offsets / halfWidth) ** 2, 0.0, None))) / np.i0(beta)
+        window[np.abs(offsets) >= halfWidth] = 0.0
+        bank: np.ndarray = cutoff * np.sinc(cutoff * offsets) * window
+        # 位相ごとに直流のゲインを1にする
+        bank /= bank.sum(axis=1, keepdims=True)
+        self._filters[key] = (bank, sideTaps)
+        return self._filters[key]
+
+    def Resample(self, samples: np.ndarray, srcRate: int, dstRate: int, quality: str = RESAMPLE_QUALITY_STANDARD) -> np.ndarray:
+        '''
+        サンプル列のサンプルレートを変換する
+
+        Parameters:
+        samples: np.ndarray
+            (サンプル数, チャンネル数)のサンプル列
+        srcRate: int
+            変換前のサンプルレート
+        dstRate: int
+            変換後のサンプルレート
+        quality: str
+            RESAMPLE_QUALITY_FAST, RESAMPLE_QUALITY_STANDARD, RESAMPLE_QUALITY_HIGHのいずれか
+
+        Returns: np.ndarray
+            (変換後のサンプル数, チャンネル数)のfloat64のサンプル列
+        '''
+        divisor: int = math.gcd(srcRate, dstRate)
+        up: int = dstRate // divisor
+        down: int = srcRate // divisor
+        inputCount: int = samples.shape[0]
+        outputCount: int = -(-inputCount * up // down)
+        bank, sideTaps = self._GetFilter(up, down, quality)
+        padded: np.ndarray = np.pad(samples.astype(np.float64), ((sideTaps, sideTaps + 1), (0, 0)))
+        output: np.ndarray = np.empty((outputCount, samples.shape[1]), dtype=np.float64)
+        # 出力サンプルnとn+upは同じ位相のフィルタを使い、入力の位置はdownずつずれる。
+        # 位相ごとに、入力を間引いた列とフィルタ係数の積和をタップの数だけ足し合わせる
+        for first in range(min(up, outputCount)):
+            count: int = len(range(first, outputCount, up))
+            base: int = first * down // up
+            phase: int = first * down % up
+            accumulator: np.ndarray = np.zeros((count, samples.shape[1]), dtype=np.float64)
+            for tap in range(2 * sideTaps):
+                start: int = base + 1 + tap
+                accumulator += bank[phase, tap] * padded[start:start + down * (count - 1) + 1:down]
+            output[first::up] = accumulator
+        return output
+
+    def ResampleWav(self, wav: bytes, dstRate: int, quality: str = RESAMPLE_QUALITY_STANDARD) -> bytes:
+        '''
+        16bit PCMのwavデータのサンプルレートを変換する。
+        変換しない設定の場合や、NumPyがない・サンプルレートが同じ・16bit以外の場合はそのまま返す
+
+        Parameters:
+        wav: bytes
+            wavデータ
+        dstRate: int
+            変換後のサンプルレート
+        quality: str
+            RESAMPLE_QUALITY_*のいずれか
+
+        Returns: bytes
+            変換後のwavデータ
+        '''
+        if not wav or dstRate <= 0 or quality not in WavResampler.QUALITY_PRESETS or not WavResampler.IsAvailable():
+            return wav
+        with wave.open(BytesIO(wav), "rb") as wavedata:
+            srcRate: int = wavedata.getframerate()
+            channels: int = wavedata.getnchannels()
+            if srcRate == dstRate or wavedata.getsampwidth() != 2:
+                return wav
+            samples: np.ndarray = np.frombuffer(wavedata.readframes(wavedata.getnframes()), dtype="<i2").reshape(-1, channels)
+        # 合成のワーカースレッドから呼ばれるので、メインスレッド用のresolveProfiler.Measureでは計測しない.
+        # 所要時間はベンチマークのresampleで測る
+        resampled: np.ndarray = self.Resample(samples, srcRate, dstRate, quality)
+        pcm: bytes = np.clip(np.rint(resampled), -32768, 32767).astype("<i2").tobytes()
+        output: BytesIO = BytesIO()
+        with wave.open(output, "wb") as outWave:
+            outWave.setnchannels(channels)
+            outWave.setsampwidth(2)
+            outWave.setframerate(dstRate)
+            outWave.writeframes(pcm)
+        return output.getvalue()
+
+wavResampler: WavResampler = WavResampler()
+
+class DialogueLayout:
+    '''
+    複数キャラの掛け合いの配置を、ResolveのAPIを使わずにフレーム単位で計算する。
+    行の長さ・行の後の間・前の行への重なりから、各行の音声・画像・字幕の開始と終了のフレームを決める。
+    画像は話している間だけ表示する設定でなければ、同じキャラの次の行(なければタイムラインの最後)まで表示する。
+    '''
+    class Entry:
+        '''
+        1行分の入力。フレーム数はすべてタイムラインのフレームレートでの整数
+        '''
+        def __init__(self, character: str, duration: int, pauseAfter: int = 0, overlap: int = 0, voiceOnly: bool = False) -> None:
+            '''
+            Parameters:
+            character: str
+                話すキャラ。同じキャラの行は同じトラックに置く
+            duration: int
+                音声の長さ
+            pauseAfter: int
+                この行の後、次の行までの間
+            overlap: int
+                前の行の終わり(間を含む)に、この行の始まりを重ねる長さ
+            voiceOnly: bool
+                話している間だけ画像を表示するか
+            '''
+            self.character: str = character
+            self.duration: int = duration
+            self.pauseAfter: int = pauseAfter
+            self.overlap: int = overlap
+            self.voiceOnly: bool = voiceOnly
+
+    class Placement:
+        '''
+        1行分の配置結果。終了フレームは含まない
+        '''
+        def __init__(self, entry: DialogueLayout.Entry, startFrame: int, endFrame: int) -> None:
+            self.entry: DialogueLayout.Entry = entry
+            self.voiceStart: int = startFrame
+            self.voiceEnd: int = endFrame
+            self.imageStart: int = startFrame
+            self.imageEnd: int = endFrame
+            self.textStart: int = startFrame
+            self.textEnd: int = endFrame
+
+    @staticmethod
+    def Plan(entries: list[DialogueLayout.Entry], startFrame: int) -> tuple[list[DialogueLayout.Placement], int]:
+        '''
+        行の配置を計算する。
+        重なりで前の行より前に始まることはなく、同じキャラの前の行とは重ならないように後ろにずらす。
+
+        Parameters:
+        entries: list[DialogueLayout.Entry]
+            並べる順番の行
+        startFrame: int
+            最初の行の開始フレーム
+
+        Returns: tuple[list[DialogueLayout.Placement], int]
+            各行の配置と、タイムラインの終了フレーム
+        '''
+        placements: list[DialogueLayout.Placement] = []
+        # 次の行を置く基準のフレームと、直前の行の開始フレーム
+        cursor: int = startFrame
+        prevStart: int = startFrame
+        characterEnd: dict[str, int] = {}
+        endFrame: int = startFrame
+        for entry in entries:
+            start: int = max(cursor - entry.overlap, prevStart, characterEnd.get(entry.character, startFrame))
+            end: int = start + max(entry.duration, 0)
+            placements.append(DialogueLayout.Placement(entry, start, end))
+            characterEnd[entry.character] = end
+            prevStart = start
+            cursor = end + entry.pauseAfter
+            endFrame = max(endFrame, end)
+        nextStart: dict[str, int] = {}
+        for placement in reversed(placements):
+            if not placement.entry.voiceOnly:
+                placement.imageEnd = nextStart.get(placement.entry.character, endFrame)
+            nextStart[placement.entry.character] = placement.voiceStart
+        return placements, endFrame
+
+class TimelineBuilder:
+    '''
+    複数行分の音声・画像・字幕を1つのFCPXMLにまとめ、ImportTimelineFromFileの1回で新しいタイムラインとして取り込む。
+    1行ずつAppendToTimelineとFusionのツール操作を行うより、API呼び出しが行数によらずほぼ一定になる。
+    字幕はFusionのTextPlusではなくFCPXMLのタイトルとして取り込まれるため、スタイルは近い値に変換する。
+    '''
+    FCPXML_VERSION: Final = "1.9"
+    # 音声をまとめて書き出す際に一度に読み書きするサンプル数
+    STEM_CHUNK_FRAMES: Final = 65536
+    # FCPXMLのタイトルを取り込む際に使うエフェクト
+    TITLE_EFFECT_UID: Final = ".../Titles.localized/Bumper:Opener.localized/Basic Title.localized/Basic Title.moti"
+
+    class Line:
+        '''
+        1行分の素材。設定は追加した時点のものを保持する
+        '''
+        def __init__(self, packingData: PackingData, wavFile: str, text: str, pauseAfter: int = 0, overlap: int = 0) -> None:
+            self.packingData: PackingData = packingData
+            self.wavFile: str = wavFile
+            self.text: str = text
+            self.pauseAfter: int = pauseAfter
+            self.overlap: int = overlap
+            with wave.open(wavFile, "rb") as wavedata:
+                self.sampleRate: int = wavedata.getframerate()
+                self.sampleCount: int = wavedata.getnframes()
+                self.channels: int = wavedata.getnchannels()
+                self.sampleWidth: int = wavedata.getsampwidth()
+            self.imageName: str = cast(str, packingData.imageData["selectImage"])
+            self.imageFile: str = packingData.imageData.GetImage(self.imageName)
+            self.imageTransform: tuple[float, float, bool, float] = (packingData.imageData["x"], packingData.imageData["y"], packingData.imageData["flipx"], packingData.imageData["zoom"])
+            self.voiceOnly: bool = cast(bool, packingData.imageData["voiceOnly"])
+            self.textStyle: dict[str, Any] = dict(packingData.textData._params)
+            # 字幕を画像として置く場合の画像ファイル
+            self.textImage: str = ""
+            self.startFrame: int = 0
+            self.endFrame: int = 0
+            self.imageEndFrame: int = 0
+
+    def __init__(self, frameRate: FrameRate, width: int, height: int, startFrame: int) -> None:
+        '''
+        Parameters:
+        frameRate: FrameRate
+            作成するタイムラインのフレームレート
+        width: int
+            タイムラインの横幅
+        height: int
+            タイムラインの高さ
+        startFrame: int
+            タイムラインの開始フレーム
+        '''
+        self.frameRate: FrameRate = frameRate
+        self.width: int = width
+        self.height: int = height
+        self.startFrame: int = startFrame
+        self.lines: list[TimelineBuilder.Line] = []
+
+    @staticmethod
+    def FromProject(project) -> TimelineBuilder:
+        '''
+        プロジェクトのタイムライン設定からTimelineBuilderを作成する
+        '''
+        frameRate: FrameRate = FrameRate.FromSetting(project.GetSetting("timelineFrameRate"), project.GetSetting("timelineDropFrameTimecode"))
+        width: int = int(project.GetSetting("timelineResolutionWidth") or 1920)
+        height: int = int(project.GetSetting("timelineResolutionHeight") or 1080)
+        return TimelineBuilder(frameRate, width, height, frameRate.TimecodeToFrames("01:00:00;00" if frameRate.dropFrame else "01:00:00:00"))
+
+    def Add(self, packingData: PackingData, wavFile: str, text: str, pauseAfter: int = 0, overlap: int = 0) -> TimelineBuilder.Line:
+        '''
+        行を末尾に追加する
+
+        Parameters:
+        packingData: PackingData
+            話すキャラ
+        wavFile: str
+            音声ファイルのパス
+        text: str
+            字幕。空文字なら字幕は入れない
+        pauseAfter: int
+            この行の後、次の行までの間のフレーム数
+        overlap: int
+            前の行の終わりに重ねるフレーム数
+        '''
+        line: TimelineBuilder.Line = TimelineBuilder.Line(packingData, wavFile, text, pauseAfter, overlap)
+        if text and line.textStyle["outputMode"] == TEXT_OUTPUT_IMAGE and SubtitleRenderer.IsAvailable():
+            line.textImage = subtitleRenderer.Render(text, packingData.textData, self.width, self.height)
+        self.lines.append(line)
+        return line
+
+    def Layout(self) -> int:
+        '''
+        DialogueLayoutで各行の開始・終了フレームを決める。
+
+        Returns: int
+            タイムラインの終了フレーム
+        '''
+        entries: list[DialogueLayout.Entry] = [
+            DialogueLayout.Entry(line.packingData.name, self.frameRate.SecondsToFrames(Fraction(line.sampleCount, line.sampleRate)), line.pauseAfter, line.overlap, line.voiceOnly)
+            for line in self.lines
+        ]
+        placements, endFrame = DialogueLayout.Plan(entries, self.startFrame)
+        for line, placement in zip(self.lines, placements):
+            line.startFrame = placement.voiceStart
+            line.endFrame = placement.voiceEnd
+            line.imageEndFrame = placement.imageEnd
+        return endFrame
+
+    def WriteStems(self, outDir: str, baseName: str) -> dict[str, str]:
+        '''
+        キャラごとに、配置どおりの間を空けて全行の音声をつなげた1つのwavファイルを書き出す。
+        各行は少しずつ読み書きするので、全体をメモリに読み込まない。
+        あわせて、各行がどのファイルの何サンプル目にあるかの対応表を{baseName}_offsets.jsonに書き出す。
+
+        Parameters:
+        outDir: str
+            書き出し先のフォルダ
+        baseName: str
+            書き出すファイル名の先頭。{baseName}_{キャラ名}.wavになる
+
+        Returns: dict[str, str]
+            キャラ名から書き出したファイルのパスへの対応
+        '''
+        endFrame: int = self.Layout()
+        stems: dict[str, str] = {}
+        if len(self.lines) == 0:
+            return stems
+        # 形式は最初の行に合わせ、サンプルレートが違う行は変換する
+        sampleRate: int = self.lines[0].sampleRate
+        channels: int = self.lines[0].channels
+        sampleWidth: int = self.lines[0].sampleWidth
+
+        def ToSample(frame: int) -> int:
+            return round((frame - self.startFrame) * sampleRate / self.frameRate.rate)
+
+        offsets: list[dict[str, Any]] = []
+        # 同じ音声ファイルを使い回した行もあるので、行は番号で区別する
+        characterLines: dict[str, list[tuple[int, TimelineBuilder.Line]]] = {}
+        for index, line in enumerate(self.lines):
+            characterLines.setdefault(line.packingData.name, []).append((index, line))
+        os.makedirs(outDir, exist_ok=True)
+        for name, lines in characterLines.items():
+            stemFile: str = f"{outDir}/{baseName}_{name}.wav"
+            tempFile: str = f"{stemFile}.{os.getpid()}.tmp"
+            try:
+                with resolveProfiler.Measure("WriteStem"), wave.open(tempFile, "wb") as stem:
+                    stem.setnchannels(channels)
+                    stem.setsampwidth(sampleWidth)
+                    stem.setframerate(sampleRate)
+                    position: int = 0
+
+                    def WriteSilence(count: int) -> None:
+                        nonlocal position
+                        while count > 0:
+                            chunk: int = min(count, TimelineBuilder.STEM_CHUNK_FRAMES)
+                            stem.writeframesraw(bytes(chunk * channels * sampleWidth))
+                            position += chunk
+                            count -= chunk
+
+                    for index, line in lines:
+                        if line.channels != channels or line.sampleWidth != sampleWidth:
+                            raise ValueError(f"'{line.wavFile}' のチャンネル数かビット数が他の行と違うため、つなげられません。")
+                        startSample: int = max(ToSample(line.startFrame), position)
+                        WriteSilence(startSample - position)
+                        if line.sampleRate == sampleRate:
+                            with wave.open(line.wavFile, "rb") as source:
+                                while True:
+                                    frames: bytes = source.readframes(TimelineBuilder.STEM_CHUNK_FRAMES)
+                                    if not frames:
+                                        break
+                                    stem.writeframesraw(frames)
+                                    position += len(frames) // (channels * sampleWidth)
+                        else:
+                            # 1行分だけ読み込んで変換する
+                            with open(line.wavFile, "rb") as f:
+                                resampled: bytes = wavResampler.ResampleWav(f.read(), sampleRate)
+                            with wave.open(BytesIO(resampled), "rb") as source:
+                                if source.getframerate() != sampleRate:
+                                    raise ValueError(f"'{line.wavFile}' のサンプルレートが他の行と違うため、つなげられません。")
+                                stem.writeframesraw(source.readframes(source.getnframes()))
+                                position += source.getnframes()
+                        offsets.append({
+                            "index": index,
+                            "character": name,
+                            "stem": os.path.basename(stemFile),
+                            "wavFile": line.wavFile,
+                            "text": line.text,
+                            "startFrame": line.startFrame,
+                            "endFrame": line.endFrame,
+                            "imageEndFrame": line.imageEndFrame,
+                            "startSample": startSample,
+                            "sampleCount": position - startSample,
+                            "startSeconds": startSample / sampleRate,
+                        })
+                    # 全キャラのファイルの長さをタイムラインの終わりに揃える
+                    WriteSilence(ToSample(endFrame) - position)
+                os.replace(tempFile, stemFile)
+            except BaseException:
+                # 書きかけの一時ファイルを残さない
+                try:
+                    os.remove(tempFile)
+                except OSError:
+                    pass
+                raise
+            stems[name] = stemFile
+        # 行の順番で並べ直して対応表を書き出す
+        offsets.sort(key=lambda offset: (offset["startFrame"], offset["index"]))
+        with open(f"{outDir}/{baseName}_offsets.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "frameRate": str(self.frameRate.rate),
+                "dropFrame": self.frameRate.dropFrame,
+                "startFrame": self.startFrame,
+                "endFrame": endFrame,
+                "sampleRate": sampleRate,
+                "stems": {name: os.path.basename(stemFile) for name, stemFile in stems.items()},
+                "lines": offsets,
+            }, f, ensure_ascii=False, indent=2)
+        return stems
+
+    def _Time(self, frames: int) -> str:
+        # FCPXMLの時間は秒の有理数で表す
+        seconds: Fraction = frames / self.frameRate.rate
+        return f"{seconds.numerator}/{seconds.denominator}s" if seconds.denominator != 1 else f"{seconds.numerator}s"
+
+    def _Position(self, x: float, y: float) -> str:
+        # ResolveのPan/Tiltはピクセル、FCPXMLの位置は画面の高さを100とした値
+        return f"{x * 100 / self.height:g} {y * 100 / self.height:g}"
+
+    @staticmethod
+    def _Color(color: list[float], alpha: float = 1.0) -> str:
+        return f"{color[0]:g} {color[1]:g} {color[2]:g} {alpha:g}"
+
+    def ClipNames(self, line: TimelineBuilder.Line) -> tuple[str, str, str]:
+        '''
+        1行分の音声・画像・字幕クリップの名前を返す。1行ずつ挿入する場合と同じ名前にする
+        '''
+        name: str = line.packingData.name
+        return (os.path.splitext(os.path.basename(line.wavFile))[0], f"{name}Image_{line.imageName}", f"{name}Text_{line.text[:10]}")
+
+    def WriteFcpxml(self, filePath: str, timelineName: str, fonts: FontList | None = None) -> None:
+        '''
+        配置をFCPXMLとして書き出す
+
+        Parameters:
+        filePath: str
+            書き出し先
+        timelineName: str
+            タイムライン名
+        fonts: FontList | None
+            字幕のフォント名の解決に使うフォントリスト
+        '''
+        endFrame: int = self.Layout()
+        root: ET.Element = ET.Element("fcpxml", version=TimelineBuilder.FCPXML_VERSION)
+        resources: ET.Element = ET.SubElement(root, "resources")
+        ET.SubElement(resources, "format", id="r0", name="VoiceInserterFormat", frameDuration=self._Time(1), width=str(self.width), height=str(self.height))
+        ET.SubElement(resources, "effect", id="r1", name="Basic Title", uid=TimelineBuilder.TITLE_EFFECT_UID)
+        assetIDs: dict[str, str] = {}
+        def Asset(path: str, **attributes: str) -> str:
+            if path not in assetIDs:
+                assetIDs[path] = f"r{len(assetIDs) + 2}"
+                asset: ET.Element = ET.SubElement(resources, "asset", id=assetIDs[path], name=os.path.splitext(os.path.basename(path))[0], start="0s", **attributes)
+                ET.SubElement(asset, "media-rep", kind="original-media", src=pathlib.Path(path).absolute().as_uri())
+            return assetIDs[path]
+
+        library: ET.Element = ET.SubElement(root, "library")
+        event: ET.Element = ET.SubElement(library, "event", name=CLIP_NAME_PREFIX)
+        projectElement: ET.Element = ET.SubElement(event, "project", name=timelineName)
+        sequence: ET.Element = ET.SubElement(projectElement, "sequence", format="r0", tcStart=self._Time(self.startFrame), tcFormat="DF" if self.frameRate.dropFrame else "NDF", duration=self._Time(endFrame - self.startFrame))
+        spine: ET.Element = ET.SubElement(sequence, "spine")
+        gap: ET.Element = ET.SubElement(spine, "gap", name="Gap", offset=self._Time(self.startFrame), start=self._Time(self.startFrame), duration=self._Time(endFrame - self.startFrame))
+        # キャラごとに音声は下、画像と字幕は上のレーンに置く
+        characterIndex: dict[str, int] = {}
+        textStyleCount: int = 0
+        for line in self.lines:
+            index: int = characterIndex.setdefault(line.packingData.name, len(characterIndex))
+            voiceName, imageName, textName = self.ClipNames(line)
+            # 音声
+            duration: Fraction = Fraction(line.sampleCount, line.sampleRate)
+            voiceID: str = Asset(line.wavFile, duration=f"{duration.numerator}/{duration.denominator}s", hasAudio="1", audioSources="1", audioChannels=str(line.channels), audioRate=str(line.sampleRate))
+            ET.SubElement(gap, "asset-clip", ref=voiceID, lane=str(-(index + 1)), name=voiceName, offset=self._Time(line.startFrame), start="0s", duration=self._Time(line.endFrame - line.startFrame))
+            # 画像
+            if line.imageFile and line.imageEndFrame > line.startFrame:
+                imageID: str = Asset(line.imageFile, duration="0s", hasVideo="1", format="r0")
+                image: ET.Element = ET.SubElement(gap, "video", ref=imageID, lane=str(index * 2 + 1), name=imageName, offset=self._Time(line.startFrame), start="0s", duration=self._Time(line.imageEndFrame - line.startFrame))
+                x, y, flipx, zoom = line.imageTransform
+                ET.SubElement(image, "adjust-transform", position=self._Position(x, y), scale=f"{-zoom if flipx else zoom:g} {zoom:g}")
+            # 字幕. 字幕トラックに出力する設定の場合は取り込み後にSRTで入れる
+            if line.textImage:
+                textImageID: str = Asset(line.textImage, duration="0s", hasVideo="1", format="r0")
+                ET.SubElement(gap, "video", ref=textImageID, lane=str(index * 2 + 2), name=textName, offset=self._Time(line.startFrame), start="0s", duration=self._Time(line.endFrame - line.startFrame))
+            elif line.text and line.textStyle["outputMode"] != TEXT_OUTPUT_SUBTITLE:
+                textStyleCount += 1
+                styleID: str = f"ts{textStyleCount}"
+                title: ET.Element = ET.SubElement(gap, "title", ref="r1", lane=str(index * 2 + 2), name=textName, offset=self._Time(line.startFrame), start="0s", duration=self._Time(line.endFrame - line.startFrame))
+                ET.SubElement(title, "adjust-transform", position=self._Position(line.textStyle["x"], line.textStyle["y"]))
+                textElement: ET.Element = ET.SubElement(title, "text")
+                ET.SubElement(textElement, "text-style", ref=styleID).text = line.text.rstrip("\n")
+                styleDef: ET.Element = ET.SubElement(title, "text-style-def", id=styleID)
+                ET.SubElement(styleDef, "text-style", **self._TextStyle(line.textStyle, fonts))
+        tree: ET.ElementTree = ET.ElementTree(root)
+        ET.indent(tree)
+        os.makedirs(os.path.dirname(os.path.abspath(filePath)), exist_ok=True)
+        with open(filePath, "wb") as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fcpxml>\n')
+            tree.write(f, encoding="utf-8", xml_declaration=False)
+
+    def _TextStyle(self, textStyle: dict[str, Any], fonts: FontList | None) -> dict[str, str]:
+        # TextDataの設定をFCPXMLのtext-styleの属性に変換する. TextPlusの大きさは画面の高さに対する比率として扱う
+        sizes: dict[str, float] = PackingData.TextData.GetPixelSizes(textStyle, self.height)
+        attributes: dict[str, str] = {
+            "font": fonts.fonts.get(textStyle["font"], textStyle["font"]) if fonts is not None else textStyle["font"],
+            "fontSize": f"{sizes['fontSize']:g}",
+            "fontColor": TimelineBuilder._Color(textStyle["color"]),
+            "alignment": "center",
+        }
+        if fonts is not None and textStyle["style"]:
+            attributes["fontFace"] = fonts.style.get(textStyle["font"], {}).get(textStyle["style"], textStyle["style"])
+        if textStyle["outerBorderEnabled"]:
+            attributes["strokeColor"] = TimelineBuilder._Color(textStyle["outerBorderColor"])
+            attributes["strokeWidth"] = f"{sizes['outerBorder']:g}"
+        elif textStyle["innerBorderEnabled"]:
+            attributes["strokeColor"] = TimelineBuilder._Color(textStyle["innerBorderColor"])
+            attributes["strokeWidth"] = f"{sizes['innerBorder']:g}"
+        if textStyle["shadowEnabled"]:
+            attributes["shadowColor"] = TimelineBuilder._Color(textStyle["shadowColor"])
+            attributes["shadowOffset"] = f"{sizes['shadowX']:g} {sizes['shadowY']:g}"
+        return attributes
+
+    def Import(self, project, timelineName: str, fonts: FontList | None = None, filePath: str = BULK_TIMELINE_FILE) -> Any | None:
+        '''
+        FCPXMLを書き出して新しいタイムラインとして取り込み、トラック名を1行ずつ挿入する場合と同じにする。
+
+        Parameters:
+        project: project
+            取り込み先のプロジェクト
+        timelineName: str
+            作成するタイムライン名
+        fonts: FontList | None
+            字幕のフォント名の解決に使うフォントリスト
+        filePath: str
+            FCPXMLの書き出し先
+
+        Returns: timeline | None
+            作成したタイムライン。失敗した場合はNone
+        '''
+        with resolveProfiler.Measure("ImportTimeline"):
+            self.WriteFcpxml(filePath, timelineName, fonts)
+            mediaPool = project.GetMediaPool()
+            prevCurrentFolder = mediaPool.GetCurrentFolder()
+            # 素材はVoicesフォルダに取り込む
+            ResolveUtil.MoveCurrentFolder(mediaPool, f"/{CLIP_NAME_PREFIX}/Voices")
+            timeline = mediaPool.ImportTimelineFromFile(filePath, {"timelineName": timelineName, "importSourceClips": True})
+            mediaPool.SetCurrentFolder(prevCurrentFolder)
+            if not timeline:
+                messagebox.showerror("Error", "タイムラインの取り込みに失敗しました。")
+                return None
+            project.SetCurrentTimeline(timeline)
+            # 取り込まれたトラックは番号だけなので、クリップ名からキャラのトラック名を付け直す
+            trackNames: dict[str, str] = {}
+            for line in self.lines:
+                voiceName, imageName, textName = self.ClipNames(line)
+                trackNames[voiceName] = line.packingData.voiceTrackName
+                trackNames[imageName] = line.packingData.imageTrackName
+                trackNames[textName] = line.packingData.textTrackName
+            for trackType in (TRACK_TYPE_AUDIO_STRING, TRACK_TYPE_VIDEO_STRING):
+                for trackIndex in range(1, timeline.GetTrackCount(trackType) + 1):
+                    for clip in timeline.GetItemsInTrack(trackType, trackIndex).values():
+                        if clip.GetName() in trackNames:
+                            timeline.SetTrackName(trackType, trackIndex, trackNames[clip.GetName()])
+                            break
+            subtitleCharacters: dict[str, PackingData] = {}
+            for line in self.lines:
+                if line.text and line.textStyle["outputMode"] == TEXT_OUTPUT_SUBTITLE:
+                    line.packingData.pendingSubtitles.append((line.startFrame, line.endFrame, line.text))
+                    subtitleCharacters[line.packingData.name] = line.packingData
+            for packingData in subtitleCharacters.values():
+                packingData.FlushSubtitles()
+            return timeline
+
+class SubtitleRenderer:
+    '''
+    字幕をResolveの外で透過PNGに描画する。
+    TextPlusの代わりに静止画として置けば、Resolveが再生のたびに縁取りや影付きの文字を描画しなくてよくなる。
+    画像はテキストとスタイルのハッシュをファイル名にしてディスクにキャッシュし、同じ字幕は描画し直さない。
+    '''
+    # 描画方法を変えた場合は上げて、古いキャッシュを使わないようにする
+    CACHE_VERSION: Final = 1
+
+    def __init__(self, cacheDir: str = SUBTITLE_IMAGE_DIR) -> None:
+        self.cacheDir: str = cacheDir
+        self.renderedCount: int = 0
+        self.cachedCount: int = 0
+
+    @staticmethod
+    def IsAvailable() -> bool:
+        return pillowAvailable
+
+    def GetImagePath(self, text: str, textData: PackingData.TextData, width: int, height: int) -> str:
+        '''
+        字幕画像のキャッシュ先のパスを取得する。テキスト・スタイル・フォントファイル・画面サイズが同じなら同じパスになる
+        '''
+        style: dict[str, Any] = textData.GetStyle()
+        payload: str = json.dumps({
+            "version": SubtitleRenderer.CACHE_VERSION,
+            "text": text.strip("\n"),
+            "style": style,
+            "fontFile": textData.fonts.GetFontFile(style["font"], style["style"]),
+            "frame": [width, height],
+        }, sort_keys=True, ensure_ascii=False)
+        digest: str = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        # ファイル名が数字で終わると連番画像として取り込まれるので、数字以外で終える
+        return f"{self.cacheDir}/{digest[:2]}/{digest}_text.png"
+
+    def Render(self, text: str, textData: PackingData.TextData, width: int, height: int) -> str:
+        '''
+        字幕を画面サイズの透過PNGに描画する。キャッシュがあれば描画しない
+
+        Parameters:
+        text: str
+            字幕
+        textData: PackingData.TextData
+            字幕の設定
+        width: int
+            画面の横幅
+        height: int
+            画面の高さ
+
+        Returns: str
+            PNGファイルのパス
+        '''
+        imagePath: str = self.GetImagePath(text, textData, width, height)
+        if os.path.exists(imagePath):
+            self.cachedCount += 1
+            return imagePath
+        with resolveProfiler.Measure("RenderSubtitleImage"):
+            image: Image.Image = self._Draw(text.strip("\n"), textData.GetStyle(), textData.fonts, width, height)
+            os.makedirs(os.path.dirname(imagePath), exist_ok=True)
+            # 書き込み途中のファイルを使わないように、一時ファイルに書いてから置き換える
+            tempPath: str = f"{imagePath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(tempPath, format="PNG")
+            os.replace(tempPath, imagePath)
+        self.renderedCount += 1
+        return imagePath
+
+    @staticmethod
+    def _Color(color: list[float], alpha: int = 255) -> tuple[int, int, int, int]:
+        return (int(color[0] * 255), int(color[1] * 255), int(color[2] * 255), alpha)
+
+    @staticmethod
+    def _WrapLines(text: str, font: ImageFont.FreeTypeFont, maxWidth: float) -> list[str]:
+        # 日本語は単語の区切りがないので1文字ずつ折り返し位置を探す
+        lines: list[str] = []
+        for paragraph in text.split("\n"):
+            current: str = ""
+            for char in paragraph:
+                if current and font.getlength(current + char) > maxWidth:
+                    lines.append(current)
+                    current = char
+                else:
+                    current += char
+            lines.append(current)
+        return lines
+
+    def _Draw(self, text: str, style: dict[str, Any], fonts: FontList, width: int, height: int) -> Image.Image:
+        sizes: dict[str, float] = PackingData.TextData.GetPixelSizes(style, height)
+        fontFile: tuple[str, int] | None = fonts.GetFontFile(style["font"], style["style"])
+        font: ImageFont.FreeTypeFont | ImageFont.ImageFont
+        if fontFile is not None:
+            font = ImageFont.truetype(fontFile[0], max(int(sizes["fontSize"]), 1), index=fontFile[1])
+        else:
+            font = ImageFont.load_default(max(int(sizes["fontSize"]), 1))
+        lines: list[str] = SubtitleRenderer._WrapLines(text, cast(ImageFont.FreeTypeFont, font), style["boxWidth"] * width)
+        block: str = "\n".join(lines)
+        # Pan/Tiltと同じく画面中央からのピクセル数. Tiltは上向きが正
+        center: tuple[float, float] = (width / 2 + style["x"], height / 2 - style["y"])
+        spacing: int = int(sizes["fontSize"] * 0.2)
+        outerBorder: int = max(int(sizes["outerBorder"]), 1) if style["outerBorderEnabled"] else 0
+        innerBorder: int = max(int(sizes["innerBorder"]), 1) if style["innerBorderEnabled"] else 0
+        image: Image.Image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        if style["shadowEnabled"]:
+            shadow: Image.Image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+            shadowCenter: tuple[float, float] = (center[0] + sizes["shadowX"], center[1] + sizes["shadowY"])
+            shadowColor: tuple[int, int, int, int] = SubtitleRenderer._Color(style["shadowColor"])
+            ImageDraw.Draw(shadow).multiline_text(shadowCenter, block, font=font, fill=shadowColor, anchor="mm", align="center", spacing=spacing, stroke_width=max(outerBorder, innerBorder), stroke_fill=shadowColor)
+            blur: float = sizes["fontSize"] * 0.05 * style["shadowSize"]
+            if blur > 0:
+                shadow = shadow.filter(ImageFilter.GaussianBlur(blur))
+            image.alpha_composite(shadow)
+        draw: ImageDraw.ImageDraw = ImageDraw.Draw(image)
+        if outerBorder > 0:
+            outerColor: tuple[int, int, int, int] = SubtitleRenderer._Color(style["outerBorderColor"])
+            draw.multiline_text(center, block, font=font, fill=outerColor, anchor="mm", align="center", spacing=spacing, stroke_width=outerBorder, stroke_fill=outerColor)
+        if innerBorder > 0:
+            draw.multiline_text(center, block, font=font, fill=SubtitleRenderer._Color(style["color"]), anchor="mm", align="center", spacing=spacing, stroke_width=innerBorder, stroke_fill=SubtitleRenderer._Color(style["innerBorderColor"]))
+        draw.multiline_text(center, block, font=font, fill=SubtitleRenderer._Color(style["color"]), anchor="mm", align="center", spacing=spacing)
+        return image
+
+subtitleRenderer: SubtitleRenderer = SubtitleRenderer()
+
+class ThumbnailCache:
+    '''
+    表情画像のプレビューに使う縮小画像のキャッシュ。
+    縮小画像は元画像のパス・更新日時・サイズをキーにしてディスクに保存し、表示した画像はメモリ上に一定数だけ残す。
+    Pillowがあれば縮小は別スレッドで行い、できあがったらUIスレッドで表示する。
+    '''
+    # 縮小方法を変えた場合は上げて、古いキャッシュを使わないようにする
+    CACHE_VERSION: Final = 1
+    # メモリ上に残す縮小画像の数
+    MEMORY_ITEMS: Final = 64
+    # 別スレッドの縮小が終わったか確認する間隔
+    POLL_INTERVAL_MS: Final = 30
+
+    def __init__(self, cacheDir: str = THUMBNAIL_DIR, memoryItems: int = MEMORY_ITEMS, maxWorkers: int = 2) -> None:
+        self.cacheDir: str = cacheDir
+        self.memoryItems: int = memoryItems
+        self.maxWorkers: int = maxWorkers
+        # キーから表示用の画像への対応. 最近使ったものが後ろ
+        self._memory: OrderedDict[str, tk.PhotoImage] = OrderedDict()
+        self._executor: ThreadPoolExecutor | None = None
+        # 縮小中の画像のキーから、縮小画像のパスを返すFutureへの対応
+        self._generating: dict[str, Future[str | None]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self.generatedCount: int = 0
+        self.diskHitCount: int = 0
+        self.memoryHitCount: int = 0
+
+    def GetKey(self, imagePath: str, width: int, height: int) -> str | None:
+        '''
+        縮小画像のキーを取得する。元画像が更新されるとキーも変わる
+
+        Returns: str | None
+            キー。元画像が無ければNone
+        '''
+        try:
+            stat: os.stat_result = os.stat(imagePath)
+        except OSError:
+            return None
+        payload: str = json.dumps([ThumbnailCache.CACHE_VERSION, os.path.abspath(imagePath), stat.st_mtime_ns, stat.st_size, width, height], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def GetThumbnailPath(self, key: str) -> str:
+        return f"{self.cacheDir}/{key[:2]}/{key}.png"
+
+    def Generate(self, imagePath: str, width: int, height: int) -> str | None:
+        '''
+        縮小画像をディスクに作る。すでにあれば作らない。Pillowが必要。別スレッドから呼んでもよい
+
+        Parameters:
+        imagePath: str
+            元画像のパス
+        width: int
+            縮小後の最大の横幅
+        height: int
+            縮小後の最大の高さ
+
+        Returns: str | None
+            縮小画像のパス。作れなければNone
+        '''
+        key: str | None = self.GetKey(imagePath, width, height)
+        if key is None:
+            return None
+        thumbnailPath: str = self.GetThumbnailPath(key)
+        if os.path.exists(thumbnailPath):
+            return thumbnailPath
+        try:
+            with Image.open(imagePath) as image:
+                # JPEGは読み込み時に縮小できるので、元の大きさで展開しない
+                image.draft("RGB", (width, height))
+                thumbnail: Image.Image = image.convert("RGBA") if image.mode not in ("RGB", "RGBA") else image.copy()
+            thumbnail.thumbnail((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            os.makedirs(os.path.dirname(thumbnailPath), exist_ok=True)
+            tempPath: str = f"{thumbnailPath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            thumbnail.save(tempPath, format="PNG", compress_level=1)
+            os.replace(tempPath, thumbnailPath)
+        except (OSError, ValueError) as e:
+            print(f"縮小画像を作れませんでした: {imagePath}: {e}")
+            return None
+        self.generatedCount += 1
+        return thumbnailPath
+
+    def Prefetch(self, imagePaths: list[str], width: int, height: int) -> None:
+        '''
+        縮小画像を別スレッドで先に作っておく。Pillowが無ければ何もしない
+        '''
+        if not pillowAvailable:
+            return
+        for imagePath in imagePaths:
+            if imagePath:
+                self._Submit(imagePath, width, height)
+
+    def Request(self, widget: tk.Misc, imagePath: str, width: int, height: int, OnReady: Callable[[tk.PhotoImage | None], None]) -> None:
+        '''
+        縮小画像を表示用に取得する。キャッシュにあればその場で、無ければ縮小が終わってからOnReadyを呼ぶ
+
+        Parameters:
+        widget: tk.Misc
+            縮小の完了を待つのに使うウィジェット
+        imagePath: str
+            元画像のパス
+        width: int
+            縮小後の最大の横幅
+        height: int
+            縮小後の最大の高さ
+        OnReady: Function(tk.PhotoImage | None) => None
+            縮小画像を受け取る関数。読み込めなければNoneを渡す
+        '''
+        key: str | None = self.GetKey(imagePath, width, height)
+        if key is None:
+            OnReady(None)
+            return
+        image: tk.PhotoImage | None = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            self.memoryHitCount += 1
+            OnReady(image)
+            return
+        thumbnailPath: str = self.GetThumbnailPath(key)
+        if os.path.exists(thumbnailPath):
+            self.diskHitCount += 1
+            OnReady(self._Remember(key, thumbnailPath))
+            return
+        if not pillowAvailable:
+            # Pillowが無い場合はUIスレッドで縮小し、次からはディスクのキャッシュを使う
+            OnReady(self._GenerateWithTk(key, imagePath, width, height))
+            return
+        future: Future[str | None] = self._Submit(imagePath, width, height)
+        def Check() -> None:
+            if not future.done():
+                widget.after(ThumbnailCache.POLL_INTERVAL_MS, Check)
+                return
+            generatedPath: str | None = future.result()
+            OnReady(self._Remember(key, generatedPath) if generatedPath is not None else None)
+        Check()
+
+    def Shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _Submit(self, imagePath: str, width: int, height: int) -> Future[str | None]:
+        key: str = f"{os.path.abspath(imagePath)}|{width}x{height}"
+        with self._lock:
+            future: Future[str | None] | None = self._generating.get(key)
+            if future is not None and not future.done():
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix="VoiceInserterThumbnail")
+            future = self._executor.submit(self.Generate, imagePath, width, height)
+            self._generating[key] = future
+            future.add_done_callback(lambda _: self._Forget(key))
+            return future
+
+    def _Forget(self, key: str) -> None:
+        with self._lock:
+            future: Future[str | None] | None = self._generating.get(key)
+            if future is not None and future.done():
+                del self._generating[key]
+
+    def _Remember(self, key: str, thumbnailPath: str) -> tk.PhotoImage | None:
+        try:
+            image: tk.PhotoImage = tk.PhotoImage(file=thumbnailPath)
+        except tk.TclError as e:
+            print(f"縮小画像を読み込めませんでした: {thumbnailPath}: {e}")
+            return None
+        return self._Store(key, image)
+
+    def _Store(self, key: str, image: tk.PhotoImage) -> tk.PhotoImage:
+        self._memory[key] = image
+        while len(self._memory) > self.memoryItems:
+            self._memory.popitem(last=False)
+        return image
+
+    def _GenerateWithTk(self, key: str, imagePath: str, width: int, height: int) -> tk.PhotoImage | None:
+        try:
+            image: tk.PhotoImage = tk.PhotoImage(file=imagePath)
+        except tk.TclError as e:
+            print(f"画像を読み込めませんでした: {imagePath}: {e}")
+            return None
+        imageWidth: int = image.width()
+        imageHeight: int = image.height()
+        scale: float = min(width / imageWidth, height / imageHeight, 1)
+        if scale < 1:
+            newWidth: int = int(imageWidth * scale)
+            newHeight: int = int(imageHeight * scale)
+            image = image.subsample(int(imageWidth / newWidth), int(imageHeight / newHeight))
+        thumbnailPath: str = self.GetThumbnailPath(key)
+        try:
+            os.makedirs(os.path.dirname(thumbnailPath), exist_ok=True)
+            tempPath: str = f"{thumbnailPath}.{os.getpid()}.tmp"
+            image.write(tempPath, format="png")
+            os.replace(tempPath, thumbnailPath)
+        except (OSError, tk.TclError) as e:
+            print(f"縮小画像を保存できませんでした: {thumbnailPath}: {e}")
+        self.generatedCount += 1
+        return self._Store(key, image)
+
+thumbnailCache: ThumbnailCache = ThumbnailCache()
+
+class ExpressionLibrary:
+    '''
+    表情画像のフォルダをまとめて取り込む。
+    フォルダの中を並列に列挙し、フォルダからの相対パスを表情名にする。
+    末尾の番号だけが違うファイルは連番画像として扱い、「名前 番号」の形の表情名にする。
+    '''
+    IMAGE_EXTENSIONS: Final = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+    # 末尾の番号とそれより前、拡張子に分ける
+    NUMBERED_PATTERN: Final = re.compile(r"^(.*?)(\d+)\.(\w+)$")
+
+    class Result:
+        def __init__(self, images: dict[str, str], sequenceCount: int) -> None:
+            # 表情名から画像のパスへの対応. 並び順は表情名の自然順
+            self.images: dict[str, str] = images
+            self.sequenceCount: int = sequenceCount
+
+    @staticmethod
+    def SplitNumber(fileName: str) -> tuple[str, int, str] | None:
+        '''
+        ファイル名を末尾の番号の前の部分・番号・拡張子に分ける
+
+        Returns: tuple[str, int, str] | None
+            番号の前の部分、番号、拡張子。末尾が番号でなければNone
+        '''
+        m: re.Match[str] | None = ExpressionLibrary.NUMBERED_PATTERN.match(fileName)
+        if m is None:
+            return None
+        return m.group(1), int(m.group(2)), m.group(3)
+
+    @staticmethod
+    def NaturalKey(name: str) -> list[Any]:
+        '''
+        名前の中の数字を数値として比べる並び替えのキー. face2がface10より前になる
+        '''
+        return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+    @staticmethod
+    def Scan(rootDir: str, maxWorkers: int = 8) -> list[str]:
+        '''
+        フォルダ以下の画像ファイルをサブフォルダごとに並列に列挙する
+
+        Parameters:
+        rootDir: str
+            列挙するフォルダ
+        maxWorkers: int
+            同時に列挙するフォルダ数
+
+        Returns: list[str]
+            画像ファイルのパス
+        '''
+        imagePaths: list[str] = []
+        with ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="VoiceInserterScan") as executor:
+            pending: set[Future[tuple[list[str], list[str]]]] = {executor.submit(ExpressionLibrary._ScanDir, rootDir)}
+            while pending:
+                done, notDone = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                pending = set(notDone)
+                for future in done:
+                    files, dirs = future.result()
+                    imagePaths.extend(files)
+                    pending.update(executor.submit(ExpressionLibrary._ScanDir, subDir) for subDir in dirs)
+        return imagePaths
+
+    @staticmethod
+    def DeriveNames(rootDir: str, imagePaths: list[str]) -> ExpressionLibrary.Result:
+        '''
+        画像ファイルのパスから表情名を決める。
+        サブフォルダの画像は「サブフォルダ/ファイル名」、連番画像は「番号の前の部分 番号」にする
+
+        Parameters:
+        rootDir: str
+            取り込むフォルダ
+        imagePaths: list[str]
+            画像ファイルのパス
+
+        Returns: ExpressionLibrary.Result
+            表情名と画像のパスの対応と、見つかった連番の数
+        '''
+        # 同じフォルダで番号の前と拡張子が同じファイルを連番としてまとめる
+        sequences: dict[tuple[str, str, str], list[tuple[int, str]]] = {}
+        for imagePath in imagePaths:
+            numbered: tuple[str, int, str] | None = ExpressionLibrary.SplitNumber(os.path.basename(imagePath))
+            if numbered is not None:
+                key: tuple[str, str, str] = (os.path.dirname(imagePath), numbered[0].lower(), numbered[2].lower())
+                sequences.setdefault(key, []).append((numbered[1], imagePath))
+        sequenceNames: dict[str, str] = {}
+        sequenceCount: int = 0
+        for (directory, _, _), members in sequences.items():
+            if len(members) < 2:
+                continue
+            sequenceCount += 1
+            for number, imagePath in members:
+                prefix: str = cast(tuple[str, int, str], ExpressionLibrary.SplitNumber(os.path.basename(imagePath)))[0]
+                baseName: str = prefix.rstrip(" _-.") or prefix
+                relativeDir: str = os.path.relpath(directory, rootDir)
+                sequenceNames[imagePath] = f"{baseName} {number}" if relativeDir == "." else f"{relativeDir.replace(os.sep, '/')}/{baseName} {number}"
+        images: dict[str, str] = {}
+        for imagePath in imagePaths:
+            name: str | None = sequenceNames.get(imagePath)
+            if name is None:
+                name = os.path.splitext(os.path.relpath(imagePath, rootDir))[0].replace(os.sep, "/")
+            # face_1.pngとface_01.pngのように名前が重なった場合は番号を付ける
+            uniqueName: str = name
+            count: int = 2
+            while uniqueName in images:
+                uniqueName = f"{name} ({count})"
+                count += 1
+            images[uniqueName] = imagePath.replace(os.sep, "/")
+        return ExpressionLibrary.Result({name: images[name] for name in sorted(images, key=ExpressionLibrary.NaturalKey)}, sequenceCount)
+
+    @staticmethod
+    def _ScanDir(directory: str) -> tuple[list[str], list[str]]:
+        files: list[str] = []
+        dirs: list[str] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.name.lower().endswith(ExpressionLibrary.IMAGE_EXTENSIONS):
+                        files.append(entry.path)
+        except OSError as e:
+            print(f"フォルダを読み込めませんでした: {directory}: {e}")
+        return files, dirs
+
+class ImageSequenceIndex:
+    '''
+    ファイル名の末尾が番号の画像について、連番の何コマ目かを調べる。
+    Fusionのローダーは末尾が番号の画像を連番の1コマとして読み込むので、そのコマで止めるために使う。
+    フォルダごとに連番の最初の番号を索引にして、フォルダの更新日時が変わるまで使い回す。
+    '''
+    def __init__(self) -> None:
+        # フォルダから、フォルダの更新日時と(番号の前の部分, 拡張子)ごとの最初の番号への対応
+        self._directories: dict[str, tuple[int, dict[tuple[str, str], int]]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self.scanCount: int = 0
+
+    def GetFrameOffset(self, imagePath: str) -> int:
+        '''
+        画像が連番の何コマ目かを取得する
+
+        Parameters:
+        imagePath: str
+            画像のパス
+
+        Returns: int
+            連番の最初の画像からのコマ数。末尾が番号でなければ0
+        '''
+        numbered: tuple[str, int, str] | None = ExpressionLibrary.SplitNumber(os.path.basename(imagePath))
+        if numbered is None:
+            return 0
+        prefix, number, extension = numbered
+        firstNumbers: dict[tuple[str, str], int] = self._GetFirstNumbers(os.path.dirname(os.path.abspath(imagePath)))
+        firstNumber: int = min(firstNumbers.get((prefix.lower(), extension.lower()), number), number)
+        return number - firstNumber
+
+    def _GetFirstNumbers(self, directory: str) -> dict[tuple[str, str], int]:
+        try:
+            mtime: int = os.stat(directory).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            cached: tuple[int, dict[tuple[str, str], int]] | None = self._directories.get(directory)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            firstNumbers: dict[tuple[str, str], int] = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        numbered: tuple[str, int, str] | None = ExpressionLibrary.SplitNumber(entry.name)
+                        if numbered is None:
+                            continue
+                        key: tuple[str, str] = (numbered[0].lower(), numbered[2].lower())
+                        if key not in firstNumbers or numbered[1] < firstNumbers[key]:
+                            firstNumbers[key] = numbered[1]
+            except OSError as e:
+                print(f"フォルダを読み込めませんでした: {directory}: {e}")
+            self.scanCount += 1
+            self._directories[directory] = (mtime, firstNumbers)
+            return firstNumbers
+
+imageSequenceIndex: ImageSequenceIndex = ImageSequenceIndex()
+
+class ExpressionIndex:
+    '''
+    表情名の検索用の索引。
+    名前は自然順と小文字にした名前を持っておき、追加と削除では作り直さない。
+    入力を1文字ずつ増やした場合は前回の一致から絞り込むので、全件を調べ直さない。
+    '''
+    def __init__(self, names: list[str] | None = None) -> None:
+        # 表示順. (自然順のキー, 名前)
+        self._orderedNames: list[tuple[list[Any], str]] = []
+        self._names: list[str] = []
+        # 一致を調べる用の小文字にした名前
+        self._lowerNames: dict[str, str] = {}
+        self._lastQuery: str = ""
+        # 前回の検索で一致した名前. 自然順
+        self._lastMatches: list[str] = []
+        self.Reset(names or [])
+
+    def Reset(self, names: list[str]) -> None:
+        '''
+        索引を作り直す
+        '''
+        self._orderedNames = sorted((ExpressionLibrary.NaturalKey(name), name) for name in names)
+        self._lowerNames = {name: name.lower() for name in names}
+        self._ClearCache()
+
+    def Add(self, name: str) -> None:
+        bisect.insort(self._orderedNames, (ExpressionLibrary.NaturalKey(name), name))
+        self._lowerNames[name] = name.lower()
+        self._ClearCache()
+
+    def Remove(self, name: str) -> None:
+        item: tuple[list[Any], str] = (ExpressionLibrary.NaturalKey(name), name)
+        position: int = bisect.bisect_left(self._orderedNames, item)
+        if position < len(self._orderedNames) and self._orderedNames[position] == item:
+            del self._orderedNames[position]
+        self._lowerNames.pop(name, None)
+        self._ClearCache()
+
+    def __len__(self) -> int:
+        return len(self._orderedNames)
+
+    def Search(self, query: str) -> list[str]:
+        '''
+        表情名を検索する
+
+        Parameters:
+        query: str
+            検索する文字列。大文字と小文字は区別しない
+
+        Returns: list[str]
+            前方一致する名前、部分一致する名前の順。それぞれ自然順
+        '''
+        query = query.strip().lower()
+        if not query:
+            return list(self._names)
+        # 前回一致しなかった名前は、入力を増やしても一致しない
+        candidates: list[str] = self._lastMatches if self._lastQuery and query.startswith(self._lastQuery) else self._names
+        lowerNames: dict[str, str] = self._lowerNames
+        matches: list[str] = [name for name in candidates if query in lowerNames[name]]
+        self._lastQuery = query
+        self._lastMatches = matches
+        prefixMatches: list[str] = [name for name in matches if lowerNames[name].startswith(query)]
+        if len(prefixMatches) == len(matches):
+            return matches
+        prefixSet: set[str] = set(prefixMatches)
+        return prefixMatches + [name for name in matches if name not in prefixSet]
+
+    def _ClearCache(self) -> None:
+        self._names = [name for _, name in self._orderedNames]
+        self._lastQuery = ""
+        self._lastMatches = []
+
+class ExpressionPicker:
+    '''
+    表情の選択UI。
+    名前で絞り込める縮小画像の一覧で、見えている範囲のセルだけを描画するので、表情が数百あっても軽い。
+    検索欄で上下左右キーを押すとカーソルが動き、Enterで選択する。
+    '''
+    CELL_WIDTH: Final = 80
+    CELL_HEIGHT: Final = 116
+    THUMBNAIL_WIDTH: Final = 48
+    THUMBNAIL_HEIGHT: Final = 96
+    VISIBLE_ROWS: Final = 2
+
+    class Cell:
+        def __init__(self, name: str, items: list[int]) -> None:
+            self.name: str = name
+            self.items: list[int] = items
+            self.image: tk.PhotoImage | None = None
+
+    def __init__(self, OnSelect: Callable[[str], None]) -> None:
+        '''
+        Parameters:
+        OnSelect: Function(str) => None
+            表情が選ばれた時に呼ぶ関数。表情名を渡す
+        '''
+        self.OnSelect: Callable[[str], None] = OnSelect
+        self.index: ExpressionIndex = ExpressionIndex()
+        self.images: dict[str, str | None] = {}
+        # 絞り込んだ表情名. 一覧に表示する順
+        self.shownNames: list[str] = []
+        self.selected: str = ""
+        self.cursor: int = 0
+        self.canvas: tk.Canvas | None = None
+        self.searchValue: tk.StringVar | None = None
+        # 一覧での位置から、描画しているセルへの対応
+        self._cells: dict[int, ExpressionPicker.Cell] = {}
+        self._columns: int = 1
+
+    def Disp(self, frame: tk.Misc) -> None:
+        '''
+        tkinterで表情の選択UIを表示する。
+
+        Parameters:
+        frame: tk.Misc
+            UIを表示するフレーム
+        '''
+        searchFrame: tk.Frame = tk.Frame(frame)
+        searchFrame.pack(fill=tk.X, padx=5)
+        searchLabel: ttk.Label = ttk.Label(searchFrame, text="表情検索")
+        searchLabel.pack(side=tk.LEFT)
+        self.searchValue = tk.StringVar()
+        searchEntry: ttk.Entry = ttk.Entry(searchFrame, textvariable=self.searchValue)
+        searchEntry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.searchValue.trace_add("write", lambda *_: self._Filter())
+        searchEntry.bind("<Up>", lambda _: self._MoveCursor(-self._columns))
+        searchEntry.bind("<Down>", lambda _: self._MoveCursor(self._columns))
+        searchEntry.bind("<Left>", lambda _: self._MoveCursor(-1) if not searchEntry.get() else None)
+        searchEntry.bind("<Right>", lambda _: self._MoveCursor(1) if not searchEntry.get() else None)
+        searchEntry.bind("<Return>", lambda _: self._SelectCursor())
+        gridFrame: tk.Frame = tk.Frame(frame)
+        gridFrame.pack(fill=tk.X, padx=5)
+        self.canvas = tk.Canvas(gridFrame, height=ExpressionPicker.CELL_HEIGHT * ExpressionPicker.VISIBLE_ROWS, yscrollincrement=ExpressionPicker.CELL_HEIGHT, highlightthickness=0)
+        scrollbar: tk.Scrollbar = tk.Scrollbar(gridFrame, orient=tk.VERTICAL, command=self.canvas.yview)
+        def OnScroll(first: str, last: str) -> None:
+            scrollbar.set(first, last)
+            self._Render()
+        self.canvas.configure(yscrollcommand=OnScroll)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.canvas.bind("<Configure>", lambda _: self._Layout())
+        def OnMouseWheel(event: tk.Event) -> None:
+            if self.canvas is None:
+                return
+            if event.delta > 0:
+                self.canvas.yview_scroll(-1, "units")
+            elif event.delta < 0:
+                self.canvas.yview_scroll(1, "units")
+        self.canvas.bind("<MouseWheel>", OnMouseWheel)
+        self.canvas.bind("<Button-1>", self._OnClick)
+
+    def SetImages(self, images: dict[str, str | None]) -> None:
+        '''
+        表示する表情をまとめて入れ替える
+
+        Parameters:
+        images: dict[str, str | None]
+            表情名から画像のパスへの対応
+        '''
+        self.images = dict(images)
+        self.index.Reset(list(self.images))
+        self._Filter()
+
+    def Add(self, name: str, imagePath: str | None) -> None:
+        '''
+        表情を1つ追加する。索引は作り直さない
+        '''
+        if name in self.images:
+            self.images[name] = imagePath
+        else:
+            self.images[name] = imagePath
+            self.index.Add(name)
+        self._Filter()
+
+    def Remove(self, name: str) -> None:
+        '''
+        表情を1つ削除する。索引は作り直さない
+        '''
+        if name not in self.images:
+            return
+        del self.images[name]
+        self.index.Remove(name)
+        if self.selected == name:
+            self.selected = ""
+        self._Filter()
+
+    def GetNames(self) -> list[str]:
+        return self.index.Search("")
+
+    def Select(self, name: str) -> None:
+        '''
+        表情を選択状態にする。OnSelectは呼ばない
+        '''
+        self.selected = name
+        if name in self.shownNames:
+            self.cursor = self.shownNames.index(name)
+            self._ScrollTo(self.cursor)
+        self._Redraw()
+
+    def _Filter(self) -> None:
+        self.shownNames = self.index.Search(self.searchValue.get() if self.searchValue is not None else "")
+        self.cursor = self.shownNames.index(self.selected) if self.selected in self.shownNames and not self._IsSearching() else 0
+        self._Layout()
+
+    def _IsSearching(self) -> bool:
+        return self.searchValue is not None and self.searchValue.get().strip() != ""
+
+    def _Layout(self) -> None:
+        if self.canvas is None:
+            return
+        width: int = max(self.canvas.winfo_width(), ExpressionPicker.CELL_WIDTH)
+        self._columns = max(1, width // ExpressionPicker.CELL_WIDTH)
+        rows: int = math.ceil(len(self.shownNames) / self._columns)
+        self.canvas.configure(scrollregion=(0, 0, width, max(rows, 1) * ExpressionPicker.CELL_HEIGHT))
+        self._Redraw()
+
+    def _Redraw(self) -> None:
+        if self.canvas is None:
+            return
+        for cell in self._cells.values():
+            for item in cell.items:
+                self.canvas.delete(item)
+        self._cells.clear()
+        self._Render()
+
+    def _Render(self) -> None:
+        # 見えている行のセルだけを作り、見えなくなったセルは消す
+        if self.canvas is None:
+            return
+        top: float = self.canvas.canvasy(0)
+        bottom: float = top + self.canvas.winfo_height()
+        firstRow: int = max(0, int(top // ExpressionPicker.CELL_HEIGHT))
+        lastRow: int = int(bottom // ExpressionPicker.CELL_HEIGHT)
+        visible: range = range(firstRow * self._columns, min((lastRow + 1) * self._columns, len(self.shownNames)))
+        for position in [position for position in self._cells if position not in visible]:
+            for item in self._cells.pop(position).items:
+                self.canvas.delete(item)
+        for position in visible:
+            if position not in self._cells:
+                self._CreateCell(position)
+
+    def _CreateCell(self, position: int) -> None:
+        assert self.canvas is not None
+        name: str = self.shownNames[position]
+        x: int = (position % self._columns) * ExpressionPicker.CELL_WIDTH
+        y: int = (position // self._columns) * ExpressionPicker.CELL_HEIGHT
+        outline: str = "red" if name == self.selected else ("blue" if position == self.cursor else "")
+        items: list[int] = [
+            self.canvas.create_rectangle(x + 1, y + 1, x + ExpressionPicker.CELL_WIDTH - 1, y + ExpressionPicker.CELL_HEIGHT - 1, outline=outline, width=2),
+            self.canvas.create_text(x + ExpressionPicker.CELL_WIDTH / 2, y + ExpressionPicker.CELL_HEIGHT - 10, text=name if len(name) <= 10 else f"{name[:9]}…"),
+        ]
+        cell: ExpressionPicker.Cell = ExpressionPicker.Cell(name, items)
+        self._cells[position] = cell
+        imagePath: str | None = self.images.get(name)
+        if imagePath:
+            def OnReady(image: tk.PhotoImage | None) -> None:
+                # 縮小を待つ間にスクロールや絞り込みでセルが消えていたら描画しない
+                if self.canvas is None or self._cells.get(position) is not cell or image is None:
+                    return
+                cell.image = image
+                cell.items.append(self.canvas.create_image(x + ExpressionPicker.CELL_WIDTH / 2, y + 4, anchor=tk.N, image=image))
+            thumbnailCache.Request(self.canvas, imagePath, ExpressionPicker.THUMBNAIL_WIDTH, ExpressionPicker.THUMBNAIL_HEIGHT, OnReady)
+
+    def _ScrollTo(self, position: int) -> None:
+        if self.canvas is None or not self.shownNames:
+            return
+        row: int = position // self._columns
+        top: float = self.canvas.canvasy(0)
+        visibleRows: int = max(1, self.canvas.winfo_height() // ExpressionPicker.CELL_HEIGHT)
+        firstRow: int = int(top // ExpressionPicker.CELL_HEIGHT)
+        if row < firstRow:
+            self.canvas.yview_moveto(row / math.ceil(len(self.shownNames) / self._columns))
+        elif row >= firstRow + visibleRows:
+            self.canvas.yview_moveto((row - visibleRows + 1) / math.ceil(len(self.shownNames) / self._columns))
+
+    def _MoveCursor(self, delta: int) -> str:
+        if self.shownNames:
+            self.cursor = min(max(self.cursor + delta, 0), len(self.shownNames) - 1)
+            self._ScrollTo(self.cursor)
+            self._Redraw()
+        # 検索欄のカーソルは動かさない
+        return "break"
+
+    def _SelectCursor(self) -> str:
+        if 0 <= self.cursor < len(self.shownNames):
+            self._Choose(self.shownNames[self.cursor])
+        return "break"
+
+    def _OnClick(self, event: tk.Event) -> None:
+        if self.canvas is None:
+            return
+        column: int = int(self.canvas.canvasx(event.x) // ExpressionPicker.CELL_WIDTH)
+        row: int = int(self.canvas.canvasy(event.y) // ExpressionPicker.CELL_HEIGHT)
+        position: int = row * self._columns + column
+        if column < self._columns and 0 <= position < len(self.shownNames):
+            self.cursor = position
+            self._Choose(self.shownNames[position])
+
+    def _Choose(self, name: str) -> None:
+        self.selected = name
+        self._Redraw()
+        self.OnSelect(name)
+
+class OutputDirectory:
+    '''
+    音声などの出力先フォルダの管理。
+    フォルダの中身は最初に1回だけ列挙し、以降は重ならないファイル名をメモリ上の索引から決める。
+    決めた名前は空のファイルを排他的に作成して確保するので、別のスレッドや別のVoiceInserterとも重ならない。
+    書き出したファイルのハッシュ・テキスト・キャラ・パラメータはVoiceInserterManifest.jsonに記録し、
+    同じ音声をもう一度合成した場合は新しいファイルを書き出さずに既存のファイル(とメディアプールのクリップ)を使い回す。
+    '''
+    MANIFEST_FILE: Final = "VoiceInserterManifest.json"
+    VERSION: Final = 1
+    _directories: dict[str, OutputDirectory] = {}
+    _directoriesLock: threading.Lock = threading.Lock()
+
+    def __init__(self, outDir: str) -> None:
+        self.outDir: str = outDir
+        self.manifestPath: str = os.path.join(outDir, OutputDirectory.MANIFEST_FILE)
+        self._lock: threading.Lock = threading.Lock()
+        # フォルダ内のファイル名(大文字小文字を区別しないOSでは正規化したもの)
+        self.names: set[str] = set()
+        if os.path.isdir(outDir):
+            with os.scandir(outDir) as entries:
+                self.names = {os.path.normcase(entry.name) for entry in entries}
+        # (名前, 拡張子)ごとに次に試す番号
+        self.nextCounters: dict[tuple[str, str], int] = {}
+        # ファイル名から、ハッシュ・テキスト・キャラ・パラメータへの対応
+        self.files: dict[str, dict[str, Any]] = self._LoadManifest()
+        self.hashes: dict[str, str] = {entry["hash"]: fileName for fileName, entry in self.files.items() if entry.get("hash")}
+        # 書き出し中の音声のハッシュ
+        self._writing: dict[str, threading.Event] = {}
+
+    @staticmethod
+    def Get(outDir: str) -> OutputDirectory:
+        '''
+        フォルダごとに1つの管理オブジェクトを取得する。スレッドセーフ
+        '''
+        key: str = os.path.normcase(os.path.abspath(outDir))
+        with OutputDirectory._directoriesLock:
+            if key not in OutputDirectory._directories:
+                OutputDirectory._directories[key] = OutputDirectory(outDir)
+            return OutputDirectory._directories[key]
+
+    def Reserve(self, fileName: str) -> str:
+        '''
+        まだ使われていないファイル名を確保する。同じ名前がある場合は拡張子の前に番号を付ける。
+        確保したパスには空のファイルができるので、WriteAtomicで書き込むかReleaseで解放すること。
+
+        Parameters:
+        fileName: str
+            希望するファイル名
+
+        Returns: str
+            確保したファイルのパス
+        '''
+        base, ext = os.path.splitext(fileName)
+        os.makedirs(self.outDir, exist_ok=True)
+        with self._lock:
+            counter: int = self.nextCounters.get((base, ext), 0)
+            while True:
+                candidate: str = f"{base}{counter if counter > 0 else ''}{ext}"
+                counter += 1
+                if os.path.normcase(candidate) in self.names:
+                    continue
+                filePath: str = os.path.join(self.outDir, candidate)
+                try:
+                    # 別のプロセスが同時に同じ名前を選んでも、作成できるのは片方だけ
+                    os.close(os.open(filePath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                except FileExistsError:
+                    self.names.add(os.path.normcase(candidate))
+                    continue
+                self.names.add(os.path.normcase(candidate))
+                self.nextCounters[(base, ext)] = counter
+                return filePath
+
+    def Release(self, filePath: str) -> None:
+        '''
+        Reserveで確保したまま使わなかったファイルを削除する
+        '''
+        try:
+            if os.path.getsize(filePath) == 0:
+                os.remove(filePath)
+        except OSError:
+            return
+        with self._lock:
+            self.names.discard(os.path.normcase(os.path.basename(filePath)))
+
+    @staticmethod
+    def WriteAtomic(filePath: str, data: bytes) -> None:
+        '''
+        書き込み途中のファイルを読まれないように、一時ファイルに書いてから置き換える
+        '''
+        tempPath: str = f"{filePath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tempPath, "wb") as f:
+            f.write(data)
+        os.replace(tempPath, filePath)
+
+    @staticmethod
+    def GetHash(wav: bytes, params: dict[str, Any]) -> str:
+        '''
+        wavデータのPCMと形式、合成のパラメータからハッシュを計算する
+
+        Parameters:
+        wav: bytes
+            wavデータ
+        params: dict[str, Any]
+            合成のパラメータ。JSONにできる値のみ
+
+        Returns: str
+            sha256の16進文字列
+        '''
+        digest = hashlib.sha256()
+        digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        with wave.open(BytesIO(wav), "rb") as wavedata:
+            digest.update(f"{wavedata.getframerate()}/{wavedata.getnchannels()}/{wavedata.getsampwidth()}".encode("ascii"))
+            digest.update(wavedata.readframes(wavedata.getnframes()))
+        return digest.hexdigest()
+
+    def Claim(self, digest: str) -> str | None:
+        '''
+        同じハッシュの音声ファイルが残っていればそのパスを返す。
+        なければ呼び出し元が書き出す役になり、Addか書き出しをやめる場合はUnclaimを呼ぶこと。
+        別のスレッドが同じ音声を書き出している間は、書き出し終わるまで待つ
+
+        Returns: str | None
+            既存のファイルのパス。呼び出し元が書き出す場合はNone
+        '''
+        while True:
+            with self._lock:
+                fileName: str | None = self.hashes.get(digest)
+                if fileName is not None and os.path.exists(os.path.join(self.outDir, fileName)):
+                    return os.path.join(self.outDir, fileName)
+                writing: threading.Event | None = self._writing.get(digest)
+                if writing is None:
+                    self._writing[digest] = threading.Event()
+                    return None
+            writing.wait()
+
+    def Unclaim(self, digest: str) -> None:
+        with self._lock:
+            writing: threading.Event | None = self._writing.pop(digest, None)
+        if writing is not None:
+            writing.set()
+
+    def Add(self, filePath: str, digest: str, text: str, character: str, params: dict[str, Any]) -> None:
+        '''
+        書き出したファイルを一覧に追加して保存する。
+        一覧を保存できなくてもファイルは書き出せているので、エラーにはせずメモリ上の一覧だけで使い回す
+        '''
+        fileName: str = os.path.basename(filePath)
+        try:
+            with self._lock:
+                self.files[fileName] = {"hash": digest, "text": text, "character": character, "params": params}
+                if digest:
+                    self.hashes[digest] = fileName
+                try:
+                    self._SaveManifest()
+                except OSError as e:
+                    print(f"音声ファイルの一覧を保存できませんでした: {self.manifestPath}: {e}")
+        finally:
+            # 同じ音声を待っているスレッドを必ず起こす
+            self.Unclaim(digest)
+
+    def _LoadManifest(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.manifestPath, encoding="utf-8") as f:
+                data: dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != OutputDirectory.VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _SaveManifest(self) -> None:
+        # 別のプロセスが追加した分を消さないように、読み直してから書き出す
+        files: dict[str, dict[str, Any]] = self._LoadManifest()
+        files.update(self.files)
+        self.files = files
+        data: bytes = json.dumps({"version": OutputDirectory.VERSION, "files": files}, ensure_ascii=False, indent=1).encode("utf-8")
+        OutputDirectory.WriteAtomic(self.manifestPath, data)
+
+class InsertionQueue:
+    '''
+    挿入待ちの行を順番に処理するキュー。
+    音声合成とwavの書き出しはワーカースレッドで先行して行い、
+    ResolveのAPIを使う挿入はTkのメインスレッドで1行ずつ、追加された順に行う。
+    '''
+    STATUS_WAITING: Final = "合成待ち"
+    STATUS_SYNTHESIZING: Final = "合成中"
+    STATUS_READY: Final = "挿入待ち"
+    STATUS_INSERTING: Final = "挿入中"
+    STATUS_DONE: Final = "完了"
+    STATUS_FAILED: Final = "失敗"
+    POLL_INTERVAL_MS: Final = 50
+
+    class Job:
+        def __init__(self, id: int, packingData: PackingData, wavFile: str, text: str, OnInserted: Callable[[InsertionQueue.Job], None] | None) -> None:
+            self.id: int = id
+            self.packingData: PackingData = packingData
+            self.wavFile: str = wavFile
+            self.text: str = text
+            self.OnInserted: Callable[[InsertionQueue.Job], None] | None = OnInserted
+            self.future: Future[None] | None = None
+            self.status: str = InsertionQueue.STATUS_WAITING
+            self.error: str = ""
+            self.duration: float = 0.0
+            # 合成のパラメータ. 指定されていれば同じ音声の書き出しを省く
+            self.voiceParams: dict[str, Any] | None = None
+            # 既存の同じ音声ファイルを使い回したか
+            self.reused: bool = False
+
+    def __init__(self, maxWorkers: int = 2) -> None:
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="VoiceInserterSynthesis")
+        self.jobs: list[InsertionQueue.Job] = []
+        self.nextIndex: int = 0
+        # ImportReadyVoicesで取り込み済みの音声. 取り込めなかったものはNone
+        self.voiceClips: dict[str, Any | None] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._jobCount: int = 0
+        # 同じ音声を使い回して省いた行数とバイト数
+        self.reusedCount: int = 0
+        self.reusedBytes: int = 0
+        self.reuseLabel: ttk.Label | None = None
+        self.root: tk.Misc | None = None
+        self.treeview: ttk.Treeview | None = None
+        self._shownStatus: dict[int, str] = {}
+
+    def ReserveFilePath(self, filePath: str) -> str:
+        '''
+        まだ存在せず、キュー内の他の行とも重ならないファイルパスを予約する。
+        同じ名前がある場合は拡張子の前に番号を付ける。
+
+        Parameters:
+        filePath: str
+            希望するファイルパス
+
+        Returns: str
+            予約したファイルパス
+        '''
+        return OutputDirectory.Get(os.path.dirname(filePath)).Reserve(os.path.basename(filePath))
+
+    def Enqueue(self, packingData: PackingData, wavFile: str, text: str, Synthesize: Callable[[], bytes] | None = None, OnInserted: Callable[[InsertionQueue.Job], None] | None = None, voiceParams: dict[str, Any] | None = None) -> InsertionQueue.Job:
+        '''
+        挿入する行をキューに追加する。
+
+        Parameters:
+        packingData: PackingData
+            挿入するキャラ
+        wavFile: str
+            音声ファイルのパス。Synthesizeがあればここに書き出す
+        text: str
+            字幕として挿入するテキスト。空文字なら字幕は挿入しない
+        Synthesize: function | None
+            ワーカースレッドで実行され、wavデータを返す関数。Noneなら既存のファイルをそのまま使う
+        OnInserted: function | None
+            挿入後にメインスレッドで呼ばれる関数
+        voiceParams: dict[str, Any] | None
+            合成のパラメータ。指定すると、同じパラメータで同じ音声が出力先にあればそのファイルを使う
+
+        Returns: InsertionQueue.Job
+            追加した行
+        '''
+        self._jobCount += 1
+        job: InsertionQueue.Job = InsertionQueue.Job(self._jobCount, packingData, wavFile, text, OnInserted)
+        job.voiceParams = voiceParams
+        if Synthesize is None:
+            job.status = InsertionQueue.STATUS_READY
+            job.duration = self._ReadDuration(wavFile)
+        else:
+            job.future = self.executor.submit(self._Synthesize, job, Synthesize)
+        self.jobs.append(job)
+        self._UpdateDisp()
+        return job
+
+    def _Synthesize(self, job: InsertionQueue.Job, Synthesize: Callable[[], bytes]) -> None:
+        # ワーカースレッドで実行される. Resolve・Tkには触らないこと
+        job.status = InsertionQueue.STATUS_SYNTHESIZING
+        outputDirectory: OutputDirectory = OutputDirectory.Get(os.path.dirname(job.wavFile))
+        try:
+            wav: bytes = Synthesize()
+            if not wav:
+                raise RuntimeError("音声の作成に失敗しました。")
+            with wave.open(BytesIO(wav), "rb") as wavedata:
+                job.duration = GetWavDuration(wavedata)
+        except BaseException:
+            outputDirectory.Release(job.wavFile)
+            raise
+        digest: str = OutputDirectory.GetHash(wav, job.voiceParams) if job.voiceParams is not None else ""
+        if digest:
+            existFile: str | None = outputDirectory.Claim(digest)
+            if existFile is not None:
+                # 書き出しと取り込みを省き、既存のファイルとクリップを使う
+                outputDirectory.Release(job.wavFile)
+                with self._lock:
+                    self.reusedCount += 1
+                    self.reusedBytes += len(wav)
+                job.wavFile = existFile
+                job.reused = True
+                job.status = InsertionQueue.STATUS_READY
+                return
+        try:
+            OutputDirectory.WriteAtomic(job.wavFile, wav)
+        except BaseException:
+            outputDirectory.Unclaim(digest)
+            raise
+        outputDirectory.Add(job.wavFile, digest, job.text, job.packingData.name, job.voiceParams or {})
+        job.status = InsertionQueue.STATUS_READY
+
+    @staticmethod
+    def _ReadDuration(wavFile: str) -> float:
+        try:
+            with wave.open(wavFile, "rb") as wavedata:
+                return GetWavDuration(wavedata)
+        except (OSError, EOFError, wave.Error):
+            return 0.0
+
+    def IsIdle(self) -> bool:
+        return self.nextIndex >= len(self.jobs)
+
+    def ProcessNext(self) -> bool:
+        '''
+        先頭の行の合成が終わっていればタイムラインに挿入する。メインスレッドから呼ぶこと。
+
+        Returns: bool
+            1行処理したか。先頭の行が合成中か、字幕に使うフォント一覧の読み込み中か、キューが空ならFalse
+        '''
+        if self.IsIdle():
+            return False
+        job: InsertionQueue.Job = self.jobs[self.nextIndex]
+        # 字幕の挿入はフォント一覧を使うので、読み込み終わるまではメインスレッドで待たずに次の呼び出しを待つ
+        if job.text and not job.packingData.textData.fonts.IsReady():
+            return False
+        if job.future is not None:
+            if not job.future.done():
+                return False
+            error: BaseException | None = job.future.exception()
+            if error is not None:
+                job.status = InsertionQueue.STATUS_FAILED
+                job.error = str(error)
+        if job.status != InsertionQueue.STATUS_FAILED:
+            job.status = InsertionQueue.STATUS_INSERTING
+            self._UpdateDisp()
+            if job.wavFile not in self.voiceClips:
+                self.ImportReadyVoices()
+            try:
+                inserted: bool = job.packingData.InsertRaw(job.wavFile, job.text, self.voiceClips.pop(job.wavFile, None))
+            except Exception as e:
+                job.status = InsertionQueue.STATUS_FAILED
+                job.error = str(e)
+            else:
+                if not inserted:
+                    # 失敗した内容はInsertRawがダイアログで表示している
+                    job.status = InsertionQueue.STATUS_FAILED
+                    job.error = "タイムラインへの挿入に失敗しました。"
+                else:
+                    job.status = InsertionQueue.STATUS_DONE
+                    if job.OnInserted is not None:
+                        job.OnInserted(job)
+        self.nextIndex += 1
+        if self.IsIdle():
+            # 字幕トラックに出力する字幕は、キューが空になった時点でまとめて取り込む
+            for packingData in {job.packingData.name: job.packingData for job in self.jobs}.values():
+                packingData.FlushSubtitles()
+        return True
+
+    def ImportReadyVoices(self) -> None:
+        '''
+        合成が終わっていてまだ取り込んでいない音声を、1回のImportMediaでまとめてメディアプールに取り込む。
+        メインスレッドから呼ぶこと。
+        '''
+        readyJobs: list[InsertionQueue.Job] = []
+        for job in self.jobs[self.nextIndex:]:
+            if job.status == InsertionQueue.STATUS_FAILED or job.wavFile in self.voiceClips:
+                continue
+            if job.future is not None and (not job.future.done() or job.future.exception() is not None):
+                continue
+            readyJobs.append(job)
+        if len(readyJobs) == 0:
+            return
+        # 挿入先のプロジェクトはキャラごとに同じなので、先頭の行のプロジェクトに取り込む
+        project = readyJobs[0].packingData.project
+        if not project:
+            return
+        with resolveProfiler.Measure("ImportReadyVoices"):
+            self.voiceClips.update(ResolveUtil.ImportMediaBatch(project.GetMediaPool(), [job.wavFile for job in readyJobs], f"/{CLIP_NAME_PREFIX}/Voices"))
+        # 取り込めなかった音声は挿入時に1つずつ取り込み直す
+        for job in readyJobs:
+            self.voiceClips.setdefault(job.wavFile, None)
+
+    def Drain(self) -> None:
+        '''
+        キューが空になるまで合成を待ちながら挿入する。
+        '''
+        while not self.IsIdle():
+            job: InsertionQueue.Job = self.jobs[self.nextIndex]
+            if job.future is not None:
+                futures.wait([job.future])
+            if job.text:
+                job.packingData.textData.fonts.Wait()
+            self.ProcessNext()
+
+    def BuildTimeline(self, project, fonts: FontList | None = None) -> Any | None:
+        '''
+        まだ挿入していない行を、合成を待ってから1つのFCPXMLにまとめて新しいタイムラインとして取り込む。
+        メインスレッドから呼ぶこと。
+
+        Parameters:
+        project: project
+            取り込み先のプロジェクト
+        fonts: FontList | None
+            字幕のフォント名の解決に使うフォントリスト
+
+        Returns: timeline | None
+            作成したタイムライン。挿入する行がないか失敗した場合はNone
+        '''
+        builder, lines = self._TakePending(project)
+        if len(lines) == 0:
+            self._UpdateDisp()
+            return None
+        timeline: Any | None = None
+        error: str = "タイムラインの取り込みに失敗しました。"
+        try:
+            timeline = builder.Import(project, f"{CLIP_NAME_PREFIX} {time.strftime('%Y%m%d-%H%M%S')}", fonts)
+        except (OSError, EOFError, ValueError, wave.Error) as e:
+            error = str(e)
+        for job in lines:
+            if timeline:
+                job.status = InsertionQueue.STATUS_DONE
+            else:
+                job.status = InsertionQueue.STATUS_FAILED
+                job.error = error
+        self._UpdateDisp()
+        return timeline
+
+    def ExportStems(self, project, outDir: str) -> dict[str, str]:
+        '''
+        まだ挿入していない行を、合成を待ってからキャラごとに1つのwavファイルにつなげて書き出す。
+        タイムラインには挿入しない。メインスレッドから呼ぶこと。
+
+        Parameters:
+        project: project
+            フレームレートを参照するプロジェクト
+        outDir: str
+            書き出し先のフォルダ
+
+        Returns: dict[str, str]
+            キャラ名から書き出したファイルのパスへの対応
+        '''
+        builder, lines = self._TakePending(project)
+        stems: dict[str, str] = {}
+        if len(lines) > 0:
+            try:
+                stems = builder.WriteStems(outDir, f"{CLIP_NAME_PREFIX}_{time.strftime('%Y%m%d-%H%M%S')}")
+            except (OSError, ValueError, wave.Error) as e:
+                for job in lines:
+                    job.status = InsertionQueue.STATUS_FAILED
+                    job.error = str(e)
+            else:
+                for job in lines:
+                    job.status = InsertionQueue.STATUS_DONE
+        self._UpdateDisp()
+        return stems
+
+    def _TakePending(self, project) -> tuple[TimelineBuilder, list[InsertionQueue.Job]]:
+        '''
+        まだ挿入していない行の合成を待ち、合成できた行をTimelineBuilderに追加する。
+        音声ファイルを読めなかった行は失敗にして、ほかの行だけを追加する
+
+        Returns: tuple[TimelineBuilder, list[InsertionQueue.Job]]
+            行を追加したTimelineBuilderと、追加した行
+        '''
+        pending: list[InsertionQueue.Job] = self.jobs[self.nextIndex:]
+        futures.wait([job.future for job in pending if job.future is not None])
+        builder: TimelineBuilder = TimelineBuilder.FromProject(project)
+        lines: list[InsertionQueue.Job] = []
+        for job in pending:
+            error: BaseException | None = job.future.exception() if job.future is not None else None
+            if error is not None:
+                job.status = InsertionQueue.STATUS_FAILED
+                job.error = str(error)
+                continue
+            try:
+                builder.Add(job.packingData, job.wavFile, job.text)
+            except (OSError, EOFError, ValueError, wave.Error) as e:
+                job.status = InsertionQueue.STATUS_FAILED
+                # 途中で切れたwavではEOFErrorが空のメッセージになる
+                job.error = str(e) or "音声ファイルを読めませんでした。"
+                continue
+            job.status = InsertionQueue.STATUS_INSERTING
+            lines.append(job)
+        self.nextIndex = len(self.jobs)
+        return builder, lines
+
+    def ClearFinished(self) -> None:
+        '''
+        完了・失敗した行を一覧から消す
+        '''
+        finished: list[InsertionQueue.Job] = self.jobs[:self.nextIndex]
+        self.jobs = self.jobs[self.nextIndex:]
+        self.nextIndex = 0
+        for job in finished:
+            self._shownStatus.pop(job.id, None)
+            if self.treeview is not None:
+                self.treeview.delete(str(job.id))
+
+    def Shutdown(self) -> None:
+        '''
+        合成待ちの行を破棄してワーカースレッドを止める。
+        破棄した行のために確保しておいた空のファイルは削除する
+        '''
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for job in self.jobs[self.nextIndex:]:
+            if job.future is not None and job.future.cancelled():
+                OutputDirectory.Get(os.path.dirname(job.wavFile)).Release(job.wavFile)
+
+    def Disp(self, root: tk.Misc, project, fonts: FontList) -> None:
+        '''
+        キューの一覧を表示し、メインスレッドでの挿入処理を開始する
+
+        Parameters:
+        root: tk.Misc
+            ウィジェットを配置する親ウィジェット
+        project: project
+            一括作成でタイムラインを取り込むプロジェクト
+        fonts: FontList
+            一括作成で字幕のフォント名の解決に使うフォントリスト
+        '''
+        self.root = root
+        queueFrame: ttk.LabelFrame = ttk.LabelFrame(root, text="挿入キュー")
+        queueFrame.pack(fill=tk.X, padx=5, pady=5)
+        self.treeview = ttk.Treeview(queueFrame, columns=("character", "text", "duration", "status"), show="headings", height=4)
+        self.treeview.heading("character", text="キャラ")
+        self.treeview.heading("text", text="テキスト")
+        self.treeview.heading("duration", text="長さ")
+        self.treeview.heading("status", text="状態")
+        self.treeview.column("character", width=100, stretch=False)
+        self.treeview.column("duration", width=60, stretch=False, anchor=tk.E)
+        self.treeview.column("status", width=160, stretch=False)
+        scrollbar: ttk.Scrollbar = ttk.Scrollbar(queueFrame, orient=tk.VERTICAL, command=self.treeview.yview)
+        self.treeview.configure(yscrollcommand=scrollbar.set)
+        buttonFrame: tk.Frame = tk.Frame(queueFrame)
+        buttonFrame.pack(side=tk.RIGHT, anchor=tk.N, padx=5)
+        clearButton: ttk.Button = ttk.Button(buttonFrame, text="完了を消去", command=self.ClearFinished)
+        clearButton.pack(fill=tk.X)
+        # 挿入待ちの行を1行ずつ挿入せず、まとめて新しいタイムラインとして取り込む
+        buildButton: ttk.Button = ttk.Button(buttonFrame, text="新規タイムラインに一括作成", command=lambda: self.BuildTimeline(project, fonts))
+        buildButton.pack(fill=tk.X)
+        # 仕上げ用に、挿入待ちの行をキャラごとに1つの音声ファイルへ書き出す
+        def OnExportStems() -> None:
+            outDir: str = filedialog.askdirectory(title="音声の書き出し先")
+            if not outDir:
+                return
+            stems: dict[str, str] = self.ExportStems(project, outDir)
+            if len(stems) > 0:
+                messagebox.showinfo("", f"{len(stems)}個の音声ファイルを書き出しました。\n{outDir}")
+        stemButton: ttk.Button = ttk.Button(buttonFrame, text="キャラごとの音声を書き出し", command=OnExportStems)
+        stemButton.pack(fill=tk.X)
+        self.reuseLabel = ttk.Label(buttonFrame)
+        self.reuseLabel.pack(fill=tk.X)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.treeview.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self._UpdateDisp()
+        self.root.after(InsertionQueue.POLL_INTERVAL_MS, self._Poll)
+
+    def _Poll(self) -> None:
+        # 1回の呼び出しでは1行だけ挿入して、間にTkのイベントを処理させる
+        processed: bool = self.ProcessNext()
+        self._UpdateDisp()
+        if self.root is not None:
+            self.root.after(0 if processed else InsertionQueue.POLL_INTERVAL_MS, self._Poll)
+
+    def GetReuseReport(self) -> str:
+        '''
+        同じ音声を使い回して省いた書き出しと取り込みの量を文字列で返す
+        '''
+        return f"再利用 {self.reusedCount}行 ({self.reusedBytes / 1024:.0f}KB, 取り込み{self.reusedCount}回分)"
+
+    def _UpdateDisp(self) -> None:
+        if self.treeview is None:
+            return
+        if self.reuseLabel is not None:
+            self.reuseLabel["text"] = self.GetReuseReport()
+        for job in self.jobs:
+            status: str = job.status if not job.error else f"{job.status}: {job.error}"
+            if job.reused:
+                status = f"{status} (再利用)"
+            if self._shownStatus.get(job.id) == status:
+                continue
+            text: str = job.text.replace("\n", " ").strip() or os.path.basename(job.wavFile)
+            values: tuple[str, str, str, str] = (job.packingData.name, text, f"{job.duration:.2f}秒" if job.duration > 0 else "", status)
+            if job.id in self._shownStatus:
+                self.treeview.item(str(job.id), values=values)
+            else:
+                self.treeview.insert("", tk.END, iid=str(job.id), values=values)
+            self._shownStatus[job.id] = status
+
+insertionQueue: InsertionQueue = InsertionQueue()
+
+class SettingsStore:
+    '''
+    キャラごとの設定やキャラ一覧を1つのSQLiteファイルにまとめて保存する。
+    設定は名前(以前のファイル名)ごとに、使う時に1件ずつ読み込む。
+    まだ取り込んでいない名前は、以前の設定ファイルがあればその内容を取り込んで返す。以前のファイルは消さずに残す。
+    '''
+    def __init__(self, dbPath: str = SETTINGS_DB_FILE, legacyDir: str | None = None) -> None:
+        self.dbPath: str = dbPath
+        self.legacyDir: str = legacyDir if legacyDir is not None else os.path.dirname(os.path.abspath(dbPath))
+        self._connection: sqlite3.Connection | None = None
+        # 書き込みスレッドとUIスレッドで同じ接続を使うので1つずつ実行する
+        self._lock: threading.Lock = threading.Lock()
+        self.readCount: int = 0
+        self.migratedCount: int = 0
+
+    def Get(self, name: str) -> str | None:
+        '''
+        設定を読み込む
+
+        Parameters:
+        name: str
+            設定の名前
+
+        Returns: str | None
+            保存されている内容。無ければNone
+        '''
+        with self._lock:
+            connection: sqlite3.Connection = self._Connect()
+            row: tuple[str] | None = connection.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+            self.readCount += 1
+            if row is not None:
+                return row[0]
+            legacyPath: str = os.path.join(self.legacyDir, name)
+            if not os.path.isfile(legacyPath):
+                return None
+            try:
+                with open(legacyPath, "r", encoding="utf-8") as f:
+                    text: str = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"以前の設定を読み込めませんでした: {legacyPath}: {e}")
+                return None
+            with connection:
+                connection.execute("INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)", (name, text))
+            self.migratedCount += 1
+            return text
+
+    def Put(self, name: str, text: str) -> None:
+        '''
+        設定を保存する
+
+        Parameters:
+        name: str
+            設定の名前
+        text: str
+            保存する内容
+        '''
+        self.PutMany([(name, text)])
+
+    def PutMany(self, items: list[tuple[str, str]]) -> None:
+        '''
+        複数の設定を1回のトランザクションで保存する
+
+        Parameters:
+        items: list[tuple[str, str]]
+            設定の名前と保存する内容の組
+        '''
+        if not items:
+            return
+        with self._lock:
+            connection: sqlite3.Connection = self._Connect()
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)", items)
+
+    def Close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _Connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dbPath)), exist_ok=True)
+            self._connection = sqlite3.connect(self.dbPath, timeout=10.0, check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection.commit()
+        return self._connection
+
+settingsStore: SettingsStore = SettingsStore()
+
+class SettingsWriter:
+    '''
+    設定の書き込みを遅らせてまとめる。
+    スライダーの操作などで短い間に何度も保存された場合は、最後の内容だけを別スレッドで書き込む。
+    同じ時刻に書き込む設定は、SettingsStoreへ1回のトランザクションでまとめて書き込む。
+    '''
+    # 最後の保存からこの秒数だけ待って書き込む
+    DELAY_SECONDS: Final = 0.5
+
+    def __init__(self, store: SettingsStore, delay: float = DELAY_SECONDS) -> None:
+        self.store: SettingsStore = store
+        self.delay: float = delay
+        # 設定の名前から、書き込む内容と書き込む時刻への対応
+        self._pending: dict[str, tuple[str, float]] = {}
+        self._condition: threading.Condition = threading.Condition()
+        # 古い内容が新しい内容を上書きしないように、取り出しから書き込みまでを1つずつ行う
+        self._writeLock: threading.Lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed: bool = False
+        self.scheduledCount: int = 0
+        self.writtenCount: int = 0
+
+    def Schedule(self, name: str, text: str) -> None:
+        '''
+        設定の書き込みを予約する。同じ設定の予約があれば内容を置き換える
+
+        Parameters:
+        name: str
+            書き込む設定の名前
+        text: str
+            書き込む内容
+        '''
+        with self._condition:
+            if self._closed:
+                # 終了後の保存はその場で書き込む
+                self.store.Put(name, text)
                 return
-            while len(self._accentPhrases) > 1:
-                self.MergeAccentPhrase(0)()
-            self.MakeVoice(charaName, styleName, pronunciationEntry.get(), False)
-            self.PlayWav()
-            accentValue.set(str(self._accentPhrases[0].accent))
-            self._UpdateDictionaryEditorAccentPhrase(accentInnerFrame, accentValue)
-        accentPlayButton["command"] = OnPlayPushed
-        accentFrame.pack()
+            self._pending[name] = (text, time.monotonic() + self.delay)
+            self.scheduledCount += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._Run, name="VoiceInserterSettingsWriter", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def GetPending(self, name: str) -> str | None:
+        '''
+        まだ書き込んでいない内容があれば返す
+        '''
+        with self._condition:
+            pending: tuple[str, float] | None = self._pending.get(name)
+        return pending[0] if pending is not None else None
 
-        priorityFrame: tk.Frame = tk.Frame(self._DictionaryEditFrame)
-        priorityLabel: ttk.Label = ttk.Label(priorityFrame, text="単語優先度")
-        priorityLabel.pack(anchor=tk.W)
-        priorityScale: tk.Scale = tk.Scale(priorityFrame, from_=0, to=10, orient=tk.HORIZONTAL)
-        if userDictWord is not None:
-            priorityScale.set(userDictWord.priority)
-        else:
-            priorityScale.set(5)
-        priorityScale.pack()
-        priorityFrame.pack()
+    def Flush(self) -> None:
+        '''
+        予約されている書き込みをすべてその場で行う
+        '''
+        with self._writeLock:
+            with self._condition:
+                items: list[tuple[str, str]] = [(name, text) for name, (text, _) in self._pending.items()]
+                self._pending.clear()
+            self.store.PutMany(items)
+            self.writtenCount += len(items)
+
+    def Close(self) -> None:
+        '''
+        予約されている書き込みを終えてからスレッドを止める。終了時に呼ぶこと
+        '''
+        self.Flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _Run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                waitSeconds: float = min(due for _, due in self._pending.values()) - time.monotonic()
+                if waitSeconds > 0:
+                    self._condition.wait(waitSeconds)
+                    continue
+            with self._writeLock:
+                with self._condition:
+                    now: float = time.monotonic()
+                    items: list[tuple[str, str]] = [(name, text) for name, (text, due) in self._pending.items() if due <= now]
+                    for name, _ in items:
+                        del self._pending[name]
+                try:
+                    self.store.PutMany(items)
+                except sqlite3.Error as e:
+                    print(f"設定を保存できませんでした: {', '.join(name for name, _ in items)}: {e}")
+                self.writtenCount += len(items)
 
-        def OnDecide() -> None:
-            newUserDictWord = voicevox.UserDictWord(surfaceEntry.get(), pronunciationEntry.get(), int(accentValue.get()), "COMMON_NOUN", int(priorityScale.get()))
-            if userDictWord is None:
-                self.AddUserDict(newUserDictWord)
-            else:
-                self.UpdateUserDictWord(self.SearchUserDictWordUUID(userDictWord), newUserDictWord)
-            messagebox.showinfo("", "ユーザー辞書を更新しました。")
-        decideButton: ttk.Button = ttk.Button(self._DictionaryEditFrame, text="保存", command=OnDecide)
-        decideButton.pack(anchor=tk.E)
+settingsWriter: SettingsWriter = SettingsWriter(settingsStore)
+atexit.register(settingsStore.Close)
+atexit.register(settingsWriter.Close)
 
 class PackingData:
     class ElementData:
         def __init__(self, fileName: str) -> None:
-            self.__filePath: str = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/{fileName}"
+            # 設定の名前。以前はこの名前のファイルに保存していた
+            self.__name: str = fileName
             self._params: dict[str, Any] = {}
         
         def _InitNewItem(self, paramKey: str, defaultValue: Any) -> None:
@@ -1249,16 +4334,18 @@ class PackingData:
             
 
         def _Load(self) -> None:
-            os.makedirs(os.path.dirname(os.path.abspath(self.__filePath)), exist_ok=True)
-            if os.path.exists(self.__filePath):
-                with open(self.__filePath, 'r') as f:
-                    data: dict[str, Any] = json.load(f)
-                    if data is not None:
-                        self._params = data
+            # まだ書き込まれていない保存があればそちらが新しい
+            text: str | None = settingsWriter.GetPending(self.__name)
+            if text is None:
+                text = settingsStore.Get(self.__name)
+            if text is not None:
+                data: dict[str, Any] | None = json.loads(text)
+                if data is not None:
+                    self._params = data
 
         def _Save(self) -> None:
-            with open(self.__filePath, 'w') as f:
-                json.dump(self._params, f, indent=4)
+            # 書き込みはまとめて別スレッドで行う
+            settingsWriter.Schedule(self.__name, json.dumps(self._params, indent=4))
         
 
     class ImageData(ElementData):
@@ -1278,7 +4365,8 @@ class PackingData:
             self.canvas: tk.Canvas | None = None
             self.canvasImage: int | None = None
             self.image: tk.PhotoImage | None = None
-            self.combo: ttk.Combobox | None = None
+            self.shownImagePath: str = ""
+            self.picker: ExpressionPicker | None = None
 
         def __getitem__(self, key) -> Any | None:
             # dictionaryのセーブ回避アクセスを禁止.
@@ -1299,6 +4387,36 @@ class PackingData:
             self._params["imageDict"][key] = path
             self._Save()
         
+        def AddImages(self, images: dict[str, str]) -> int:
+            '''
+            複数の表情をまとめて追加し、1回だけ保存する。
+            同じ画像がすでに登録されていれば追加せず、名前だけが重なる場合は番号を付けて追加する
+
+            Parameters:
+            images: dict[str, str]
+                表情名から画像のパスへの対応
+
+            Returns: int
+                追加した表情の数
+            '''
+            imageDict: dict[str, str | None] = self._params["imageDict"]
+            registered: set[str] = {path for path in imageDict.values() if path}
+            added: int = 0
+            for name, path in images.items():
+                if path in registered:
+                    continue
+                uniqueName: str = name
+                count: int = 2
+                while uniqueName in imageDict:
+                    uniqueName = f"{name} ({count})"
+                    count += 1
+                imageDict[uniqueName] = path
+                registered.add(path)
+                added += 1
+            if added > 0:
+                self._Save()
+            return added
+
         def DelImage(self, key: str) -> None:
             if key in self._params["imageDict"]:
                 del self._params["imageDict"][key]
@@ -1339,23 +4457,27 @@ class PackingData:
             # 画像選択
             self.canvas = tk.Canvas(frame, bg="gray", width=self.imageWidth, height=self.imageHeight)
             self.canvas.pack(fill=tk.BOTH, expand=True)
-            self.combo = ttk.Combobox(frame, values=list(self.GetImageDictKeys()))
-            self.combo.set(self["selectImage"] if self.GetImageDictKeys() else 'None')
-            if self.combo.get() != "None":
-                self._ChangeImage(self.GetImage(self.combo.get()))
-            def OnSelect(_) -> None:
-                if self.combo is None:
-                    return
-                self["selectImage"] = self.combo.get()
-                self._ChangeImage(self.GetImage(self.combo.get()))
-            self.combo.bind("<<ComboboxSelected>>", OnSelect) 
-            self.combo.pack()
+            def OnSelect(imageName: str) -> None:
+                self["selectImage"] = imageName
+                self._ChangeImage(self.GetImage(imageName))
+            self.picker = ExpressionPicker(OnSelect)
+            self.picker.Disp(frame)
+            self.picker.SetImages(self._params["imageDict"])
+            selectImage: str = self["selectImage"] if self.GetImageDictKeys() else 'None'
+            self.picker.Select(selectImage)
+            if selectImage != "None":
+                self._ChangeImage(self.GetImage(selectImage))
+            # 表情を切り替えた時にすぐ表示できるよう、ほかの表情も縮小しておく
+            thumbnailCache.Prefetch([self.GetImage(key) for key in self.GetImageDictKeys()], self.imageWidth, self.imageHeight)
             addImageFrame: ttk.LabelFrame = ttk.LabelFrame(frame, text="表情追加")
             addImageFrame.pack(fill=tk.X, padx=5, pady=5)
             addImageEntry: ttk.Entry = ttk.Entry(addImageFrame)
             addImageEntry.pack(side=tk.LEFT, fill=tk.X, expand=True)
             addImageButton: ttk.Button = ttk.Button(addImageFrame, text="表情追加", command=self._AddImage(addImageEntry))
             addImageButton.pack()
+            importFolderButton: ttk.Button = ttk.Button(addImageFrame, text="フォルダから一括追加")
+            importFolderButton.config(command=self._ImportFolder(importFolderButton))
+            importFolderButton.pack()
             deleteImageButton: ttk.Button = ttk.Button(frame, text="選択中の表情削除", command=self._DeleteImage)
             deleteImageButton.pack()
             # プロパティ設定
@@ -1401,18 +4523,19 @@ class PackingData:
             '''
             if self.canvas is None:
                 return
+            self.shownImagePath = imagePath
             if imagePath:
-                self.image = tk.PhotoImage(file=imagePath)
-                imageWidth: int = self.image.width()
-                imageHeight: int = self.image.height()
-                scale: float = min(self.imageWidth / imageWidth, self.imageHeight / imageHeight, 1)
-                if scale < 1:
-                    newWidth: int = int(imageWidth * scale)
-                    newHeight: int = int(imageHeight * scale)
-                    self.image = self.image.subsample(int(imageWidth / newWidth), int(imageHeight / newHeight))
-                if self.canvasImage is not None:
-                    self.canvas.delete(self.canvasImage)
-                self.canvasImage = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.image)
+                def OnReady(image: tk.PhotoImage | None) -> None:
+                    # 縮小を待つ間に別の表情が選ばれていたら表示しない
+                    if self.canvas is None or self.shownImagePath != imagePath:
+                        return
+                    self.image = image
+                    if self.canvasImage is not None:
+                        self.canvas.delete(self.canvasImage)
+                        self.canvasImage = None
+                    if self.image is not None:
+                        self.canvasImage = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.image)
+                thumbnailCache.Request(self.canvas, imagePath, self.imageWidth, self.imageHeight, OnReady)
             else:
                 if self.canvasImage is not None:
                     self.canvas.delete(self.canvasImage)
@@ -1427,13 +4550,13 @@ class PackingData:
                 return
             if self.GetImage(imageName):
                 self.DelImage(imageName)
-                if self.combo is not None:
-                    self.combo['values'] = list(self.GetImageDictKeys())
-                    if self.combo['values']:
-                        self.combo.set(self.combo['values'][0])
-                        self._ChangeImage(self.GetImage(self.combo.get()))
+                if self.picker is not None:
+                    self.picker.Remove(imageName)
+                    imageNames: list[str] = self.picker.GetNames()
+                    if imageNames:
+                        self.picker.Select(imageNames[0])
+                        self._ChangeImage(self.GetImage(imageNames[0]))
                     else:
-                        self.combo.set('')
                         if self.canvasImage is not None and self.canvas is not None:
                             self.canvas.delete(self.canvasImage)
                             self.canvasImage = None
@@ -1494,13 +4617,50 @@ class PackingData:
                             return
                     self["openedImageDir"] = os.path.dirname(filePath)
                     self.AddImage(imageName, filePath)
-                    if self.combo is None:
+                    if self.picker is None:
                         return
-                    self.combo['values'] = list(self.GetImageDictKeys())
-                    self.combo.set(imageName)
+                    self.picker.Add(imageName, filePath)
+                    self.picker.Select(imageName)
                     self._ChangeImage(filePath)
             return inner
 
+        def _ImportFolder(self, button: ttk.Button) -> Callable[[], None]:
+            '''
+            フォルダから一括追加ボタンが押された時の処理を返す。
+            フォルダ以下の表情画像を別スレッドで列挙し、終わったらまとめて追加する
+
+            Parameters:
+            button: ttk.Button
+                列挙中は押せないようにするボタン
+            Returns: function
+                ボタンが押されたときに実行される関数
+            '''
+            def inner() -> None:
+                rootDir: str = filedialog.askdirectory(title="表情画像のフォルダ", initialdir=self["openedImageDir"])
+                if not rootDir:
+                    return
+                button.config(state=tk.DISABLED)
+                executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="VoiceInserterImport")
+                future: Future[ExpressionLibrary.Result] = executor.submit(lambda: ExpressionLibrary.DeriveNames(rootDir, ExpressionLibrary.Scan(rootDir)))
+                executor.shutdown(wait=False)
+                def Check() -> None:
+                    if not future.done():
+                        button.after(ThumbnailCache.POLL_INTERVAL_MS, Check)
+                        return
+                    button.config(state=tk.NORMAL)
+                    result: ExpressionLibrary.Result = future.result()
+                    if not result.images:
+                        messagebox.showinfo("", "表情画像が見つかりませんでした。")
+                        return
+                    self["openedImageDir"] = rootDir
+                    added: int = self.AddImages(result.images)
+                    thumbnailCache.Prefetch(list(result.images.values()), self.imageWidth, self.imageHeight)
+                    if self.picker is not None:
+                        self.picker.SetImages(self._params["imageDict"])
+                    messagebox.showinfo("", f"{added}個の表情を追加しました。(見つかった画像{len(result.images)}個、連番{result.sequenceCount}組)")
+                Check()
+            return inner
+
         def _CopyImageSetting(self, project, trackName: str, xWidget: tk.Entry, yWidget: tk.Entry, flipXWidget: tk.Checkbutton, zoomEntry: tk.Entry) -> Callable[[], None]:
             '''
             現在imageTrackNameトラックで表示されているクリップから情報をコピーする。
@@ -1564,6 +4724,7 @@ class PackingData:
             self._InitNewItem("shadowOffset", [0.05, -0.05])
             self._InitNewItem("shadowSize", 1.0)
             self._InitNewItem("shadowColor", [0.0, 0.0, 0.0])
+            self._InitNewItem("outputMode", TEXT_OUTPUT_FUSION)
 
             self.fonts = fonts
             
@@ -1591,6 +4752,70 @@ class PackingData:
             '''
             colorTuple: tuple[float, float, float] = self._params.get(colorType, (1.0, 1.0, 1.0))
             return GetColorCode(colorTuple[0], colorTuple[1], colorTuple[2])
+
+        def GetStyle(self) -> dict[str, Any]:
+            '''
+            見た目に関わる設定のコピーを取得する
+            '''
+            style: dict[str, Any] = copy.deepcopy(self._params)
+            style.pop("outputMode", None)
+            return style
+
+        @staticmethod
+        def GetPixelSizes(style: dict[str, Any], frameHeight: int) -> dict[str, float]:
+            '''
+            TextPlusの相対値の設定を、画面の高さに対するピクセル数に換算する。
+            TextPlusの見た目との対応は近似。
+
+            Parameters:
+            style: dict[str, Any]
+                字幕の設定
+            frameHeight: int
+                画面の高さ
+
+            Returns: dict[str, float]
+                fontSize, innerBorder, outerBorder, shadowX, shadowY(下向きが正)のピクセル数
+            '''
+            fontSize: float = style["size"] * frameHeight
+            return {
+                "fontSize": fontSize,
+                "innerBorder": style["innerBorderThickness"] * fontSize / 10,
+                "outerBorder": (style["innerBorderThickness"] + style["outerBorderThickness"]) * fontSize / 10,
+                "shadowX": style["shadowOffset"][0] * frameHeight,
+                "shadowY": -style["shadowOffset"][1] * frameHeight,
+            }
+
+        def WriteSrt(self, filePath: str, cues: list[tuple[int, int, str]], frameRate: FrameRate, baseFrame: int) -> None:
+            '''
+            字幕をSRTファイルに書き出す。
+            SRTで表せるフォントと色だけを<font>タグで指定する。縁取りや影は字幕トラックのスタイルで設定すること。
+
+            Parameters:
+            filePath: str
+                書き出し先
+            cues: list[tuple[int, int, str]]
+                開始フレーム・終了フレーム・テキストのリスト
+            frameRate: FrameRate
+                タイムラインのフレームレート
+            baseFrame: int
+                SRTの0秒にあたるフレーム
+            '''
+            def Time(frame: int) -> str:
+                milliseconds: int = round((frame - baseFrame) * 1000 / frameRate.rate)
+                seconds, milliseconds = divmod(max(milliseconds, 0), 1000)
+                minutes, seconds = divmod(seconds, 60)
+                hours, minutes = divmod(minutes, 60)
+                return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+            face: str = self.fonts.fonts.get(self._params["font"], "")
+            openTag: str = f'<font{f" face={chr(34)}{face}{chr(34)}" if face else ""} color="{self.GetSavedColorCode("color")}">'
+            bold: bool = "bold" in self.fonts.style.get(self._params["font"], {}).get(self._params["style"], "").lower()
+            os.makedirs(os.path.dirname(os.path.abspath(filePath)), exist_ok=True)
+            with open(filePath, "w", encoding="utf-8") as f:
+                for i, (startFrame, endFrame, text) in enumerate(cues):
+                    body: str = text.strip("\n")
+                    if bold:
+                        body = f"<b>{body}</b>"
+                    f.write(f"{i + 1}\n{Time(startFrame)} --> {Time(endFrame)}\n{openTag}{body}</font>\n\n")
         
         def ApplyToClip(self, clip) -> None:
             '''
@@ -1679,28 +4904,53 @@ class PackingData:
             trackName: str
                 クリップから情報を取得する際の画像トラック名
             '''
+            # 出力先
+            outputFrame: tk.Frame = tk.Frame(frame)
+            outputFrame.pack(fill=tk.X, padx=5, pady=5)
+            outputLabel: ttk.Label = ttk.Label(outputFrame, text="出力先:")
+            outputLabel.pack(side=tk.LEFT)
+            outputValue: tk.StringVar = tk.StringVar(value=self["outputMode"])
+            def OutputModeChanged() -> None:
+                self["outputMode"] = outputValue.get()
+            for value, text in ((TEXT_OUTPUT_FUSION, "Fusionテキスト"), (TEXT_OUTPUT_SUBTITLE, "字幕トラック"), (TEXT_OUTPUT_IMAGE, "画像")):
+                outputRadio: ttk.Radiobutton = ttk.Radiobutton(outputFrame, text=text, value=value, variable=outputValue, command=OutputModeChanged)
+                # 画像への描画にはPillowが必要
+                if value == TEXT_OUTPUT_IMAGE and not SubtitleRenderer.IsAvailable():
+                    outputRadio.state(["disabled"])
+                outputRadio.pack(side=tk.LEFT, padx=5)
             # 字幕プロパティ
             # フォント情報
             fontFrame: tk.Frame = tk.Frame(frame)
             fontFrame.pack(fill=tk.X, padx=5, pady=5)
             fontLabel: ttk.Label = ttk.Label(fontFrame, text="フォント:")
             fontLabel.pack(side=tk.LEFT)
-            fontCombo: ttk.Combobox = ttk.Combobox(fontFrame, values=list(self.fonts.dispFonts))
-            fontCombo.set(self["font"] if self["font"] in self.fonts.dispFonts else list(self.fonts.dispFonts)[0])
+            # フォント一覧は別スレッドで読み込むので、揃うまでは保存されている名前だけを表示する
+            fontCombo: ttk.Combobox = ttk.Combobox(fontFrame, state=tk.DISABLED)
+            fontCombo.set(self["font"])
             def FontChaged(event: tk.Event) -> None:
                 self["font"] = fontCombo.get()
                 styleCombo['values'] = self.fonts.dispStyles[fontCombo.get()]
-                styleCombo.set(self.fonts.dispStyles[fontCombo.get()][0])
+                styleCombo.set(self.fonts.dispStyles[fontCombo.get()][0] if self.fonts.dispStyles[fontCombo.get()] else "")
             fontCombo.bind("<<ComboboxSelected>>", FontChaged) 
             fontCombo.pack(side=tk.LEFT, padx=5)
             styleLabel: ttk.Label = ttk.Label(fontFrame, text="スタイル:")
             styleLabel.pack(side=tk.LEFT)
-            styleCombo: ttk.Combobox = ttk.Combobox(fontFrame, values=self.fonts.dispStyles[fontCombo.get()])
-            styleCombo.set(self["style"] if self["style"] in self.fonts.dispStyles[fontCombo.get()] else self.fonts.dispStyles[fontCombo.get()][0])
+            styleCombo: ttk.Combobox = ttk.Combobox(fontFrame, state=tk.DISABLED)
+            styleCombo.set(self["style"])
             def StyleChaged(event: tk.Event) -> None:
                 self["style"] = styleCombo.get()
             styleCombo.bind("<<ComboboxSelected>>", StyleChaged) 
             styleCombo.pack(side=tk.LEFT, padx=5)
+            def OnFontsReady() -> None:
+                dispFonts: list[str] = self.fonts.dispFonts
+                if not dispFonts:
+                    return
+                fontCombo.config(state=tk.NORMAL, values=dispFonts)
+                fontCombo.set(self["font"] if self["font"] in dispFonts else dispFonts[0])
+                dispStyles: list[str] = self.fonts.dispStyles[fontCombo.get()]
+                styleCombo.config(state=tk.NORMAL, values=dispStyles)
+                styleCombo.set(self["style"] if self["style"] in dispStyles else (dispStyles[0] if dispStyles else ""))
+            self.fonts.WhenReady(fontCombo, OnFontsReady)
             # 文字情報
             characterFrame: tk.Frame = tk.Frame(frame)
             characterFrame.pack()
@@ -1859,18 +5109,8 @@ class PackingData:
                     if textPlus is None:
                         messagebox.showerror("ERROR", "TextPlusツールが見つかりませんでした。")
                         return
-                    dispFont: str = ""
-                    dispStyle: str = ""
                     font: str = textPlus.GetInput("Font")
                     style: str = textPlus.GetInput("Style")
-                    for fontName, fontObj in self.fonts.fonts.items():
-                        if fontObj == font:
-                            dispFont = fontName
-                            break
-                    for styleName, styleObj in self.fonts.style.get(dispFont, {}).items():
-                        if styleObj == style:
-                            dispStyle = styleName
-                            break
                     size: int | float = textPlus.GetInput("Size")
                     color: list[float] = [textPlus.GetInput("Red1"), textPlus.GetInput("Green1"), textPlus.GetInput("Blue1")]
                     if textPlus.GetInput("LayoutType") == 1:
@@ -1896,10 +5136,23 @@ class PackingData:
                     yWidget.delete(0, tk.END)
                     yWidget.insert(0, str(y))
                     self.SetPos(x, y)
-                    fontCombo.set(dispFont)
-                    self["font"] = dispFont
-                    styleCombo.set(dispStyle)
-                    self["style"] = dispStyle
+                    def SetFont() -> None:
+                        dispFont: str = ""
+                        dispStyle: str = ""
+                        for fontName, fontObj in self.fonts.fonts.items():
+                            if fontObj == font:
+                                dispFont = fontName
+                                break
+                        for styleName, styleObj in self.fonts.style.get(dispFont, {}).items():
+                            if styleObj == style:
+                                dispStyle = styleName
+                                break
+                        fontCombo.set(dispFont)
+                        self["font"] = dispFont
+                        styleCombo.set(dispStyle)
+                        self["style"] = dispStyle
+                    # フォント名の対応はフォント一覧の読み込みが終わってから調べる
+                    self.fonts.WhenReady(fontCombo, SetFont)
                     sizeEntry.delete(0, tk.END)
                     sizeEntry.insert(0, str(size))
                     self["size"] = size
@@ -1954,6 +5207,7 @@ class PackingData:
             self._InitNewItem("pauseLengthScale", 1.0)
             self._InitNewItem("prePhonemeLength", 0.1)
             self._InitNewItem("postPhonemeLength", 0.1)
+            self._InitNewItem("resampleQuality", RESAMPLE_QUALITY_STANDARD)
         
         def Disp(self, frame: tk.Misc, project, trackName: str) -> None:
             '''
@@ -2002,6 +5256,21 @@ class PackingData:
             VoicePropertyDisp(voicePropertyFrame, "間の長さ", "pauseLengthScale", 0.0, 2.0, 2, 1)
             VoicePropertyDisp(voicePropertyFrame, "開始無音", "prePhonemeLength", 0.0, 1.5, 0, 2)
             VoicePropertyDisp(voicePropertyFrame, "終了無音", "postPhonemeLength", 0.0, 1.5, 2, 2)
+            resampleFrame: tk.Frame = tk.Frame(frame)
+            resampleFrame.pack(anchor=tk.W)
+            resampleLabel: ttk.Label = ttk.Label(resampleFrame, text="サンプルレート変換:")
+            resampleLabel.pack(side=tk.LEFT)
+            qualityNames: dict[str, str] = WavResampler.QUALITY_NAMES
+            resampleCombobox: ttk.Combobox = ttk.Combobox(resampleFrame, values=list(qualityNames.values()), state="readonly", width=10)
+            resampleCombobox.set(qualityNames.get(cast(str, self["resampleQuality"]), qualityNames[RESAMPLE_QUALITY_STANDARD]))
+            # 変換にはNumPyが必要
+            if not WavResampler.IsAvailable():
+                resampleCombobox.set(qualityNames[RESAMPLE_QUALITY_OFF])
+                resampleCombobox.state(["disabled"])
+            resampleCombobox.pack(side=tk.LEFT, padx=5)
+            def OnResampleSelected(_: tk.Event) -> None:
+                self["resampleQuality"] = next(key for key, name in qualityNames.items() if name == resampleCombobox.get())
+            resampleCombobox.bind("<<ComboboxSelected>>", OnResampleSelected)
             VoicevoxDirectorySelectFrame: tk.Frame = tk.Frame(frame)
             VoicevoxDirectorySelectFrame.pack(anchor = tk.W)
             voicevoxDirectorySelectButton: ttk.Button = ttk.Button(VoicevoxDirectorySelectFrame, text="出力先フォルダ選択", command=self.SelectVoicevoxOutFolder)
@@ -2035,9 +5304,14 @@ class PackingData:
         self.voiceTrackName: str = f"{self.name}Voice"
         self.imageTrackName: str = f"{self.name}Image"
         self.textTrackName: str = f"{self.name}Text"
+        self.subtitleTrackName: str = f"{self.name}Subtitle"
+        # 字幕トラックに出力する設定の時に、まとめて取り込むまで溜めておく字幕(開始フレーム, 終了フレーム, テキスト)
+        self.pendingSubtitles: list[tuple[int, int, str]] = []
         self.imageData: PackingData.ImageData = self.ImageData(f"{name}_image.json")
         self.textData: PackingData.TextData = self.TextData(f"{name}_text.json", fonts)
         self.trackLockStatus: dict[tuple[str, int], bool] = {}
+        # 前の画像クリップを縮めた方法ごとの回数
+        self.imageTruncationCounts: dict[str, int] = {"skip": 0, "delete": 0, "trim": 0, "reinsert": 0, "failed": 0}
         self.openedVoiceDir: str = ""
         if voicevoxAvailable:
             self.voicevox: VoicevoxEngine = VoicevoxEngine()
@@ -2047,7 +5321,7 @@ class PackingData:
             self.voicevoxData = self.VoicevoxData(f"{name}_voicevox.json", self.voicevox)
         pass
     
-    def SelectTrack(self, timeline, trackType: Literal["video", "audio"], trackName: str, exec: Callable[[int], Any] | None=None) -> bool:
+    def SelectTrack(self, timeline, trackType: Literal["video", "audio", "subtitle"], trackName: str, exec: Callable[[int], Any] | None=None) -> bool:
         '''
         指定された名前のトラックを選択し、callbackの処理を実行する。存在しない場合は新規にトラックを作成する
         ロックされていない、最もインデックスの小さいトラックが選択されるようなので、それを利用する
@@ -2055,7 +5329,7 @@ class PackingData:
         Parameters:
         timeline: timeline
             操作するタイムライン
-        trackType: "video" or "audio"
+        trackType: "video", "audio" or "subtitle"
             トラックの種類
         trackName: string
             トラック名
@@ -2068,6 +5342,9 @@ class PackingData:
         if not timeline:
             messagebox.showerror("Error", "有効なタイムラインがありません。")
             return False
+        # exec内でさらにSelectTrackが呼ばれた場合に備えて、呼び出し元のロック状態の記録を退避しておく
+        outerTrackLockStatus: dict[tuple[str, int], bool] = self.trackLockStatus
+        self.trackLockStatus = {}
         trackIndex: int = -1
         for type in TRACK_TYPES:
             if not type:
@@ -2078,6 +5355,7 @@ class PackingData:
                     if(timeline.GetIsTrackLocked(type, i)):
                         messagebox.showerror("Error", f"{trackType}トラック '{trackName}' はロックされています。")
                         self.RevertTrackLock(timeline)
+                        self.trackLockStatus = outerTrackLockStatus
                         return False
                     trackIndex = i
                 else:
@@ -2088,12 +5366,15 @@ class PackingData:
             trackIndex = timeline.GetTrackCount(trackType)
             if not AddTrackResult:
                 messagebox.showerror("Error", f"{trackType}トラックの追加に失敗しました。")
+                self.RevertTrackLock(timeline)
+                self.trackLockStatus = outerTrackLockStatus
                 return False
             trackCount = timeline.GetTrackCount(trackType)
             timeline.SetTrackName(trackType, trackCount, trackName)
         if exec:
             exec(trackIndex)
         self.RevertTrackLock(timeline)
+        self.trackLockStatus = outerTrackLockStatus
         return True
     
     def RevertTrackLock(self, timeline) -> None:
@@ -2187,7 +5468,7 @@ class PackingData:
         mediaPool.SetCurrentFolder(prevCurrentFolder)
         return newClip
     
-    def InsertVoice(self, waveFile: str) -> None:
+    def InsertVoice(self, waveFile: str, startFrame: int, clip: Any | None = None) -> bool:
         '''
         現在のタイムラインに音声を挿入する
         タイムラインが存在しない場合は新規に作成する
@@ -2195,195 +5476,268 @@ class PackingData:
         Parameters:
         waveFile: str
             挿入する音声waveファイルのパス
+        startFrame: int
+            音声クリップの開始フレーム
+        clip: MediaPoolItem | None
+            取り込み済みのクリップ。Noneならメディアプールから探すか取り込む
+
+        Returns: bool
+            成功したか
         '''
-        if not waveFile:
-            messagebox.showerror("Error", "有効な音声ファイルがありません")
-            return
-        if not self.project:
-            messagebox.showerror("Error", "有効なプロジェクトがありません")
-            return
-        currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+        with resolveProfiler.Measure("InsertVoice"):
+            if not waveFile:
+                messagebox.showerror("Error", "有効な音声ファイルがありません")
+                return False
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません")
+                return False
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+            succeeded: bool = False
 
-        def exec(trackIndex: int) -> None:
-            clip = self.GetClipFromMediaPoolWithFilePath(waveFile, os.path.splitext(os.path.basename(waveFile))[0], f"/{CLIP_NAME_PREFIX}/Voices")
-            fps: int | float = currentTimeline.GetSetting("timelineFrameRate")
-            currentTime: str = currentTimeline.GetCurrentTimecode()
-            mediaPool = self.project.GetMediaPool()
-            offset: int = ResolveUtil.TimecodeToFrames(currentTime, fps)
-            newClips = mediaPool.AppendToTimeline([{
-                "mediaPoolItem": clip,
-                "startFrame": 0,
-                "trackIndex": trackIndex,
-                "mediaType": TRACK_TYPE_AUDIO,
-                "recordFrame": offset
-            }])
-            if newClips is None or len(newClips) == 0 or not newClips[0]:
-                messagebox.showerror("Error", "音声の挿入に失敗しました。")
-                return
+            def exec(trackIndex: int) -> None:
+                nonlocal succeeded
+                voiceClip = clip if clip is not None else self.GetClipFromMediaPoolWithFilePath(waveFile, os.path.splitext(os.path.basename(waveFile))[0], f"/{CLIP_NAME_PREFIX}/Voices")
+                if voiceClip is None:
+                    return
+                mediaPool = self.project.GetMediaPool()
+                newClips = mediaPool.AppendToTimeline([{
+                    "mediaPoolItem": voiceClip,
+                    "startFrame": 0,
+                    "trackIndex": trackIndex,
+                    "mediaType": TRACK_TYPE_AUDIO,
+                    "recordFrame": startFrame
+                }])
+                if newClips is None or len(newClips) == 0 or not newClips[0]:
+                    messagebox.showerror("Error", "音声の挿入に失敗しました。")
+                    return
+                succeeded = True
         
-        self.SelectTrack(currentTimeline, TRACK_TYPE_AUDIO_STRING, self.voiceTrackName, exec)
+            self.SelectTrack(currentTimeline, TRACK_TYPE_AUDIO_STRING, self.voiceTrackName, exec)
+            return succeeded
     
-    def InsertFusionClip(self, timeline, endtimecode: str, trackIndex: int, mediaType: int) -> Any | None:
+    def InsertFusionClip(self, timeline, startFrame: int, endFrame: int, trackIndex: int, mediaType: int) -> Any | None:
         '''
-        指定したタイムラインの現在タイムコードに、FusionClipを配置する。
+        指定したタイムラインの指定フレームに、FusionClipを配置する。
 
         Parameters:
         timeline: Timeline
             指定するタイムライン
-        endtimecode: str(hh:mm:dd:ff)
-            終了タイムコード
+        startFrame: int
+            開始フレーム
+        endFrame: int
+            終了フレーム
         trackIndex: int
             配置するトラック
         mediaType: int
             配置するトラックのメディアタイプ
         '''
-        fps: int | float = timeline.GetSetting("timelineFrameRate")
-        currentTime = timeline.GetCurrentTimecode()
         mediaPool = self.project.GetMediaPool()
-        offset: int = ResolveUtil.TimecodeToFrames(currentTime, fps)
         fusionClip = self.GetTemplateClipFromMediaPool(f"/{CLIP_NAME_PREFIX}/Templates")
         if fusionClip is None:
             return None
-        clipFps: int = fusionClip.GetClipProperty("FPS")
-        duration: float = ResolveUtil.TimecodeToFrames(endtimecode, clipFps) - ResolveUtil.TimecodeToFrames(currentTime, clipFps)
+        clipFrameRate: FrameRate = FrameRate.FromSetting(fusionClip.GetClipProperty("FPS"))
+        duration: int = ResolveUtil.GetFrameRate(timeline).ConvertFrames(endFrame - startFrame, clipFrameRate)
         newClips = mediaPool.AppendToTimeline([{
             "mediaPoolItem": fusionClip,
             "startFrame": 0,
             "endFrame": duration,
             "trackIndex": trackIndex,
             "mediaType": mediaType,
-            "recordFrame": offset
+            "recordFrame": startFrame
         }])
         if newClips is None or len(newClips) == 0 or not newClips[0]:
             return None
         return newClips[0]
     
-    def ReinsertImage(self, clip, starttimecode: str, endtimecode: str) -> None:
+    def ReinsertImage(self, clip, startFrame: int, endFrame: int) -> None:
         '''
         画像クリップを再挿入する
-        開始タイムコード/終了タイムコードを再設定するために使用する。
+        開始フレーム/終了フレームを再設定するために使用する。
 
         Parameters:
         clip: timelineClip
             再挿入するクリップ
-        starttimecode: str
-            クリップの開始タイムコード
-        endtimecode: str
-            クリップの終了タイムコード
+        startFrame: int
+            クリップの開始フレーム
+        endFrame: int
+            クリップの終了フレーム
+        '''
+        with resolveProfiler.Measure("ReinsertImage"):
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません。")
+                return
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+
+            def exec(trackIndex: int) -> None:
+                # 既存クリップの情報取得
+                oldName: str = clip.GetName()
+                trackType, trackIndex = clip.GetTrackTypeAndIndex()
+                oldLoaderTool = clip.GetFusionCompByIndex(1).FindToolByID("Loader")
+                oldfile = oldLoaderTool.GetInput("Clip")
+                oldtrim = oldLoaderTool.GetInput("ClipTimeStart")
+                oldx = clip.GetProperty("Pan")
+                oldy = clip.GetProperty("Tilt")
+                oldflipx = clip.GetProperty("FlipX")
+                oldzoom = clip.GetProperty("ZoomX")
+                currentTimeline.DeleteClips([clip])
+                # 画像クリップの再挿入
+                newImage = self.InsertFusionClip(currentTimeline, startFrame, endFrame, trackIndex, trackType)
+                if newImage is None:
+                    messagebox.showerror("Error", "画像の挿入に失敗しました。")
+                    return 
+                newImage.SetName(oldName)
+                # 画像の設定
+                if newImage.GetFusionCompCount() == 0:
+                    newImage.AddFusionComp()
+                fusionComp = newImage.GetFusionCompByIndex(1)
+                fusionComp.Lock()
+                loaderTool = fusionComp.AddTool("Loader", 0, 0)
+                loaderTool.Clip = oldfile
+                loaderTool.ClipTimeStart = oldtrim
+                loaderTool.ClipTimeEnd = oldtrim
+                loaderTool.Loop = 1.0
+                fusionComp.Unlock()
+                # 表示
+                mediaOut = fusionComp.FindToolByID("MediaOut")
+                if not mediaOut:
+                    mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
+                # プロパティ反映
+                newImage.SetProperty("Pan", oldx)
+                newImage.SetProperty("Tilt", oldy)
+                newImage.SetProperty("FlipX", oldflipx)
+                newImage.SetProperty("ZoomX", oldzoom)
+                newImage.SetProperty("ZoomY", oldzoom)
+                mediaOut.Input = loaderTool.Output
+
+            self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.imageTrackName, exec)
+
+    def TruncateImage(self, clip, endFrame: int) -> bool:
+        '''
+        画像クリップを指定フレームで終わるように縮める。
+        クリップをその場で縮められればそうし、できない場合だけReinsertImageで置き直す。
+        どの方法で処理したかはimageTruncationCountsに数え、計測が有効ならレポートにも表示する。
+
+        Parameters:
+        clip: timelineClip
+            縮めるクリップ
+        endFrame: int
+            クリップの新しい終了フレーム
+
+        Returns: bool
+            縮められたか。クリップを消せなかった場合はFalse
+        '''
+        with resolveProfiler.Measure("TruncateImage"):
+            startFrame: int = clip.GetStart(False)
+            method: str
+            if clip.GetEnd(False) <= endFrame:
+                # 既に指定フレームより前で終わっている(話している間だけ表示する場合など)
+                method = "skip"
+            elif startFrame >= endFrame:
+                # クリップ全体が指定フレーム以降にあるので、消すだけでよい
+                method = "delete" if self.DeleteImage(clip) else "failed"
+            elif ResolveUtil.TrimTimelineItemEnd(clip, endFrame):
+                method = "trim"
+            else:
+                self.ReinsertImage(clip, startFrame, endFrame)
+                method = "reinsert"
+            self.imageTruncationCounts[method] += 1
+            resolveProfiler.CountDecision("TruncateImage", method)
+            return method != "failed"
+
+    def DeleteImage(self, clip) -> bool:
+        '''
+        画像クリップを削除する。ほかのトラックのクリップを消さないよう、画像トラックだけを選んだ状態で消す
+
+        Parameters:
+        clip: timelineClip
+            削除するクリップ
+
+        Returns: bool
+            削除できたか
         '''
-        if not self.project:
-            messagebox.showerror("Error", "有効なプロジェクトがありません。")
-            return
         currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+        deleted: bool = False
 
         def exec(trackIndex: int) -> None:
-            # 既存クリップの情報取得
-            oldName: str = clip.GetName()
-            trackType, trackIndex = clip.GetTrackTypeAndIndex()
-            oldLoaderTool = clip.GetFusionCompByIndex(1).FindToolByID("Loader")
-            oldfile = oldLoaderTool.GetInput("Clip")
-            oldtrim = oldLoaderTool.GetInput("ClipTimeStart")
-            oldx = clip.GetProperty("Pan")
-            oldy = clip.GetProperty("Tilt")
-            oldflipx = clip.GetProperty("FlipX")
-            oldzoom = clip.GetProperty("ZoomX")
-            currentTimeline.DeleteClips([clip])
-            # 画像クリップの再挿入
-            currentTimeline.SetCurrentTimecode(starttimecode)
-            newImage = self.InsertFusionClip(currentTimeline, endtimecode, trackIndex, trackType)
-            if newImage is None:
-                messagebox.showerror("Error", "画像の挿入に失敗しました。")
-                return 
-            newImage.SetName(oldName)
-            # 画像の設定
-            if newImage.GetFusionCompCount() == 0:
-                newImage.AddFusionComp()
-            fusionComp = newImage.GetFusionCompByIndex(1)
-            fusionComp.Lock()
-            loaderTool = fusionComp.AddTool("Loader", 0, 0)
-            loaderTool.Clip = oldfile
-            loaderTool.ClipTimeStart = oldtrim
-            loaderTool.ClipTimeEnd = oldtrim
-            loaderTool.Loop = 1.0
-            fusionComp.Unlock()
-            # 表示
-            mediaOut = fusionComp.FindToolByID("MediaOut")
-            if not mediaOut:
-                mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
-            # プロパティ反映
-            newImage.SetProperty("Pan", oldx)
-            newImage.SetProperty("Tilt", oldy)
-            newImage.SetProperty("FlipX", oldflipx)
-            newImage.SetProperty("ZoomX", oldzoom)
-            newImage.SetProperty("ZoomY", oldzoom)
-            mediaOut.Input = loaderTool.Output
+            nonlocal deleted
+            deleted = bool(currentTimeline.DeleteClips([clip]))
+            if not deleted:
+                messagebox.showerror("Error", "前の画像クリップの削除に失敗しました。")
 
         self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.imageTrackName, exec)
+        return deleted
 
-    def InsertImage(self, endtimecode: str) -> None:
+    def InsertImage(self, startFrame: int, endFrame: int) -> bool:
         '''
         現在のタイムラインに画像を挿入する
         タイムラインが存在しない場合は新規に作成する
         画像が選択されていない場合は何もしない
         
         Parameters:
-        endtimecode: str
-            画像クリップの終了タイムコード
+        startFrame: int
+            画像クリップの開始フレーム
+        endFrame: int
+            画像クリップの終了フレーム
+
+        Returns: bool
+            成功したか。画像が選択されていない場合もTrue
         '''
-        file: str = self.imageData.GetImage(cast(str, self.imageData["selectImage"]))        
-        if not file:
-            return
-        if not self.project:
-            messagebox.showerror("Error", "有効なプロジェクトがありません。")
-            return
-        currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+        with resolveProfiler.Measure("InsertImage"):
+            file: str = self.imageData.GetImage(cast(str, self.imageData["selectImage"]))        
+            if not file:
+                return True
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません。")
+                return False
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
 
-        currentClip = ResolveUtil.GetCurrentTimelineClip(self.project, TRACK_TYPE_VIDEO_STRING, self.imageTrackName)
-        if currentClip is not None:
-            # 挿入位置に既存クリップが存在する場合、現在時間までのクリップとして置き直す.
-            oldClipStartFrame = currentClip.GetStart(False)
-            fps: int | float = currentTimeline.GetSetting("timelineFrameRate")
-            starttimecode: str = ResolveUtil.GetTimecodeFromFrame(oldClipStartFrame, fps)
-            self.ReinsertImage(currentClip, starttimecode, currentTimeline.GetCurrentTimecode())
+            currentClip = None
+            # 初回挿入時はまだトラックがないので、既存クリップを探さない
+            imageTrackIndex: int = ResolveUtil.SearchTrackIndex(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.imageTrackName)
+            if imageTrackIndex != -1:
+                currentClip = ResolveUtil.GetTimelineClipAtFrame(currentTimeline, TRACK_TYPE_VIDEO_STRING, imageTrackIndex, startFrame)
+            if currentClip is not None:
+                # 挿入位置に既存クリップが存在する場合、挿入位置までのクリップに縮める.
+                # 縮められなければ重ねて置かない
+                if not self.TruncateImage(currentClip, startFrame):
+                    return False
             
-        def exec(trackIndex: int) -> None:
-            newImage = self.InsertFusionClip(currentTimeline, endtimecode, trackIndex, TRACK_TYPE_VIDEO)
-            if newImage is None:
-                messagebox.showerror("Error", "画像の挿入に失敗しました。")
-                return 
-            newImage.SetName(f"{self.name}Image_{self.imageData['selectImage']}")
-            # 画像の設定
-            if newImage.GetFusionCompCount() == 0:
-                newImage.AddFusionComp()
-            fusionComp = newImage.GetFusionCompByIndex(1)
-            fusionComp.Lock()
-            loaderTool = fusionComp.AddTool("Loader", 0, 0)
-            loaderTool.Clip = file
-            fusionComp.Unlock()
-            # 表示画像の固定
-            # ファイル名末尾が数字だと、自動的に1つのアニメーションにされてしまうので、そのアニメーションの1コマを指定してそこで固定させる
-            trim = 0
-            m = re.match(r"(.*)(\d+)\.(\w+)", file)
-            if m:
-                trim = int(m.group(2))
-                for i in range(0, trim):
-                    if len(glob.glob(f"{m.group(1)}*{i}.{m.group(3)}")) == 0:
-                        trim -= 1
-                        break
-            loaderTool.ClipTimeStart = trim
-            loaderTool.ClipTimeEnd = trim
-            loaderTool.Loop = 1.0
-            # 表示
-            mediaOut = fusionComp.FindToolByID("MediaOut")
-            if not mediaOut:
-                mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
-            # プロパティ反映
-            self.imageData.ApplyToClip(newImage)
-            mediaOut.Input = loaderTool.Output
-
-        self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.imageTrackName, exec)
+            succeeded: bool = False
 
-    def InsertText(self, text: str, endtimecode: str) -> None:
+            def exec(trackIndex: int) -> None:
+                nonlocal succeeded
+                newImage = self.InsertFusionClip(currentTimeline, startFrame, endFrame, trackIndex, TRACK_TYPE_VIDEO)
+                if newImage is None:
+                    messagebox.showerror("Error", "画像の挿入に失敗しました。")
+                    return 
+                newImage.SetName(f"{self.name}Image_{self.imageData['selectImage']}")
+                # 画像の設定
+                if newImage.GetFusionCompCount() == 0:
+                    newImage.AddFusionComp()
+                fusionComp = newImage.GetFusionCompByIndex(1)
+                fusionComp.Lock()
+                loaderTool = fusionComp.AddTool("Loader", 0, 0)
+                loaderTool.Clip = file
+                fusionComp.Unlock()
+                # 表示画像の固定
+                # ファイル名末尾が数字だと、自動的に1つのアニメーションにされてしまうので、そのアニメーションの1コマを指定してそこで固定させる
+                trim: int = imageSequenceIndex.GetFrameOffset(file)
+                loaderTool.ClipTimeStart = trim
+                loaderTool.ClipTimeEnd = trim
+                loaderTool.Loop = 1.0
+                # 表示
+                mediaOut = fusionComp.FindToolByID("MediaOut")
+                if not mediaOut:
+                    mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
+                # プロパティ反映
+                self.imageData.ApplyToClip(newImage)
+                mediaOut.Input = loaderTool.Output
+                succeeded = True
+
+            self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.imageTrackName, exec)
+            return succeeded
+
+    def InsertText(self, text: str, startFrame: int, endFrame: int) -> bool:
         '''
         現在のタイムラインにテキストを挿入する
         タイムラインが存在しない場合は新規に作成する
@@ -2391,38 +5745,137 @@ class PackingData:
         Parameters:
         text: string
             挿入するテキスト
-        endtimecode: string
-            テキストクリップの終了タイムコード
+        startFrame: int
+            テキストクリップの開始フレーム
+        endFrame: int
+            テキストクリップの終了フレーム
+
+        Returns: bool
+            成功したか
         '''
-        if not text:
-            messagebox.showerror("Error", "テキストが空です。")
-            return
-        if not self.project:
-            messagebox.showerror("Error", "有効なプロジェクトがありません。")
-            return
-        currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+        with resolveProfiler.Measure("InsertText"):
+            if not text:
+                messagebox.showerror("Error", "テキストが空です。")
+                return False
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません。")
+                return False
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+            succeeded: bool = False
 
-        def exec(trackIndex):
-            newtext = self.InsertFusionClip(currentTimeline, endtimecode, trackIndex, TRACK_TYPE_VIDEO)
-            if newtext is None:
-                messagebox.showerror("Error", "字幕の挿入に失敗しました。")
-                return 
-            newtext.SetName(f"{self.name}Text_{text[:10]}")
-            if newtext.GetFusionCompCount() == 0:
-                newtext.AddFusionComp()
-            fusionComp = newtext.GetFusionCompByIndex(1)
-            # 文字列の挿入
-            textTool = fusionComp.AddTool("TextPlus", 0, 0)
-            textTool.StyledText = text
-            mediaOut = fusionComp.FindToolByID("MediaOut")
-            if not mediaOut:
-                mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
-            mediaOut.Input = textTool.Output
-            # プロパティ反映
-            self.textData.ApplyToClip(newtext)
-
-        self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.textTrackName, exec)
+            def exec(trackIndex):
+                nonlocal succeeded
+                newtext = self.InsertFusionClip(currentTimeline, startFrame, endFrame, trackIndex, TRACK_TYPE_VIDEO)
+                if newtext is None:
+                    messagebox.showerror("Error", "字幕の挿入に失敗しました。")
+                    return 
+                newtext.SetName(f"{self.name}Text_{text[:10]}")
+                if newtext.GetFusionCompCount() == 0:
+                    newtext.AddFusionComp()
+                fusionComp = newtext.GetFusionCompByIndex(1)
+                # 文字列の挿入
+                textTool = fusionComp.AddTool("TextPlus", 0, 0)
+                textTool.StyledText = text
+                mediaOut = fusionComp.FindToolByID("MediaOut")
+                if not mediaOut:
+                    mediaOut = fusionComp.AddTool("MediaOut", 1000, 0)
+                mediaOut.Input = textTool.Output
+                # プロパティ反映
+                self.textData.ApplyToClip(newtext)
+                succeeded = True
+
+            self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.textTrackName, exec)
+            return succeeded
         
+    def InsertTextImage(self, text: str, startFrame: int, endFrame: int) -> bool:
+        '''
+        字幕をPNGに描画し、静止画クリップとして現在のタイムラインに挿入する
+
+        Parameters:
+        text: string
+            挿入するテキスト
+        startFrame: int
+            字幕クリップの開始フレーム
+        endFrame: int
+            字幕クリップの終了フレーム
+
+        Returns: bool
+            成功したか
+        '''
+        with resolveProfiler.Measure("InsertTextImage"):
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません。")
+                return False
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+            width: int = int(currentTimeline.GetSetting("timelineResolutionWidth") or 1920)
+            height: int = int(currentTimeline.GetSetting("timelineResolutionHeight") or 1080)
+            imageFile: str = subtitleRenderer.Render(text, self.textData, width, height)
+            clip = self.GetClipFromMediaPoolWithFilePath(imageFile, os.path.splitext(os.path.basename(imageFile))[0], f"/{CLIP_NAME_PREFIX}/SubtitleImages")
+            if clip is None:
+                return False
+            succeeded: bool = False
+
+            def exec(trackIndex: int) -> None:
+                nonlocal succeeded
+                newClips = self.project.GetMediaPool().AppendToTimeline([{
+                    "mediaPoolItem": clip,
+                    "startFrame": 0,
+                    "endFrame": endFrame - startFrame,
+                    "trackIndex": trackIndex,
+                    "mediaType": TRACK_TYPE_VIDEO,
+                    "recordFrame": startFrame
+                }])
+                if newClips is None or len(newClips) == 0 or not newClips[0]:
+                    messagebox.showerror("Error", "字幕の挿入に失敗しました。")
+                    return
+                newClips[0].SetName(f"{self.name}Text_{text[:10]}")
+                succeeded = True
+
+            self.SelectTrack(currentTimeline, TRACK_TYPE_VIDEO_STRING, self.textTrackName, exec)
+            return succeeded
+
+    def FlushSubtitles(self) -> bool:
+        '''
+        溜めておいた字幕をSRTに書き出し、キャラの字幕トラックに1回で取り込む。
+
+        Returns: bool
+            成功したか。溜めておいた字幕がない場合もTrue
+        '''
+        if len(self.pendingSubtitles) == 0:
+            return True
+        with resolveProfiler.Measure("FlushSubtitles"):
+            if not self.project:
+                messagebox.showerror("Error", "有効なプロジェクトがありません。")
+                return False
+            cues: list[tuple[int, int, str]] = sorted(self.pendingSubtitles)
+            self.pendingSubtitles = []
+            currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
+            frameRate: FrameRate = ResolveUtil.GetFrameRate(currentTimeline)
+            # AppendToTimelineは再生位置をこのキャラの最後の字幕の終端に動かすので、
+            # 次の行の挿入位置が変わらないように取り込み後に戻す
+            currentFrame: int | None = ResolveUtil.GetCurrentFrame(currentTimeline, frameRate)
+            # SRTの0秒を最初の字幕の位置にして、その位置に置く
+            srtFile: str = insertionQueue.ReserveFilePath(f"{SUBTITLE_DIR}/{self.name}.srt")
+            self.textData.WriteSrt(srtFile, cues, frameRate, cues[0][0])
+            subtitleClip = self.GetClipFromMediaPoolWithFilePath(srtFile, os.path.splitext(os.path.basename(srtFile))[0], f"/{CLIP_NAME_PREFIX}/Subtitles")
+            if subtitleClip is None:
+                return False
+            succeeded: bool = False
+            def exec(trackIndex: int) -> None:
+                nonlocal succeeded
+                newClips = self.project.GetMediaPool().AppendToTimeline([{
+                    "mediaPoolItem": subtitleClip,
+                    "trackIndex": trackIndex,
+                    "recordFrame": cues[0][0]
+                }])
+                succeeded = newClips is not None and len(newClips) > 0 and bool(newClips[0])
+                if not succeeded:
+                    messagebox.showerror("Error", "字幕の挿入に失敗しました。")
+            self.SelectTrack(currentTimeline, TRACK_TYPE_SUBTITLE_STRING, self.subtitleTrackName, exec)
+            if currentFrame is not None:
+                ResolveUtil.SetCurrentFrame(currentTimeline, currentFrame, frameRate)
+            return succeeded
+
     def InsertVoicevox(self, textWidget: tk.Text) -> Callable[[], None]:
         '''
         Voicevoxモードで挿入ボタンが押された時の処理を返す。
@@ -2440,18 +5893,41 @@ class PackingData:
                 messagebox.showerror("Error", "テキストが空です。")
                 return
             filename: str = text.replace('\n', '')
-            filepath: str = f"{self.voicevoxData['outDir']}/{filename[:min(10, len(filename))]}.wav"
-            fixedFilepath: str = filepath
-            counter: int = 0
-            while os.path.exists(fixedFilepath):
-                counter += 1
-                fixedFilepath = filepath[:-4] + str(counter) + ".wav"
-            self.voicevox.MakeVoice(cast(str, self.voicevoxData["character"]), cast(str, self.voicevoxData["style"]), text, cast(bool, self.voicevoxData["upspeak"]), cast(float, self.voicevoxData["speed"]), cast(float, self.voicevoxData["pitch"]), cast(float, self.voicevoxData["intonation"]), cast(float, self.voicevoxData["volume"]), cast(float, self.voicevoxData["pauseLengthScale"]), cast(float, self.voicevoxData["prePhonemeLength"]), cast(float, self.voicevoxData["postPhonemeLength"]))
-            self.voiceDuration["text"] = f"{self.voicevox.CalcWavDuration():.2f}秒"
-            self.voicevox.SaveWav(fixedFilepath)
-            self.InsertRaw(fixedFilepath, text)
+            filepath: str = insertionQueue.ReserveFilePath(f"{self.voicevoxData['outDir']}/{filename[:min(10, len(filename))]}.wav")
+            # キューに入れた時点の設定で合成する. フレーズ編集中の文章ならその編集内容を使う
+            character: str = cast(str, self.voicevoxData["character"])
+            style: str = cast(str, self.voicevoxData["style"])
+            accentPhrases: list[voicevox.AccentPhrase] | None = self.voicevox.GetEditingAccentPhrases(character, style, text)
+            upspeak: bool = cast(bool, self.voicevoxData["upspeak"])
+            params: tuple[float, ...] = tuple(cast(float, self.voicevoxData[key]) for key in ("speed", "pitch", "intonation", "volume", "pauseLengthScale", "prePhonemeLength", "postPhonemeLength"))
+            # プロジェクトの設定はメインスレッドで読んでおき、ワーカースレッドで変換する
+            sampleRate: int = self.GetProjectSampleRate()
+            resampleQuality: str = cast(str, self.voicevoxData["resampleQuality"])
+            def Synthesize() -> bytes:
+                return wavResampler.ResampleWav(self.voicevox.Synthesize(character, style, text, accentPhrases, upspeak, *params), sampleRate, resampleQuality)
+            def OnInserted(job: InsertionQueue.Job) -> None:
+                self.voiceDuration["text"] = f"{job.duration:.2f}秒"
+            # 同じ音声かどうかの判定に使うパラメータ. 編集したアクセント句はPCMの違いとして現れる
+            voiceParams: dict[str, Any] = {"character": character, "style": style, "upspeak": upspeak, "params": list(params), "sampleRate": sampleRate, "resampleQuality": resampleQuality}
+            insertionQueue.Enqueue(self, filepath, text if self.textEnableValue.get() else "", Synthesize, OnInserted, voiceParams)
+            # 続けて次の行を入力できるようにする
+            textWidget.delete("1.0", tk.END)
         return inner
     
+    def GetProjectSampleRate(self) -> int:
+        '''
+        プロジェクトの音声のサンプルレートを取得する
+
+        Returns: int
+            サンプルレート。取得できなければ0
+        '''
+        if not self.project:
+            return 0
+        try:
+            return int(float(self.project.GetSetting("audioSampleRate") or 0))
+        except (TypeError, ValueError):
+            return 0
+
     def InsertExistFile(self) -> None:
         '''
         既存ファイルのデータからテキスト・画像・音声をタイムライン上に挿入する
@@ -2469,9 +5945,10 @@ class PackingData:
         else:
             with open(textFile, encoding="utf-8") as f:
                 text = "".join(f.readlines())
-        self.InsertRaw(voiceFile, text)
+        # キューに合成待ちの行があれば、その後ろに挿入する
+        insertionQueue.Enqueue(self, voiceFile, text)
 
-    def InsertRaw(self, wavFile, text: str) -> None:
+    def InsertRaw(self, wavFile, text: str, voiceClip: Any | None = None) -> bool:
         '''
         テキスト・画像・音声を現在のタイムラインに挿入する
 
@@ -2479,22 +5956,41 @@ class PackingData:
         wavFile: str
             挿入する音声データのパス
         text: str
-            字幕として挿入するテキスト
+            字幕として挿入するテキスト。空文字なら字幕は挿入しない
+        voiceClip: MediaPoolItem | None
+            ImportMediaBatchで取り込み済みの音声クリップ
+
+        Returns: bool
+            すべて挿入できたか。失敗した内容はダイアログで表示済み
         '''
         currentTimeline = ResolveUtil.GetOrCreateCurrentTimeline(self.project)
-        currentTimecode = currentTimeline.GetCurrentTimecode()
-        self.InsertVoice(wavFile)
-        endTimecode: str = currentTimeline.GetCurrentTimecode()
-        currentTimeline.SetCurrentTimecode(currentTimecode)
+        frameRate: FrameRate = ResolveUtil.GetFrameRate(currentTimeline)
+        startFrame: int | None = ResolveUtil.GetCurrentFrame(currentTimeline, frameRate)
+        if startFrame is None:
+            messagebox.showerror("Error", "タイムラインが表示された画面ではありません。")
+            return False
+        # 終了フレームは再生位置を読み戻さずに、音声の長さから求める
+        endFrame: int = startFrame + GetWavFrames(wavFile, frameRate)
+        if endFrame <= startFrame:
+            messagebox.showerror("Error", f"音声ファイル '{wavFile}' の長さを読み取れませんでした。")
+            return False
         # デフォルトでは最終フレームまで画像を表示する
-        imageEndTimecode: str = ResolveUtil.GetTimecodeFromFrame(currentTimeline.GetEndFrame(), currentTimeline.GetSetting("timelineFrameRate"))
+        imageEndFrame: int = max(currentTimeline.GetEndFrame(), endFrame)
         if self.imageData["voiceOnly"]:
-            imageEndTimecode = endTimecode
-        self.InsertImage(imageEndTimecode)
-        if self.textEnableValue.get() and text and len(text) > 0:
-            currentTimeline.SetCurrentTimecode(currentTimecode)
-            self.InsertText(text, endTimecode)
-        currentTimeline.SetCurrentTimecode(endTimecode)
+            imageEndFrame = endFrame
+        succeeded: bool = self.InsertImage(startFrame, imageEndFrame)
+        if text and len(text) > 0:
+            if self.textData["outputMode"] == TEXT_OUTPUT_SUBTITLE:
+                # 字幕トラックにはFlushSubtitlesでまとめて取り込む
+                self.pendingSubtitles.append((startFrame, endFrame, text))
+            elif self.textData["outputMode"] == TEXT_OUTPUT_IMAGE and SubtitleRenderer.IsAvailable():
+                succeeded = self.InsertTextImage(text, startFrame, endFrame) and succeeded
+            else:
+                succeeded = self.InsertText(text, startFrame, endFrame) and succeeded
+        succeeded = self.InsertVoice(wavFile, startFrame, voiceClip) and succeeded
+        # 次の行は音声の終端に置く. AppendToTimelineが再生位置をどこに動かしたかには頼らない
+        ResolveUtil.SetCurrentFrame(currentTimeline, endFrame, frameRate)
+        return succeeded
     
     def PlayVoicevox(self, textWidget: tk.Text) -> Callable[[], None]:
         '''
@@ -2512,9 +6008,13 @@ class PackingData:
             if text == "\n":
                 messagebox.showerror("Error", "テキストが空です。")
                 return
-            self.voicevox.MakeVoice(cast(str, self.voicevoxData["character"]), cast(str, self.voicevoxData["style"]), text, cast(bool, self.voicevoxData["upspeak"]), cast(float, self.voicevoxData["speed"]), cast(float, self.voicevoxData["pitch"]), cast(float, self.voicevoxData["intonation"]), cast(float, self.voicevoxData["volume"]), cast(float, self.voicevoxData["pauseLengthScale"]), cast(float, self.voicevoxData["prePhonemeLength"]), cast(float, self.voicevoxData["postPhonemeLength"]))
-            self.voicevox.PlayWav()
-            self.voiceDuration["text"] = f"{self.voicevox.CalcWavDuration():.2f}秒"
+            def OnMade(succeeded: bool) -> None:
+                if not succeeded:
+                    return
+                self.voicevox.PlayWav()
+                self.voiceDuration["text"] = f"{self.voicevox.CalcWavDuration():.2f}秒"
+            # 挿入キューが合成中でもTkを止めないように、合成は別スレッドで待つ
+            self.voicevox.MakeVoiceInBackground(textWidget, OnMade, cast(str, self.voicevoxData["character"]), cast(str, self.voicevoxData["style"]), text, cast(bool, self.voicevoxData["upspeak"]), cast(float, self.voicevoxData["speed"]), cast(float, self.voicevoxData["pitch"]), cast(float, self.voicevoxData["intonation"]), cast(float, self.voicevoxData["volume"]), cast(float, self.voicevoxData["pauseLengthScale"]), cast(float, self.voicevoxData["prePhonemeLength"]), cast(float, self.voicevoxData["postPhonemeLength"]))
         return inner
 
     def SelectExistVoice(self) -> None:
@@ -2582,34 +6082,47 @@ class PackingData:
         panedWindow.add(rightFrame, weight=3)
         panedWindow.pack(fill=tk.BOTH, expand=True)
 
-def AddTemplateInFile(name, filePath: str) -> None:
+def GetTemplates(templateSetting: str) -> list[str]:
+    '''
+    保存されているテンプレート名の一覧を返す。
+
+    Parameters:
+    templateSetting: str
+        テンプレート名を保存している設定の名前
+
+    Returns: list[str]
+        テンプレート名。追加した順
+    '''
+    text: str | None = settingsStore.Get(templateSetting)
+    if text is None:
+        return []
+    return [templateName for templateName in text.split("\n") if templateName != ""]
+
+def AddTemplateInFile(name, templateSetting: str) -> None:
     '''
-    テンプレート名をファイルに追加する。
+    テンプレート名を設定に追加する。
     テンプレート名がすでに存在する場合はエラー終了
 
     Parameters:
     name: str
         テンプレート名
-    filePath: str
-        保存先
+    templateSetting: str
+        保存先の設定の名前
     '''
-    with open(filePath, "a+", encoding="utf-8") as f:
-        f.seek(0, 0)
-        for templateName in f:
-            templateName = templateName.replace("\n", "")
-            if templateName == name:
-                messagebox.showerror("ERROR", "その名前はすでに存在します。")
-                return
-        f.seek(0, 2)
-        f.write(name + "\n")
+    templates: list[str] = GetTemplates(templateSetting)
+    if name in templates:
+        messagebox.showerror("ERROR", "その名前はすでに存在します。")
+        return
+    templates.append(name)
+    settingsStore.Put(templateSetting, "".join(f"{templateName}\n" for templateName in templates))
 
-def OpenAddTemplateGUI(templateFile: str, root: tk.Tk |  tk.Toplevel | None = None, OnDestroy: Callable[[], None] | None = None):
+def OpenAddTemplateGUI(templateSetting: str, root: tk.Tk |  tk.Toplevel | None = None, OnDestroy: Callable[[], None] | None = None):
     '''
     キャラ追加UIを開く。
 
     Parameters:
-    templateFile: str
-        追加キャラを書き込むファイル名
+    templateSetting: str
+        追加キャラを書き込む設定の名前
     root: tkinter.Widget
         ルート。NoneでなければToplebelで作成
     OnDestroy: Function() => None
@@ -2631,7 +6144,7 @@ def OpenAddTemplateGUI(templateFile: str, root: tk.Tk |  tk.Toplevel | None = No
     label.pack()
     entry: ttk.Entry = ttk.Entry(templateRoot)
     def OnButtonPushed():
-        AddTemplateInFile(entry.get(), templateFile)
+        AddTemplateInFile(entry.get(), templateSetting)
         templateRoot.destroy()
     entry.pack()
     button: ttk.Button = ttk.Button(templateRoot, text="作成", command=OnButtonPushed)
@@ -2640,15 +6153,15 @@ def OpenAddTemplateGUI(templateFile: str, root: tk.Tk |  tk.Toplevel | None = No
         templateRoot.mainloop()
     return True
 
-def AddTemplate(root: tk.Tk | tk.Toplevel, templateFile: str, notebook: ttk.Notebook, project, fonts: FontList) -> Callable[[], None]:
+def AddTemplate(root: tk.Tk | tk.Toplevel, templateSetting: str, notebook: ttk.Notebook, project, fonts: FontList) -> Callable[[], None]:
     '''
     キャラを追加する関数を返す。
 
     Parameters:
     root: tkinter.Widget
         ルート
-    templateFile: str
-        追加キャラを書き込むファイル名
+    templateSetting: str
+        追加キャラを書き込む設定の名前
     notebook: ttk.notebook
         追加後にタブを追加するnotebook
     project: 
@@ -2661,17 +6174,19 @@ def AddTemplate(root: tk.Tk | tk.Toplevel, templateFile: str, notebook: ttk.Note
     '''
     def inner() -> None:
         def OnDestroy() -> None:
-            if os.path.exists(templateFile):
-                with open(templateFile, "r", encoding="utf-8") as f:
-                    templates: list[str] = f.readlines()
-                if len(templates) > len(notebook.tabs()):
-                    AddTab(notebook, templates[-1].replace("\n", ""), project, fonts)
-        OpenAddTemplateGUI(templateFile, root, OnDestroy)
+            templates: list[str] = GetTemplates(templateSetting)
+            if len(templates) > len(notebook.tabs()):
+                AddTab(notebook, templates[-1], project, fonts)
+        OpenAddTemplateGUI(templateSetting, root, OnDestroy)
     return inner
 
+# まだ中身を作っていないタブから、中身を作る関数への対応
+tabBuilders: dict[str, Callable[[], None]] = {}
+
 def AddTab(notebook: ttk.Notebook, templateName: str, project, fonts: FontList) -> None:
     '''
-    notebookにPackingData情報のタブを追加する
+    notebookにPackingData情報のタブを追加する。
+    タブは空の枠だけ先に追加し、PackingDataと表示は初めて選ばれた時にBuildSelectedTabで作る
 
     Parameters:
     notebook: ttk.Notebook
@@ -2683,8 +6198,22 @@ def AddTab(notebook: ttk.Notebook, templateName: str, project, fonts: FontList)
     '''
     tab: tk.Frame = tk.Frame(notebook)
     notebook.add(tab, text=templateName)
-    displayData: PackingData = PackingData(templateName, project, fonts)
-    displayData.Disp(tab)
+    def Build() -> None:
+        displayData: PackingData = PackingData(templateName, project, fonts)
+        displayData.Disp(tab)
+    tabBuilders[str(tab)] = Build
+
+def BuildSelectedTab(notebook: ttk.Notebook) -> None:
+    '''
+    選ばれているタブの中身をまだ作っていなければ作る。<<NotebookTabChanged>>で呼ぶ
+
+    Parameters:
+    notebook: ttk.Notebook
+        タブを選んだnotebook
+    '''
+    Build: Callable[[], None] | None = tabBuilders.pop(notebook.select(), None)
+    if Build is not None:
+        Build()
 
 def GetGithubReleasesLatestName(owner: str, repo: str) -> tuple[str, str]:
     try:
@@ -2722,11 +6251,11 @@ def CompareVersion(version: str, target: str) -> bool:
 
 def VersionCheck() -> bool:
     global scriptVersion
-    if os.path.exists(IGNORE_VERSION_FILE):
-        with open(IGNORE_VERSION_FILE, "r") as f:
-            ignoreVersion = f.readline()
-            if CompareVersion(ignoreVersion, scriptVersion):
-                scriptVersion = ignoreVersion
+    ignoreVersion: str | None = settingsStore.Get(IGNORE_VERSION_SETTING)
+    if ignoreVersion is not None:
+        ignoreVersion = ignoreVersion.split("\n")[0]
+        if CompareVersion(ignoreVersion, scriptVersion):
+            scriptVersion = ignoreVersion
     LATEST: Final = GetGithubReleasesLatestName("GlintAugly", "VoiceInserter")
     ret: bool = True
     TEMPFILE: Final = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/temp.bat"
@@ -2820,8 +6349,7 @@ def VersionCheck() -> bool:
         updateNoButton.pack(side=tk.LEFT)
         updateIgnoreButton: ttk.Button = ttk.Button(updateButtonFrame, text="このバージョンを無視する")
         def OnPressIgnore() -> None:
-            with open(IGNORE_VERSION_FILE, "w") as f:
-                f.write(LATEST[0])
+            settingsStore.Put(IGNORE_VERSION_SETTING, LATEST[0])
             updateroot.destroy()
         updateIgnoreButton.config(command=OnPressIgnore)
         updateIgnoreButton.pack(side=tk.LEFT)
@@ -2836,15 +6364,15 @@ if __name__ == "__main__":
     # projectの取得
     resolve = app.GetResolve() # type: ignore
     projectManager = resolve.GetProjectManager()
-    project = projectManager.GetCurrentProject()
-    installedFonts: FontList = FontList(FontList.FetchFonts())
+    project = resolveProfiler.Wrap(projectManager.GetCurrentProject(), "Project")
+    # フォント一覧は別スレッドで読み込み、字幕を挿入する時やフォントの選択欄を表示する時に揃っていなければ待つ
+    installedFonts: FontList = FontList()
+    installedFonts.FetchInBackground()
     
-    templateFile: str = f"{os.environ['RESOLVE_SCRIPT_API']}/{DATA_FILE}/templates.dat"
-    os.makedirs(os.path.dirname(os.path.abspath(templateFile)), exist_ok=True)
-    if not os.path.exists(templateFile):
+    if not GetTemplates(TEMPLATE_SETTING):
         # 初期設定
-        OpenAddTemplateGUI(templateFile)
-        if not os.path.exists(templateFile):
+        OpenAddTemplateGUI(TEMPLATE_SETTING)
+        if not GetTemplates(TEMPLATE_SETTING):
             sys.exit()
             
     # GUI表示
@@ -2852,16 +6380,27 @@ if __name__ == "__main__":
     root.title("Voice Inserter")
     # タブ追加
     notebook: ttk.Notebook = ttk.Notebook(root)
-    with open(templateFile, "r", encoding="utf-8") as f:
-        for templateName in f:
-            templateName = templateName.replace("\n", "")
-            AddTab(notebook, templateName, project, installedFonts)
+    # タブの中身は選ばれた時に作るので、キャラが多くても表示までの時間は変わらない
+    notebook.bind("<<NotebookTabChanged>>", lambda event: BuildSelectedTab(notebook))
+    for templateName in GetTemplates(TEMPLATE_SETTING):
+        AddTab(notebook, templateName, project, installedFonts)
     notebook.pack(fill='both', expand=True)
+    BuildSelectedTab(notebook)
+    insertionQueue.Disp(root, project, installedFonts)
     # メニューバー追加
     menuBar: tk.Menu = tk.Menu(root, tearoff=0)
     fileMenu: tk.Menu = tk.Menu(menuBar, tearoff=0)
     templateRoot: tk.Tk | tk.Toplevel | None = None
-    fileMenu.add_command(label="キャラ追加", command=AddTemplate(root, templateFile, notebook, project, installedFonts))
+    fileMenu.add_command(label="キャラ追加", command=AddTemplate(root, TEMPLATE_SETTING, notebook, project, installedFonts))
     menuBar.add_cascade(label="file", menu=fileMenu)
+    if resolveProfiler.enabled:
+        profileMenu: tk.Menu = tk.Menu(menuBar, tearoff=0)
+        profileMenu.add_command(label="API計測結果", command=resolveProfiler.ShowReport(root))
+        profileMenu.add_command(label="API計測結果のリセット", command=resolveProfiler.Reset)
+        menuBar.add_cascade(label="profile", menu=profileMenu)
     root.config(menu=menuBar)
     root.mainloop()
+    insertionQueue.Shutdown()
+    thumbnailCache.Shutdown()
+    settingsWriter.Close()
+    resolveProfiler.DumpReport(PROFILE_REPORT_FILE)
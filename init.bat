@@ -34,6 +34,11 @@ set RESOLVE_SCRIPT_DIR="%PROGRAMDATA%\Blackmagic Design\DaVinci Resolve\Fusion\S
 copy VoiceInserter.py  %RESOLVE_SCRIPT_DIR%\VoiceInserter.py
 mkdir %RESOLVE_SCRIPT_DIR%\VoiceInserter
 
+REM 字幕を画像として描画する場合に使うPillowのインストール. 失敗しても他の機能は使える
+pip install pillow --prefix="%RESOLVE_SCRIPT_API%"\Modules\pillow
+REM 音声をプロジェクトのサンプルレートに変換する場合に使うNumPyのインストール
+pip install numpy --prefix="%RESOLVE_SCRIPT_API%"\Modules\numpy
+
 REM Voicevoxのインストール
 IF NOT EXIST "download-windows-x64.exe" (
     exit
@@ -0,0 +1,8 @@
+'''
+テストの共通設定
+'''
+import os
+import tempfile
+
+# VoiceInserterは設定ファイルの保存先をRESOLVE_SCRIPT_APIから決めるので、読み込み前に一時フォルダを指定する
+os.environ.setdefault("RESOLVE_SCRIPT_API", tempfile.mkdtemp(prefix="VoiceInserterTest"))
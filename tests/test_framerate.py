@@ -0,0 +1,132 @@
+'''
+FrameRateのフレーム数・タイムコード・有理数のフレームレートの変換を確認する。
+Benchmark.py timecodeからも、性質の確認にCheckTimecodePropertiesを使う。
+'''
+from __future__ import annotations
+import random
+import re
+from fractions import Fraction
+from typing import Final
+
+import pytest
+
+import FakeResolve
+import VoiceInserter
+from VoiceInserter import FrameRate
+
+# 確認するフレームレートと、ドロップフレームかどうか
+RATES: Final = [("23.976", False), ("24", False), ("25", False), ("29.97", False), ("29.97", True), ("30", False), ("50", False), ("59.94", False), ("59.94", True), ("60", False)]
+
+def CheckTimecodeProperties(fps: str, dropFrame: bool, samples: int, rng: random.Random) -> list[str]:
+    '''
+    フレーム数とタイムコードの相互変換が満たすべき性質を、ランダムなフレーム数で確認する。
+
+    Parameters:
+    fps: str
+        フレームレートの設定値
+    dropFrame: bool
+        ドロップフレームかどうか
+    samples: int
+        試すフレーム数の個数
+    rng: random.Random
+        フレーム数を選ぶ乱数
+
+    Returns: list[str]
+        性質を満たさなかったフレームごとの説明
+    '''
+    frameRate: FrameRate = FrameRate.FromSetting(fps, dropFrame)
+    fakeRate: FakeResolve.Rate = FakeResolve.Rate(fps, dropFrame)
+    maxFrame: int = frameRate.TimecodeToFrames("23:59:59:00")
+    # 分・10分の境界付近は重点的に試す
+    frames: list[int] = [rng.randrange(maxFrame) for _ in range(samples)]
+    for minute in range(0, 30):
+        boundary: int = frameRate.TimecodeToFrames(f"00:{minute:02}:00:{frameRate.dropFrames if minute % 10 else 0:02}")
+        frames += [boundary - 1, boundary, boundary + 1]
+    failures: list[str] = []
+    previous: str | None = None
+    for frame in sorted(set(f for f in frames if f >= 0)):
+        timecode: str = frameRate.FramesToTimecode(frame)
+        messages: list[str] = []
+        if frameRate.TimecodeToFrames(timecode) != frame:
+            messages.append("round trip")
+        if timecode != FakeResolve.FramesToTimecode(frame, fakeRate):
+            messages.append(f"differs from FakeResolve ({FakeResolve.FramesToTimecode(frame, fakeRate)})")
+        if previous is not None and timecode <= previous:
+            messages.append("not monotonic")
+        if frameRate.dropFrame:
+            _, m, s, f = re.findall(r"\d+", timecode)
+            if int(s) == 0 and int(m) % 10 != 0 and int(f) < frameRate.dropFrames:
+                messages.append("dropped label used")
+        if messages:
+            failures.append(f"{fps}{'DF' if dropFrame else ''} frame {frame} -> {timecode}: {', '.join(messages)}")
+        previous = timecode
+    return failures
+
+@pytest.mark.parametrize("fps, dropFrame", RATES)
+def test_TimecodeProperties(fps: str, dropFrame: bool) -> None:
+    failures: list[str] = CheckTimecodeProperties(fps, dropFrame, 2000, random.Random(0))
+    assert failures == []
+
+@pytest.mark.parametrize("fps, rate", [
+    ("24", Fraction(24)),
+    (25, Fraction(25)),
+    ("23.976", Fraction(24000, 1001)),
+    ("29.97", Fraction(30000, 1001)),
+    (29.97, Fraction(30000, 1001)),
+    ("59.94", Fraction(60000, 1001)),
+    ("", Fraction(24)),
+])
+def test_FromSettingRate(fps: str | float, rate: Fraction) -> None:
+    assert FrameRate.FromSetting(fps).rate == rate
+
+def test_FromSettingDropFrame() -> None:
+    assert FrameRate.FromSetting("29.97", "1").dropFrames == 2
+    assert FrameRate.FromSetting("59.94", True).dropFrames == 4
+    # 整数のレートではドロップフレームにならない
+    assert not FrameRate.FromSetting("30", True).dropFrame
+    assert not FrameRate.FromSetting("29.97", "0").dropFrame
+
+@pytest.mark.parametrize("timecode, frames", [
+    ("00:00:59;29", 1799),
+    ("00:01:00;02", 1800),
+    ("00:10:00;00", 17982),
+    ("01:00:00;00", 107892),
+    ("23:59:59;29", 2589407),
+])
+def test_DropFrameTimecode(timecode: str, frames: int) -> None:
+    frameRate: FrameRate = FrameRate.FromSetting("29.97", True)
+    assert frameRate.TimecodeToFrames(timecode) == frames
+    assert frameRate.FramesToTimecode(frames) == timecode
+
+def test_NonDropFrameTimecode() -> None:
+    frameRate: FrameRate = FrameRate.FromSetting("29.97")
+    assert frameRate.TimecodeToFrames("01:00:00:00") == 108000
+    assert frameRate.FramesToTimecode(108000) == "01:00:00:00"
+    # ;区切りはドロップフレームとして読む
+    assert frameRate.TimecodeToFrames("01:00:00;00") == 107892
+    assert frameRate.FramesToTimecode(-5) == "00:00:00:00"
+
+def test_SecondsToFrames() -> None:
+    ntsc: FrameRate = FrameRate.FromSetting("29.97")
+    # 1001/1000秒は29.97fpsでちょうど30フレーム
+    assert ntsc.SecondsToFrames(Fraction(1001, 1000)) == 30
+    # 端数は切り上げる
+    assert ntsc.SecondsToFrames(1.0) == 30
+    assert FrameRate.FromSetting("24").SecondsToFrames(0.5) == 12
+    assert FrameRate.FromSetting("24").SecondsToFrames(0.51) == 13
+    # 浮動小数点の誤差では1フレーム増やさない
+    assert FrameRate.FromSetting("30").SecondsToFrames(0.1 + 0.2) == 9
+
+def test_ConvertFrames() -> None:
+    ntsc: FrameRate = FrameRate.FromSetting("29.97")
+    assert FrameRate.FromSetting("30").ConvertFrames(30, FrameRate.FromSetting("24")) == 24
+    assert ntsc.ConvertFrames(30, FrameRate.FromSetting("59.94")) == 60
+    # 29.97fpsの1000フレームは30fpsでちょうど1001フレーム
+    assert ntsc.ConvertFrames(1000, FrameRate.FromSetting("30")) == 1001
+    assert FrameRate.FromSetting("30").ConvertFrames(1001, ntsc) == 1000
+    assert ntsc.ConvertFrames(123, FrameRate.FromSetting("29.97", True)) == 123
+
+def test_ResolveUtilTimecode() -> None:
+    assert VoiceInserter.ResolveUtil.AddFrameToTimecode("00:00:59;28", 2, FrameRate.FromSetting("29.97", True)) == "00:01:00;02"
+    assert VoiceInserter.ResolveUtil.GetTimecodeFromFrame(86400, "24") == "01:00:00:00"
+    assert VoiceInserter.ResolveUtil.TimecodeToFrames("00:00:01:05", 25) == 30
@@ -0,0 +1,111 @@
+'''
+DialogueLayoutの掛け合いの配置(音声・画像・字幕の開始と終了のフレーム)を確認する。
+'''
+from __future__ import annotations
+import random
+
+import pytest
+
+from VoiceInserter import DialogueLayout
+
+def CheckLayout(placements: list[DialogueLayout.Placement], entries: list[DialogueLayout.Entry], startFrame: int, endFrame: int) -> list[str]:
+    '''
+    DialogueLayoutの配置が満たすべき性質を確認する。
+
+    Parameters:
+    placements: list[DialogueLayout.Placement]
+        Planの配置結果
+    entries: list[DialogueLayout.Entry]
+        Planに渡した行
+    startFrame: int
+        Planに渡した開始フレーム
+    endFrame: int
+        Planが返したタイムラインの終了フレーム
+
+    Returns: list[str]
+        満たさなかった性質の説明
+    '''
+    failures: list[str] = []
+    lastImageEnd: dict[str, int] = {}
+    lastVoiceEnd: dict[str, int] = {}
+    prevStart: int = startFrame
+    for index, (placement, entry) in enumerate(zip(placements, entries)):
+        character: str = entry.character
+        checks: dict[str, bool] = {
+            "voice length": placement.voiceEnd - placement.voiceStart == max(entry.duration, 0),
+            "starts before the previous line": placement.voiceStart >= prevStart,
+            "voice overlaps the same character": placement.voiceStart >= lastVoiceEnd.get(character, startFrame),
+            "image overlaps the same character": placement.imageStart >= lastImageEnd.get(character, startFrame),
+            "image does not cover the voice": placement.imageStart == placement.voiceStart and placement.imageEnd >= placement.voiceEnd,
+            "voice only image is longer than the voice": placement.imageEnd == placement.voiceEnd if entry.voiceOnly else True,
+            "text is not the voice range": (placement.textStart, placement.textEnd) == (placement.voiceStart, placement.voiceEnd),
+            "image ends after the timeline": placement.imageEnd <= endFrame,
+        }
+        failures += [f"line {index}: {name}" for name, ok in checks.items() if not ok]
+        prevStart = placement.voiceStart
+        lastVoiceEnd[character] = placement.voiceEnd
+        lastImageEnd[character] = placement.imageEnd
+    if placements and endFrame != max(placement.voiceEnd for placement in placements):
+        failures.append(f"end frame {endFrame} is not the last voice end")
+    return failures
+
+def Ranges(placements: list[DialogueLayout.Placement]) -> list[tuple[int, int, int, int]]:
+    '''
+    配置を(音声の開始, 音声の終了, 画像の開始, 画像の終了)の列にする
+    '''
+    return [(placement.voiceStart, placement.voiceEnd, placement.imageStart, placement.imageEnd) for placement in placements]
+
+def test_Empty() -> None:
+    assert DialogueLayout.Plan([], 100) == ([], 100)
+
+def test_PauseAfter() -> None:
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30, pauseAfter=10), DialogueLayout.Entry("b", 30)]
+    placements, endFrame = DialogueLayout.Plan(entries, 100)
+    assert Ranges(placements) == [(100, 130, 100, 170), (140, 170, 140, 170)]
+    assert endFrame == 170
+
+def test_Overlap() -> None:
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30), DialogueLayout.Entry("b", 30, overlap=10)]
+    placements, endFrame = DialogueLayout.Plan(entries, 0)
+    assert Ranges(placements) == [(0, 30, 0, 50), (20, 50, 20, 50)]
+    assert endFrame == 50
+
+def test_OverlapDoesNotStartBeforePreviousLine() -> None:
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30), DialogueLayout.Entry("b", 10, overlap=50)]
+    placements, _ = DialogueLayout.Plan(entries, 0)
+    assert [placement.voiceStart for placement in placements] == [0, 0]
+
+def test_SameCharacterPushedBack() -> None:
+    # 重なりで前に詰めても、同じキャラの前の行が終わるまでは始めない
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30), DialogueLayout.Entry("a", 20, overlap=10)]
+    placements, endFrame = DialogueLayout.Plan(entries, 0)
+    assert Ranges(placements) == [(0, 30, 0, 30), (30, 50, 30, 50)]
+    assert endFrame == 50
+
+def test_VoiceOnly() -> None:
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30, voiceOnly=True), DialogueLayout.Entry("b", 30)]
+    placements, endFrame = DialogueLayout.Plan(entries, 0)
+    assert Ranges(placements) == [(0, 30, 0, 30), (30, 60, 30, 60)]
+    assert endFrame == 60
+
+def test_ImageUntilNextChange() -> None:
+    # 画像は同じキャラの次の行まで、最後の行はタイムラインの最後まで表示する
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", 30), DialogueLayout.Entry("b", 30), DialogueLayout.Entry("a", 30)]
+    placements, endFrame = DialogueLayout.Plan(entries, 0)
+    assert Ranges(placements) == [(0, 30, 0, 60), (30, 60, 30, 90), (60, 90, 60, 90)]
+    assert endFrame == 90
+
+def test_NegativeDuration() -> None:
+    entries: list[DialogueLayout.Entry] = [DialogueLayout.Entry("a", -5), DialogueLayout.Entry("b", 10)]
+    placements, _ = DialogueLayout.Plan(entries, 0)
+    assert Ranges(placements) == [(0, 0, 0, 10), (0, 10, 0, 10)]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_LayoutProperties(seed: int) -> None:
+    rng: random.Random = random.Random(seed)
+    entries: list[DialogueLayout.Entry] = [
+        DialogueLayout.Entry(f"chara{rng.randrange(4)}", rng.randrange(15, 120), rng.choice([0, 0, 9]), rng.choice([0, 0, 0, 15, 200]), rng.random() < 0.3)
+        for _ in range(500)
+    ]
+    placements, endFrame = DialogueLayout.Plan(entries, 108000)
+    assert CheckLayout(placements, entries, 108000, endFrame) == []
@@ -0,0 +1,96 @@
+'''
+OutputDirectoryのファイル名の確保・解放と、同じ音声を使い回すためのClaim/Add/Unclaimを確認する。
+'''
+from __future__ import annotations
+import os
+import threading
+from concurrent import futures
+from typing import Final
+
+import pytest
+
+from VoiceInserter import OutputDirectory
+
+# 別のスレッドの終了を待つ最大の秒数. 超えたら止まったままとみなす
+JOIN_TIMEOUT: Final = 5.0
+
+def StartClaim(outputDirectory: OutputDirectory, digest: str) -> tuple[threading.Thread, list[str | None]]:
+    '''
+    別のスレッドでClaimを呼ぶ
+
+    Returns: tuple[threading.Thread, list[str | None]]
+        Claimを呼んだスレッドと、Claimの戻り値が入るリスト
+    '''
+    results: list[str | None] = []
+    thread: threading.Thread = threading.Thread(target=lambda: results.append(outputDirectory.Claim(digest)), daemon=True)
+    thread.start()
+    return thread, results
+
+def test_ReserveUniqueNames(tmp_path) -> None:
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    with futures.ThreadPoolExecutor(4) as executor:
+        paths: list[str] = list(executor.map(lambda _: outputDirectory.Reserve("voice.wav"), range(200)))
+    assert len(set(paths)) == 200
+    assert all(os.path.isfile(path) and os.path.getsize(path) == 0 for path in paths)
+
+def test_ReserveSkipsExistingFiles(tmp_path) -> None:
+    (tmp_path / "voice.wav").write_bytes(b"wav")
+    (tmp_path / "voice1.wav").write_bytes(b"wav")
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    assert os.path.basename(outputDirectory.Reserve("voice.wav")) == "voice2.wav"
+    # 索引を作った後に別のプロセスが作ったファイルも避ける
+    (tmp_path / "voice3.wav").write_bytes(b"wav")
+    assert os.path.basename(outputDirectory.Reserve("voice.wav")) == "voice4.wav"
+    assert (tmp_path / "voice3.wav").read_bytes() == b"wav"
+
+def test_ReleaseRemovesEmptyFile(tmp_path) -> None:
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    unused: str = outputDirectory.Reserve("voice.wav")
+    written: str = outputDirectory.Reserve("voice.wav")
+    OutputDirectory.WriteAtomic(written, b"wav")
+    outputDirectory.Release(unused)
+    outputDirectory.Release(written)
+    assert not os.path.exists(unused)
+    assert os.path.normcase(os.path.basename(unused)) not in outputDirectory.names
+    # 書き込んだファイルは消さない
+    assert os.path.isfile(written)
+    assert os.listdir(tmp_path) == [os.path.basename(written)]
+
+def test_ClaimAddReusesFile(tmp_path) -> None:
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    assert outputDirectory.Claim("digest") is None
+    # 書き出し中の同じ音声は、書き出し終わるまで待ってから使い回す
+    thread, results = StartClaim(outputDirectory, "digest")
+    filePath: str = outputDirectory.Reserve("voice.wav")
+    OutputDirectory.WriteAtomic(filePath, b"wav")
+    outputDirectory.Add(filePath, "digest", "text", "character", {"speed": 1.0})
+    thread.join(JOIN_TIMEOUT)
+    assert not thread.is_alive()
+    assert results == [filePath]
+    # 一覧は保存されているので、開き直しても使い回せる
+    assert OutputDirectory(str(tmp_path)).Claim("digest") == filePath
+
+def test_UnclaimWakesWaiter(tmp_path) -> None:
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    assert outputDirectory.Claim("digest") is None
+    thread, results = StartClaim(outputDirectory, "digest")
+    outputDirectory.Unclaim("digest")
+    thread.join(JOIN_TIMEOUT)
+    assert not thread.is_alive()
+    # 書き出しをやめた場合は、待っていたスレッドが代わりに書き出す
+    assert results == [None]
+
+def test_AddReleasesClaimWhenManifestSaveFails(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def FailSave(self: OutputDirectory) -> None:
+        raise PermissionError("manifest is read only")
+
+    outputDirectory: OutputDirectory = OutputDirectory(str(tmp_path))
+    monkeypatch.setattr(OutputDirectory, "_SaveManifest", FailSave)
+    assert outputDirectory.Claim("digest") is None
+    thread, results = StartClaim(outputDirectory, "digest")
+    filePath: str = outputDirectory.Reserve("voice.wav")
+    OutputDirectory.WriteAtomic(filePath, b"wav")
+    outputDirectory.Add(filePath, "digest", "text", "character", {})
+    thread.join(JOIN_TIMEOUT)
+    assert not thread.is_alive()
+    assert results == [filePath]